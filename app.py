@@ -1,31 +1,76 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_from_directory, jsonify, g, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, session, send_from_directory, jsonify, g, send_file, Response, has_request_context, abort, stream_with_context
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
 from flask_babel import Babel
-from google import genai
-from google.genai import types
+import click
 import sqlite3
 import os
-from functools import wraps
+import sys
+import subprocess
+import importlib.util
+import bisect
+import itertools
+import queue
+import random
+import secrets
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache, wraps
 from datetime import datetime, timedelta
 import json
 import io
+import gzip
+import hashlib
 import re
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
-    from reportlab.lib import colors
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
+import string
+import threading
+import time
+import zlib
+
+# NumPy, ReportLab and google.genai are slow to import, so they are loaded on
+# first use rather than when a worker starts.
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+REPORTLAB_AVAILABLE = importlib.util.find_spec('reportlab') is not None
+BROTLI_AVAILABLE = importlib.util.find_spec('brotli') is not None  # optional: pip install brotli
+np = None
+brotli = None
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)  # Secret key for session management
 CORS(app)  # Enable CORS for chatbot API
 
+
+def load_secret_key():
+    """Secret key shared by every worker process and kept across restarts.
+
+    Uses AGRORENT_SECRET_KEY when set, otherwise a random key generated once
+    into instance/secret_key (or AGRORENT_SECRET_KEY_FILE).
+    """
+    key = os.environ.get('AGRORENT_SECRET_KEY')
+    if key:
+        return key
+    path = os.environ.get('AGRORENT_SECRET_KEY_FILE', os.path.join(app.instance_path, 'secret_key'))
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Write to a private temp file and link it into place so concurrent
+        # workers never read a half-written key; the first link wins.
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(32))
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+app.secret_key = load_secret_key()  # Secret key for session management
+
 SUPPORTED_LANGUAGES = ['en', 'hi', 'mr']
 LANGUAGE_NAMES = {
     'en': 'English',
@@ -35,11 +80,21 @@ LANGUAGE_NAMES = {
 DEFAULT_LOCALE = 'en'
 
 
+TRANSLATIONS_DIR = 'i18n'
+TRANSLATIONS_CHECK_INTERVAL = 1.0  # seconds between mtime checks in debug mode
+CLIENT_TRANSLATION_PREFIX = 'client.'  # keys under "client" are shipped to the browser
+
+
+def translation_path(lang):
+    """Path of the JSON translation file for a language"""
+    return os.path.join(TRANSLATIONS_DIR, f'{lang}.json')
+
+
 def load_translations():
     """Load translation dictionaries from i18n folder"""
     translations = {}
     for lang in SUPPORTED_LANGUAGES:
-        path = os.path.join('i18n', f'{lang}.json')
+        path = translation_path(lang)
         try:
             with open(path, 'r', encoding='utf-8') as f:
                 translations[lang] = json.load(f)
@@ -48,30 +103,120 @@ def load_translations():
     return translations
 
 
-TRANSLATIONS = load_translations()
+def flatten_translations(data, prefix=''):
+    """Flatten nested translation dicts into {'dotted.key': value}"""
+    flat = {}
+    for key, value in data.items():
+        dotted = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten_translations(value, f'{dotted}.'))
+        else:
+            flat[dotted] = value
+    return flat
+
+
+def template_fields(value):
+    """Return the named placeholders of a format string, or None if it has none"""
+    if not isinstance(value, str) or '{' not in value:
+        return None
+    try:
+        fields = {name for _, name, _, _ in string.Formatter().parse(value) if name}
+    except ValueError:
+        return None
+    return frozenset(fields)
+
+
+def build_client_bundle(table):
+    """Serialise the client-side subset of a flattened table, with hash and gzip copy"""
+    subset = {
+        key[len(CLIENT_TRANSLATION_PREFIX):]: value
+        for key, value in table.items()
+        if key.startswith(CLIENT_TRANSLATION_PREFIX)
+    }
+    body = json.dumps(subset, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return {
+        'hash': hashlib.sha256(body).hexdigest()[:16],
+        'body': body,
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0)
+    }
 
 
-def get_translations():
-    """Get translations, reloading in debug mode for development"""
-    if app.debug:
-        return load_translations()
-    return TRANSLATIONS
+class TranslationCatalog:
+    """Flattened translation tables, one dict per locale.
 
+    Each locale's table already contains the English fallbacks, so a lookup is
+    a single dict access. Format placeholders are parsed once at load time. In
+    debug mode the JSON files are reloaded when their mtime changes.
+    """
 
-def _get_translation_value(lang, key_parts):
-    """Traverse translation dict and return value for key parts"""
-    translations = get_translations()
-    data = translations.get(lang, {})
-    for part in key_parts:
-        if isinstance(data, dict):
-            data = data.get(part)
-        else:
-            data = None
-        if data is None:
-            break
-    if data is None and lang != DEFAULT_LOCALE:
-        return _get_translation_value(DEFAULT_LOCALE, key_parts)
-    return data
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.templates = {}
+        self.bundles = {}
+        self.mtimes = {}
+        self.checked_at = 0.0
+        self.load()
+
+    def file_mtimes(self):
+        mtimes = {}
+        for lang in SUPPORTED_LANGUAGES:
+            try:
+                mtimes[lang] = os.stat(translation_path(lang)).st_mtime_ns
+            except OSError:
+                mtimes[lang] = None
+        return mtimes
+
+    def load(self):
+        mtimes = self.file_mtimes()
+        raw = load_translations()
+        fallback = flatten_translations(raw.get(DEFAULT_LOCALE, {}))
+        tables = {}
+        templates = {}
+        for lang in SUPPORTED_LANGUAGES:
+            table = dict(fallback)
+            if lang != DEFAULT_LOCALE:
+                table.update(flatten_translations(raw.get(lang, {})))
+            tables[lang] = table
+            templates[lang] = {
+                key: fields for key, fields in ((key, template_fields(value)) for key, value in table.items())
+                if fields is not None
+            }
+        bundles = {lang: build_client_bundle(table) for lang, table in tables.items()}
+        with self.lock:
+            self.tables = tables
+            self.templates = templates
+            self.bundles = bundles
+            self.mtimes = mtimes
+            self.checked_at = time.monotonic()
+
+    def reload_if_changed(self):
+        """Reload the tables if any JSON file changed since the last check"""
+        now = time.monotonic()
+        if now - self.checked_at < TRANSLATIONS_CHECK_INTERVAL:
+            return False
+        self.checked_at = now
+        if self.file_mtimes() == self.mtimes:
+            return False
+        self.load()
+        return True
+
+    def lookup(self, lang, key):
+        """Return (value, placeholder names) for a key, or (None, None) if missing"""
+        if app.debug:
+            self.reload_if_changed()
+        if lang not in self.tables:
+            lang = DEFAULT_LOCALE
+        return self.tables[lang].get(key), self.templates[lang].get(key)
+
+    def bundle(self, lang):
+        """Client-side translation bundle for a language"""
+        if app.debug:
+            self.reload_if_changed()
+        return self.bundles.get(lang)
+
+
+translation_catalog = TranslationCatalog()
 
 
 def translate_text(key, locale=None, default=None, **kwargs):
@@ -79,17 +224,18 @@ def translate_text(key, locale=None, default=None, **kwargs):
     if not key:
         return ''
     lang = locale or getattr(g, 'current_locale', None) or session.get('lang') or DEFAULT_LOCALE
-    parts = key.split('.')
-    value = _get_translation_value(lang, parts)
-    if value is None:
-        value = default if default is not None else _get_translation_value(DEFAULT_LOCALE, parts)
+    value, fields = translation_catalog.lookup(lang, key)
     if value is None:
         value = default if default is not None else key
-    if isinstance(value, str) and kwargs:
-        try:
-            value = value.format(**kwargs)
-        except KeyError:
-            pass
+        if isinstance(value, str) and kwargs:
+            try:
+                value = value.format(**kwargs)
+            except KeyError:
+                pass
+        return value
+    # Placeholders were parsed at load time, so only format when all are supplied
+    if kwargs and fields is not None and fields <= kwargs.keys():
+        value = value.format(**kwargs)
     return value
 
 
@@ -108,6 +254,20 @@ def select_locale():
 babel = Babel(app, locale_selector=select_locale)
 
 
+def translation_bundle_url(lang):
+    """Content-hashed URL of a language's client-side translation bundle"""
+    bundle = translation_catalog.bundle(lang)
+    return url_for('translation_bundle', lang=lang, bundle_hash=bundle['hash'])
+
+
+def i18n_client_config():
+    """Locale and bundle URLs handed to static/js/i18n.js"""
+    return {
+        'locale': getattr(g, 'current_locale', DEFAULT_LOCALE),
+        'bundles': {lang: translation_bundle_url(lang) for lang in SUPPORTED_LANGUAGES}
+    }
+
+
 @app.context_processor
 def inject_translation_helpers():
     """Expose translation helpers to templates"""
@@ -115,9 +275,32 @@ def inject_translation_helpers():
         't': translate_text,
         'current_locale': getattr(g, 'current_locale', DEFAULT_LOCALE),
         'supported_languages': SUPPORTED_LANGUAGES,
-        'language_names': LANGUAGE_NAMES
+        'language_names': LANGUAGE_NAMES,
+        'i18n_client_config': i18n_client_config
     }
 
+
+@app.route('/i18n/<lang>.<bundle_hash>.json')
+def translation_bundle(lang, bundle_hash):
+    """Serve a client-side translation bundle; hashed URLs are cached forever"""
+    bundle = translation_catalog.bundle(lang)
+    if not bundle:
+        return jsonify({'error': 'Unknown language'}), 404
+    if bundle_hash != bundle['hash']:
+        # Stale hash from an old page: point the browser at the current bundle
+        return redirect(url_for('translation_bundle', lang=lang, bundle_hash=bundle['hash']))
+    if bundle['hash'] in request.if_none_match:
+        response = app.response_class(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = app.response_class(bundle['gzip'], mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = app.response_class(bundle['body'], mimetype='application/json')
+    response.set_etag(bundle['hash'])
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 MECHANIC_SPECIALIZATIONS = [
     'Tractor',
     'Harvester',
@@ -139,15 +322,1159 @@ def assets(filename):
 def uploaded_file(filename):
     return send_from_directory('static/uploads', filename)
 
+# ============================================
+# Offline support
+# ============================================
+# url_for('static', ...) URLs carry a content hash (?v=...), so browsers and
+# the service worker can cache them forever and pick up changes by URL.
+SERVICE_WORKER_PRECACHE = [
+    'css/styles.css',
+    'css/renting.css',
+    'js/tracing.js',
+    'js/i18n.js',
+    'js/script.js',
+    'js/notifications.js',
+    'js/renting.js',
+    'js/offline.js',
+    'icons/icon-192.png',
+    'icons/icon-512.png',
+]
+
+
+@lru_cache(maxsize=1024)
+def static_file_hash(filename, mtime):
+    """Short content hash of a static file; mtime in the key picks up edits"""
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def static_version(filename):
+    try:
+        return static_file_hash(filename, os.path.getmtime(os.path.join(app.static_folder, filename)))
+    except (OSError, ValueError):
+        return None
+
+
+@app.url_defaults
+def version_static_urls(endpoint, values):
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        version = static_version(values['filename'])
+        if version:
+            values['v'] = version
+
+
+@app.after_request
+def cache_versioned_static(response):
+    """Versioned static URLs never change content, so let clients keep them"""
+    if (
+        request.endpoint == 'static' and response.status_code == 200
+        and request.args.get('v') == static_version(request.view_args.get('filename', ''))
+    ):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@app.route('/service-worker.js')
+def service_worker():
+    """Service worker with this build's precache list prepended"""
+    precache = [url_for('static', filename=filename) for filename in SERVICE_WORKER_PRECACHE]
+    precache += [translation_bundle_url(lang) for lang in SUPPORTED_LANGUAGES]
+    with open(os.path.join(app.static_folder, 'js', 'service-worker.js'), encoding='utf-8') as f:
+        script = f.read()
+    body = (
+        f'const PRECACHE_URLS = {json.dumps(precache)};\n'
+        f"const CACHE_VERSION = '{hashlib.sha256(json.dumps(precache).encode()).hexdigest()[:12]}';\n\n"
+        + script
+    )
+    response = app.response_class(body, mimetype='application/javascript')
+    # Browsers revalidate the worker script themselves; make sure no proxy keeps it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/manifest.webmanifest')
+def web_manifest():
+    """Web app manifest for installing AgroRent"""
+    response = jsonify({
+        'name': 'AgroRent',
+        'short_name': 'AgroRent',
+        'start_url': url_for('renting'),
+        'scope': '/',
+        'display': 'standalone',
+        'background_color': '#f5f1e8',
+        'theme_color': '#2d5016',
+        'lang': getattr(g, 'current_locale', DEFAULT_LOCALE),
+        'icons': [
+            {'src': url_for('static', filename=f'icons/icon-{size}.png'), 'sizes': f'{size}x{size}', 'type': 'image/png'}
+            for size in (192, 512)
+        ]
+    })
+    response.mimetype = 'application/manifest+json'
+    return response
+
+# ============================================
+# Metrics
+# ============================================
+# Counters and histograms are kept in memory per process. Under gunicorn
+# (AGRORENT_METRICS_DIR is set by gunicorn.conf.py) every worker also writes
+# its values to <dir>/<pid>-<token>.json about once a second, and /metrics
+# sums the files of all workers. When a worker exits (max_requests recycles
+# them regularly) the gunicorn master folds its files into METRICS_ARCHIVE
+# and deletes them, so the directory doesn't grow with every worker ever run.
+METRICS_DIR = os.environ.get('AGRORENT_METRICS_DIR')
+METRICS_ARCHIVE = 'archive.json'
+METRICS_FLUSH_INTERVAL = 1.0  # seconds
+METRICS_TOKEN = os.environ.get('AGRORENT_METRICS_TOKEN')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+GEMINI_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+SIZE_BUCKETS = (1024, 10240, 102400, 524288, 1048576, 5242880, 10485760, 52428800)
+
+METRIC_HELP = {
+    'agrorent_http_request_duration_seconds': 'Request latency by endpoint, method and status.',
+    'agrorent_http_response_bytes_total': 'Response body bytes sent, by endpoint.',
+    'agrorent_db_queries_total': 'SQLite statements executed, by endpoint.',
+    'agrorent_db_rows_total': 'Rows fetched from SQLite, by endpoint.',
+    'agrorent_gemini_request_duration_seconds': 'Gemini API call duration by operation and outcome.',
+    'agrorent_pdf_render_duration_seconds': 'Rental agreement PDF render time.',
+    'agrorent_upload_size_bytes': 'Size of uploaded files by form field.',
+    'agrorent_db_repeated_queries_total': 'Requests with a statement shape repeated (possible N+1), by endpoint.',
+    'agrorent_singleflight_calls_total': 'Coalesced computations by operation; role "leader" ran it, "follower" shared its result.',
+    'agrorent_waitlist_promotions_total': 'Waitlist entries turned into Pending rental requests after dates were freed.',
+    'agrorent_saved_search_candidates_total': 'Saved searches evaluated against a created or updated listing (from its category/district buckets).',
+    'agrorent_saved_search_matches_total': 'Renters notified about a listing matching their saved searches.',
+    'agrorent_market_refresh_groups_total': 'Market aggregate groups recomputed, by kind (incremental or full rebuild).',
+    'agrorent_price_suggestions_total': 'Price suggestions served, by number of fields the comparables matched on ("none" when there were none).',
+}
+
+
+class Metrics:
+    """Process-local Prometheus counters and histograms"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.token = secrets.token_hex(4)
+        self.flush_timer = None
+
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.schedule_flush()
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': list(buckets), 'counts': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0
+                }
+            histogram['counts'][bisect.bisect_left(histogram['buckets'], value)] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+        self.schedule_flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [
+                    [name, list(labels), dict(histogram, counts=list(histogram['counts']))]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def path(self):
+        return os.path.join(METRICS_DIR, f'{os.getpid()}-{self.token}.json')
+
+    def flush(self):
+        """Write this process's values for the other workers to aggregate"""
+        self.flush_timer = None
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        write_metrics_file(self.path(), self.snapshot())
+
+    def schedule_flush(self):
+        if METRICS_DIR and self.flush_timer is None:
+            self.flush_timer = threading.Timer(METRICS_FLUSH_INTERVAL, self.flush)
+            self.flush_timer.daemon = True
+            self.flush_timer.start()
+
+    def clear_directory(self):
+        """Remove files left by a previous server run (called in the gunicorn master)"""
+        if METRICS_DIR and os.path.isdir(METRICS_DIR):
+            for filename in os.listdir(METRICS_DIR):
+                os.remove(os.path.join(METRICS_DIR, filename))
+
+    def mark_process_dead(self, pid):
+        """Fold an exited worker's files into the archive and remove them (called in the gunicorn master)"""
+        if not METRICS_DIR or not os.path.isdir(METRICS_DIR):
+            return
+        paths = [
+            os.path.join(METRICS_DIR, filename) for filename in os.listdir(METRICS_DIR)
+            if filename.startswith(f'{pid}-') and filename.endswith('.json')
+        ]
+        if not paths:
+            return
+        archive_path = os.path.join(METRICS_DIR, METRICS_ARCHIVE)
+        counters, histograms = merge_metrics(read_metrics_files([archive_path] + paths))
+        write_metrics_file(archive_path, {
+            'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+            'histograms': [[name, list(labels), histogram] for (name, labels), histogram in histograms.items()],
+        })
+        for path in paths:
+            os.remove(path)
+
+    def collect(self):
+        """Return (counters, histograms) summed over every process"""
+        if METRICS_DIR:
+            self.flush()
+            snapshots = read_metrics_files(
+                os.path.join(METRICS_DIR, filename) for filename in os.listdir(METRICS_DIR)
+                if filename.endswith('.json')
+            )
+        else:
+            snapshots = [self.snapshot()]
+        return merge_metrics(snapshots)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        counters, histograms = self.collect()
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f'# HELP {name} {METRIC_HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name, 'counter')
+            lines.append(f'{name}{format_labels(labels)} {value}')
+        for (name, labels), histogram in sorted(histograms.items()):
+            describe(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(histogram['buckets'] + ['+Inf'], histogram['counts']):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f"{name}_sum{format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+def write_metrics_file(path, snapshot):
+    """Replace a metrics file atomically, so readers never see half of one"""
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    os.replace(temp_path, path)
+
+
+def read_metrics_files(paths):
+    """Snapshots from the given metrics files, skipping missing or unreadable ones"""
+    snapshots = []
+    for path in paths:
+        try:
+            with open(path, encoding='utf-8') as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def merge_metrics(snapshots):
+    """Sum snapshots into (counters, histograms) keyed by (name, labels)"""
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(tuple(label) for label in labels))
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = dict(histogram, counts=list(histogram['counts']))
+                continue
+            total['counts'] = [a + b for a, b in zip(total['counts'], histogram['counts'])]
+            total['sum'] += histogram['sum']
+            total['count'] += histogram['count']
+    return counters, histograms
+
+
+def format_labels(labels):
+    """Render ((name, value), ...) as a Prometheus label set"""
+    if not labels:
+        return ''
+    pairs = []
+    for label, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{label}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+metrics = Metrics()
+
+
+class SingleFlight:
+    """Run identical concurrent computations once per process.
+
+    The first caller for an (operation, key) pair runs the function; callers
+    arriving while it runs wait and share its result or exception. Nothing is
+    cached afterwards, and shared results must not be mutated.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, operation, key, fn):
+        flight = (operation, key)
+        with self.lock:
+            call = self.calls.get(flight)
+            leader = call is None
+            if leader:
+                call = self.calls[flight] = {'done': threading.Event(), 'result': None, 'error': None}
+        metrics.inc('agrorent_singleflight_calls_total', operation=operation, role='leader' if leader else 'follower')
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[flight]
+            call['done'].set()
+
+
+single_flight = SingleFlight()
+
+
+# SQL profiling: every statement run through get_db() is recorded with its
+# normalised text, duration and row count for the current request. Slow
+# statements are logged with their query plan, and statement shapes repeated
+# within one request (N+1 patterns) are flagged.
+SLOW_QUERY_MS = float(os.environ.get('AGRORENT_SLOW_QUERY_MS', 100))
+REPEATED_QUERY_THRESHOLD = 5  # same statement shape this many times in one request
+QUERY_LOG_LIMIT = 500  # statements kept per request
+QUERY_PROFILE_HISTORY = 50  # recent requests kept for /admin/queries
+
+SQL_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER_PATTERN = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+SQL_LIST_PATTERN = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+query_profiles = deque(maxlen=QUERY_PROFILE_HISTORY)
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """Collapse whitespace and replace literals so statements of one shape compare equal"""
+    sql = SQL_STRING_PATTERN.sub('?', sql)
+    sql = SQL_NUMBER_PATTERN.sub('?', sql)
+    sql = ' '.join(sql.split())
+    return SQL_LIST_PATTERN.sub('(?, ...)', sql)
+
+
+def request_stats():
+    """Per-request counters for the current request, or None outside a request"""
+    if not has_request_context():
+        return None
+    stats = g.get('request_stats')
+    if stats is None:
+        stats = g.request_stats = {'started': time.perf_counter(), 'queries': 0, 'rows': 0, 'statements': []}
+    return stats
+
+
+def explain_query_plan(conn, sql, parameters=()):
+    """Return the EXPLAIN QUERY PLAN details for a statement, one line per step"""
+    rows = sqlite3.Cursor(conn).execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+    return [row[3] for row in rows]
+
+
+def log_slow_query(conn, sql, parameters, duration_ms):
+    """Log a slow statement with its query plan (when it is a plain DML statement)"""
+    plan = []
+    keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+    if parameters is not None and keyword in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE'):
+        try:
+            plan = explain_query_plan(conn, sql, parameters)
+        except sqlite3.Error:
+            pass
+    app.logger.warning(
+        'Slow query (%.1f ms): %s%s', duration_ms, normalize_sql(sql),
+        ''.join(f'\n    {step}' for step in plan)
+    )
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that records statements and fetched rows for the current request"""
+
+    record = None
+    span = None
+
+    def run(self, method, sql, parameters, explain_parameters):
+        stats = request_stats()
+        started = time.perf_counter()
+        try:
+            return method(sql, parameters)
+        finally:
+            finished = time.perf_counter()
+            duration_ms = (finished - started) * 1000
+            if stats is not None:
+                stats['queries'] += 1
+                if len(stats['statements']) < QUERY_LOG_LIMIT:
+                    self.record = {
+                        'sql': normalize_sql(sql),
+                        'offset_ms': (started - stats['started']) * 1000,
+                        'duration_ms': duration_ms,
+                        'rows': 0,
+                    }
+                    stats['statements'].append(self.record)
+                else:
+                    self.record = None
+            trace = current_trace()
+            if trace is not None:
+                self.span = trace.add_span(
+                    f"sqlite {sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''}",
+                    started, finished, SPAN_KIND_CLIENT,
+                    {'db.system': 'sqlite', 'db.statement': normalize_sql(sql), 'db.rows': 0}
+                )
+            else:
+                self.span = None
+            if duration_ms >= SLOW_QUERY_MS:
+                log_slow_query(self.connection, sql, explain_parameters, duration_ms)
+
+    def count_rows(self, count):
+        stats = request_stats()
+        if stats is not None:
+            stats['rows'] += count
+            if self.record is not None:
+                self.record['rows'] += count
+            if self.span is not None:
+                self.span['attributes']['db.rows'] += count
+
+    def execute(self, sql, parameters=()):
+        return self.run(super().execute, sql, parameters, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # The parameter iterator is consumed by the time a slow batch is logged
+        return self.run(super().executemany, sql, seq_of_parameters, None)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self.count_rows(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self.count_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self.count_rows(len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        self.count_rows(1)
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose shortcut execute methods go through InstrumentedCursor"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def repeated_statements(statements):
+    """Statement shapes run at least REPEATED_QUERY_THRESHOLD times, most frequent first"""
+    counts = {}
+    for statement in statements:
+        counts[statement['sql']] = counts.get(statement['sql'], 0) + 1
+    repeated = [(sql, count) for sql, count in counts.items() if count >= REPEATED_QUERY_THRESHOLD]
+    return sorted(repeated, key=lambda item: item[1], reverse=True)
+
+
+@app.before_request
+def start_request_metrics():
+    """Start the request clock and per-request query counters"""
+    request_stats()
+
+
+def count_streamed_bytes(chunks, endpoint):
+    """Pass a streamed body through and record its size once it has been sent"""
+    sent = 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        metrics.inc('agrorent_http_response_bytes_total', sent, endpoint=endpoint)
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record latency, response size and database work for the finished request"""
+    stats = request_stats()
+    endpoint = request.endpoint or 'unmatched'
+    duration = time.perf_counter() - stats['started']
+    metrics.observe(
+        'agrorent_http_request_duration_seconds', duration,
+        endpoint=endpoint, method=request.method, status=response.status_code
+    )
+    if response.is_streamed and response.content_length is None:
+        # stream_json bodies: counted as the (possibly compressed) chunks go out
+        response.response = count_streamed_bytes(response.response, endpoint)
+    else:
+        metrics.inc('agrorent_http_response_bytes_total', response.content_length or 0, endpoint=endpoint)
+    metrics.inc('agrorent_db_queries_total', stats['queries'], endpoint=endpoint)
+    metrics.inc('agrorent_db_rows_total', stats['rows'], endpoint=endpoint)
+
+    repeated = repeated_statements(stats['statements'])
+    for sql, count in repeated:
+        app.logger.warning('Possible N+1 in %s: %d x %s', endpoint, count, sql)
+        metrics.inc('agrorent_db_repeated_queries_total', endpoint=endpoint)
+
+    if endpoint not in ('static', 'admin_queries'):
+        query_profiles.append({
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'duration_ms': duration * 1000,
+            'statements': stats['statements'],
+            'repeated': repeated,
+            'finished_at': datetime.now().strftime('%H:%M:%S'),
+        })
+
+    if app.debug or (ADMIN_EMAILS and is_admin()):
+        db_ms = sum(statement['duration_ms'] for statement in stats['statements'])
+        response.headers['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{stats["queries"]} queries", app;dur={duration * 1000:.1f}'
+        )
+        response.headers['X-Query-Count'] = str(stats['queries'])
+    return response
+
+
+def record_upload(field, filepath):
+    """Record the size of a saved upload"""
+    metrics.observe('agrorent_upload_size_bytes', os.path.getsize(filepath), SIZE_BUCKETS, field=field)
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# ============================================
+# Tracing
+# ============================================
+# Requests carrying a W3C `traceparent` header (static/js/tracing.js adds one
+# to every fetch) or picked by AGRORENT_TRACE_SAMPLE_RATE are traced: the
+# request gets a server span, with child spans for SQLite statements, file
+# I/O, PDF rendering and Gemini calls. Finished traces are exported as OTLP
+# JSON, appended one request per line to AGRORENT_TRACE_FILE and/or POSTed to
+# an OTLP/HTTP collector at AGRORENT_TRACE_ENDPOINT. With neither set,
+# tracing is off and span() costs one attribute lookup.
+TRACE_FILE = os.environ.get('AGRORENT_TRACE_FILE')
+TRACE_ENDPOINT = os.environ.get('AGRORENT_TRACE_ENDPOINT')  # e.g. http://localhost:4318/v1/traces
+TRACE_SAMPLE_RATE = float(os.environ.get('AGRORENT_TRACE_SAMPLE_RATE', 1.0))
+TRACE_SLOW_MS = float(os.environ.get('AGRORENT_TRACE_SLOW_MS', 0))  # only export requests at least this slow
+TRACE_MAX_SPANS = 1000
+TRACEPARENT_PATTERN = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+
+class Trace:
+    """Spans recorded for one request; timestamps come from perf_counter offsets"""
+
+    def __init__(self, trace_id, parent_span_id):
+        self.trace_id = trace_id
+        self.started_perf = time.perf_counter()
+        self.started_ns = time.time_ns()
+        self.spans = []
+        self.stack = []
+        self.root = self.add_span('request', self.started_perf, None, SPAN_KIND_SERVER, parent_span_id=parent_span_id)
+
+    def to_ns(self, perf):
+        return self.started_ns + int((perf - self.started_perf) * 1e9)
+
+    def add_span(self, name, started, finished, kind=SPAN_KIND_INTERNAL, attributes=None, parent_span_id=None):
+        """Record a span and return it, or None once the trace holds TRACE_MAX_SPANS"""
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            return None
+        span = {
+            'name': name,
+            'span_id': secrets.token_hex(8),
+            'parent_span_id': parent_span_id if parent_span_id is not None else (
+                self.stack[-1]['span_id'] if self.stack else self.root['span_id']
+            ),
+            'kind': kind,
+            'started': started,
+            'finished': finished,
+            'attributes': attributes or {},
+            'error': None,
+        }
+        self.spans.append(span)
+        return span
+
+
+def current_trace():
+    if TRACE_FILE is None and TRACE_ENDPOINT is None:
+        return None
+    if not has_request_context():
+        return None
+    return g.get('trace')
+
+
+@contextmanager
+def span(name, kind=SPAN_KIND_INTERNAL, **attributes):
+    """Record a child span of the current request's trace (no-op when not tracing)"""
+    trace = current_trace()
+    if trace is None:
+        yield None
+        return
+    record = trace.add_span(name, time.perf_counter(), None, kind, attributes)
+    if record is None:
+        yield None
+        return
+    trace.stack.append(record)
+    try:
+        yield record
+    except Exception as e:
+        record['error'] = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        record['finished'] = time.perf_counter()
+        trace.stack.pop()
+
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def otlp_payload(trace):
+    """OTLP/JSON ExportTraceServiceRequest for one finished trace"""
+    spans = []
+    for record in trace.spans:
+        otlp_span = {
+            'traceId': trace.trace_id,
+            'spanId': record['span_id'],
+            'name': record['name'],
+            'kind': record['kind'],
+            'startTimeUnixNano': str(trace.to_ns(record['started'])),
+            'endTimeUnixNano': str(trace.to_ns(record['finished'] or record['started'])),
+            'attributes': [{'key': key, 'value': otlp_value(value)} for key, value in record['attributes'].items()],
+            'status': {'code': 2, 'message': record['error']} if record['error'] else {'code': 1},
+        }
+        if record['parent_span_id']:
+            otlp_span['parentSpanId'] = record['parent_span_id']
+        spans.append(otlp_span)
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': 'agrorent'}},
+                {'key': 'process.pid', 'value': {'intValue': str(os.getpid())}},
+            ]},
+            'scopeSpans': [{'scope': {'name': 'agrorent'}, 'spans': spans}],
+        }]
+    }
+
+
+class TraceExporter:
+    """Writes finished traces from a background thread so requests never wait on export"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.queue = queue.Queue(maxsize=1000)
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, payload):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, name='trace-exporter', daemon=True)
+                    self.thread.start()
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            pass  # drop traces rather than slow requests down
+
+    def run(self):
+        import urllib.request
+        while True:
+            body = json.dumps(self.queue.get())
+            if TRACE_FILE:
+                try:
+                    os.makedirs(os.path.dirname(os.path.abspath(TRACE_FILE)), exist_ok=True)
+                    with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+                        f.write(body + '\n')
+                except OSError as e:
+                    app.logger.warning('Could not write trace: %s', e)
+            if TRACE_ENDPOINT:
+                try:
+                    urllib.request.urlopen(urllib.request.Request(
+                        TRACE_ENDPOINT, data=body.encode(), headers={'Content-Type': 'application/json'}
+                    ), timeout=5).close()
+                except OSError as e:
+                    app.logger.warning('Could not export trace to %s: %s', TRACE_ENDPOINT, e)
+
+
+trace_exporter = TraceExporter()
+
+
+@app.before_request
+def start_trace():
+    """Continue the caller's trace from `traceparent`, or sample a new one"""
+    if TRACE_FILE is None and TRACE_ENDPOINT is None:
+        return
+    match = TRACEPARENT_PATTERN.match(request.headers.get('traceparent', ''))
+    if match and set(match.group(1)) != {'0'} and set(match.group(2)) != {'0'}:
+        if not int(match.group(3), 16) & 1:
+            return  # the caller decided not to sample this trace
+        g.trace = Trace(match.group(1), match.group(2))
+    elif random.random() < TRACE_SAMPLE_RATE:
+        g.trace = Trace(secrets.token_hex(16), '')
+
+
+@app.after_request
+def finish_trace(response):
+    """Close the server span and hand the trace to the exporter"""
+    trace = current_trace()
+    if trace is None:
+        return response
+    g.trace = None
+    finished = time.perf_counter()
+    root = trace.root
+    root['name'] = f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+    root['finished'] = finished
+    root['attributes'].update({
+        'http.method': request.method,
+        'http.route': request.url_rule.rule if request.url_rule else '',
+        'http.target': request.full_path.rstrip('?'),
+        'http.status_code': response.status_code,
+    })
+    if response.status_code >= 500:
+        root['error'] = f'HTTP {response.status_code}'
+    response.headers['X-Trace-Id'] = trace.trace_id
+    if (finished - trace.started_perf) * 1000 >= TRACE_SLOW_MS:
+        trace_exporter.submit(otlp_payload(trace))
+    return response
+
+
+# ============================================
+# Compression and streaming JSON
+# ============================================
+# Text responses of at least COMPRESS_MIN_BYTES are compressed with the best
+# encoding the client accepts (brotli when the optional `brotli` package is
+# installed, otherwise gzip). Static files are compressed once per version
+# and cached; streamed responses are compressed chunk by chunk.
+COMPRESS_MIN_BYTES = int(os.environ.get('AGRORENT_COMPRESS_MIN_BYTES', 1024))
+COMPRESS_MIMETYPES = {
+    'application/json', 'application/javascript', 'application/manifest+json',
+    'text/html', 'text/css', 'text/javascript', 'text/plain', 'image/svg+xml',
+}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # fast enough per request; static files get the maximum
+STREAM_JSON_CHUNK_BYTES = 16 * 1024
+
+
+def get_brotli():
+    """Import brotli on first use"""
+    global brotli
+    if brotli is None:
+        import brotli as brotli_module
+        brotli = brotli_module
+    return brotli
+
+
+def negotiate_encoding():
+    """Best encoding the client accepts, or None"""
+    accepted = request.accept_encodings
+    choices = [('br', accepted['br'])] if BROTLI_AVAILABLE else []
+    choices.append(('gzip', accepted['gzip']))
+    encoding, quality = max(choices, key=lambda choice: choice[1])
+    return encoding if quality > 0 else None
+
+
+def compress_bytes(data, encoding, best=False):
+    if encoding == 'br':
+        return get_brotli().compress(data, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+@lru_cache(maxsize=256)
+def compressed_static_file(filename, version, encoding):
+    """Compressed copy of a static file; the version in the key drops stale copies"""
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        return compress_bytes(f.read(), encoding, best=True)
+
+
+def compress_stream(chunks, encoding):
+    """Compress a streamed body as it is produced"""
+    if encoding == 'br':
+        compressor = get_brotli().Compressor(quality=BROTLI_QUALITY)
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        compress, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+@app.after_request
+def compress_response(response):
+    """Compress text responses for clients that accept gzip or brotli"""
+    if (
+        response.status_code != 200
+        or response.mimetype not in COMPRESS_MIMETYPES
+        or 'Content-Encoding' in response.headers
+        or request.method == 'HEAD'
+    ):
+        return response
+    if response.is_streamed and not response.direct_passthrough:
+        encoding = negotiate_encoding()
+        if encoding:
+            response.response = compress_stream(response.response, encoding)
+    elif response.direct_passthrough:
+        # send_file from the static folder: only versioned files, so the cache key is stable
+        version = request.args.get('v') if request.endpoint == 'static' else None
+        filename = (request.view_args or {}).get('filename', '')
+        if not version or version != static_version(filename) or (response.content_length or 0) < COMPRESS_MIN_BYTES:
+            return response
+        encoding = negotiate_encoding()
+        if encoding:
+            response.close()
+            response.direct_passthrough = False
+            response.set_data(compressed_static_file(filename, version, encoding))
+    else:
+        if response.content_length < COMPRESS_MIN_BYTES:
+            return response
+        encoding = negotiate_encoding()
+        if encoding:
+            response.set_data(compress_bytes(response.get_data(), encoding))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def stream_json(conn, sql, parameters, serialize):
+    """Stream a JSON array of serialize(row) straight from a cursor.
+
+    Neither the row list nor the encoded document is built in memory: rows
+    are encoded as they are fetched and sent in ~16KB chunks. The generator
+    owns `conn` and closes it when the response finishes.
+    """
+    def generate():
+        try:
+            cursor = conn.execute(sql, parameters)
+            buffer = ['[']
+            size = 1
+            separator = ''
+            for row in cursor:
+                item = separator + json.dumps(serialize(row), separators=(',', ':'))
+                separator = ','
+                buffer.append(item)
+                size += len(item)
+                if size >= STREAM_JSON_CHUNK_BYTES:
+                    yield ''.join(buffer)
+                    buffer = []
+                    size = 0
+            buffer.append(']')
+            yield ''.join(buffer)
+        finally:
+            conn.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
 # Database configuration
-DATABASE = 'agrorent.db'
+DATABASE = os.environ.get('AGRORENT_DATABASE', 'agrorent.db')
 
 def get_db():
     """Get database connection"""
-    conn = sqlite3.connect(DATABASE)
+    conn = sqlite3.connect(DATABASE, factory=InstrumentedConnection)
     conn.row_factory = sqlite3.Row
     return conn
 
+
+# Queries on hot paths are registered here so `flask check-query-plans` can
+# verify they stay index-backed as the schema changes. sample_params maps the
+# sample ids picked from a synthetic dataset to the query's parameters.
+HOT_QUERIES = {}
+
+
+def hot_query(name, sql, sample_params):
+    """Register a hot-path query for the plan check and return its SQL"""
+    HOT_QUERIES[name] = {'sql': sql, 'sample_params': sample_params}
+    return sql
+
+
+# ============================================
+# Server-side sessions
+# ============================================
+# The cookie only carries "<session id>.<version>"; session data lives in a
+# separate SQLite file with a small per-process LRU cache in front of it.
+# Every write gets a new version, so a cached entry whose version matches the
+# cookie is known to be current for that client. Entries are also re-read
+# after SESSION_CACHE_TTL seconds so that logouts in another worker win.
+SESSION_DATABASE = os.environ.get('AGRORENT_SESSION_DATABASE', os.path.join(app.instance_path, 'sessions.db'))
+SESSION_IDLE_TIMEOUT = timedelta(days=7)  # lifetime of non-permanent sessions
+SESSION_CACHE_SIZE = 2048
+SESSION_CACHE_TTL = 30  # seconds
+LISTING_DRAFT_TTL = 30 * 60  # seconds an edit_listing draft stays in the session
+
+
+class ServerSession(SecureCookieSession):
+    """Session dict that remembers its server-side id, version and expiry"""
+
+    def __init__(self, initial=None, sid=None, version=None, expires_at=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.version = version
+        self.expires_at = expires_at
+        self.retired_sid = None
+
+    def regenerate(self):
+        """Move the data to a fresh id, e.g. on sign-in and sign-out, so a planted id is useless"""
+        self.retired_sid = self.retired_sid or self.sid
+        self.sid = None
+        self.modified = True
+
+
+class SessionStore:
+    """SQLite-backed session rows with an in-memory LRU front"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.ready = False
+
+    def connect(self):
+        if not self.ready:
+            os.makedirs(os.path.dirname(SESSION_DATABASE) or '.', exist_ok=True)
+        conn = sqlite3.connect(SESSION_DATABASE, timeout=10)
+        if not self.ready:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)')
+            conn.commit()
+            self.ready = True
+        return conn
+
+    def remember(self, sid, version, data, expires_at):
+        with self.lock:
+            self.cache[sid] = (version, data, expires_at, time.monotonic())
+            self.cache.move_to_end(sid)
+            while len(self.cache) > SESSION_CACHE_SIZE:
+                self.cache.popitem(last=False)
+
+    def forget(self, sid):
+        with self.lock:
+            self.cache.pop(sid, None)
+
+    def load(self, sid, version):
+        """Return (version, serialized data, expires_at) or None if missing/expired"""
+        now = time.time()
+        with self.lock:
+            entry = self.cache.get(sid)
+            if entry is not None:
+                self.cache.move_to_end(sid)
+        if (
+            entry is not None and entry[0] == version and entry[2] > now
+            and time.monotonic() - entry[3] < SESSION_CACHE_TTL
+        ):
+            return entry[:3]
+
+        conn = self.connect()
+        try:
+            row = conn.execute(
+                'SELECT version, data, expires_at FROM sessions WHERE id = ?', (sid,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None or row[2] <= now:
+            self.forget(sid)
+            return None
+        self.remember(sid, *row)
+        return row
+
+    def save(self, sid, data, expires_at):
+        """Store session data and return its new version"""
+        version = secrets.token_hex(4)
+        conn = self.connect()
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO sessions (id, version, data, expires_at) VALUES (?, ?, ?, ?)',
+                (sid, version, data, expires_at)
+            )
+            # Sweep expired sessions now and then instead of on every write
+            if secrets.randbelow(100) == 0:
+                conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),))
+            conn.commit()
+        finally:
+            conn.close()
+        self.remember(sid, version, data, expires_at)
+        return version
+
+    def touch(self, sid, expires_at):
+        """Extend a session's expiry without changing its data or version"""
+        conn = self.connect()
+        try:
+            conn.execute('UPDATE sessions SET expires_at = ? WHERE id = ?', (expires_at, sid))
+            conn.commit()
+        finally:
+            conn.close()
+        with self.lock:
+            entry = self.cache.get(sid)
+            if entry is not None:
+                self.cache[sid] = (entry[0], entry[1], expires_at, entry[3])
+
+    def delete(self, sid):
+        conn = self.connect()
+        try:
+            conn.execute('DELETE FROM sessions WHERE id = ?', (sid,))
+            conn.commit()
+        finally:
+            conn.close()
+        self.forget(sid)
+
+    def reset(self):
+        """Drop the cache and locks inherited from a parent process"""
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+
+
+session_store = SessionStore()
+
+
+class ServerSessionInterface(SessionInterface):
+    """Keeps session data server-side and only an opaque id in the cookie"""
+
+    serializer = TaggedJSONSerializer()
+
+    def lifetime(self, app, session):
+        return app.permanent_session_lifetime if session.permanent else SESSION_IDLE_TIMEOUT
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app), '')
+        sid, _, version = cookie.partition('.')
+        if sid and version:
+            stored = session_store.load(sid, version)
+            if stored is not None:
+                stored_version, data, expires_at = stored
+                return ServerSession(self.serializer.loads(data), sid, stored_version, expires_at)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if session.retired_sid:
+            session_store.delete(session.retired_sid)
+
+        if not session:
+            if session.modified:
+                if session.sid:
+                    session_store.delete(session.sid)
+                response.delete_cookie(
+                    name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly
+                )
+                response.vary.add('Cookie')
+            return
+
+        lifetime = self.lifetime(app, session).total_seconds()
+        expires_at = time.time() + lifetime
+        if session.modified or session.sid is None:
+            session.sid = session.sid or secrets.token_urlsafe(32)
+            session.version = session_store.save(session.sid, self.serializer.dumps(dict(session)), expires_at)
+        elif session.expires_at - time.time() < lifetime / 2:
+            # Sliding expiry for sessions that are only being read
+            session_store.touch(session.sid, expires_at)
+        elif not self.should_set_cookie(app, session):
+            return
+
+        response.set_cookie(
+            name,
+            f'{session.sid}.{session.version}',
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite,
+        )
+        response.vary.add('Cookie')
+
+
+app.session_interface = ServerSessionInterface()
+
 def init_db():
     """Initialize the database with users and listings tables"""
     conn = get_db()
@@ -233,9 +1560,86 @@ def init_db():
             conn.execute('ALTER TABLE rentals ADD COLUMN location_of_use TEXT')
         if 'contract_path' not in columns:
             conn.execute('ALTER TABLE rentals ADD COLUMN contract_path TEXT')
+        if 'booking_group_id' not in columns:
+            conn.execute('ALTER TABLE rentals ADD COLUMN booking_group_id INTEGER REFERENCES booking_groups(id)')
     except sqlite3.OperationalError:
         pass
 
+    # Several machines requested together from the booking cart
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS booking_groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            total_amount REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+    # Renters queued for dates that are already booked (see promote_waitlist)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS waitlist_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            listing_id INTEGER NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            days INTEGER NOT NULL,
+            renter_address TEXT,
+            location_of_use TEXT,
+            status TEXT DEFAULT 'Waiting',
+            rental_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (listing_id) REFERENCES listings(id),
+            FOREIGN KEY (rental_id) REFERENCES rentals(id)
+        )
+    ''')
+
+    # Renters' saved searches, bucketed by category and district (see match_saved_searches).
+    # Text predicates are stored lower-cased; '' means "any".
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS saved_searches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            category TEXT NOT NULL DEFAULT '',
+            district TEXT NOT NULL DEFAULT '',
+            state TEXT NOT NULL DEFAULT '',
+            price_min REAL,
+            price_max REAL,
+            date_from DATE,
+            date_to DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    # Listings each renter has already been notified about, and the search
+    # that matched first. Keyed per renter, so a second search of theirs
+    # matching the listing (say after an edit) doesn't notify them again.
+    saved_search_matches_sql = '''
+        CREATE TABLE IF NOT EXISTS saved_search_matches (
+            user_id INTEGER NOT NULL,
+            listing_id INTEGER NOT NULL,
+            saved_search_id INTEGER NOT NULL,
+            matched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, listing_id)
+        )
+    '''
+    conn.execute(saved_search_matches_sql)
+    # Databases from before matches were per renter kept one row per search
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(saved_search_matches)').fetchall()]
+    if 'user_id' not in columns:
+        conn.execute('ALTER TABLE saved_search_matches RENAME TO saved_search_matches_by_search')
+        conn.execute(saved_search_matches_sql)
+        conn.execute('''
+            INSERT OR IGNORE INTO saved_search_matches (user_id, listing_id, saved_search_id, matched_at)
+            SELECT s.user_id, m.listing_id, m.saved_search_id, m.matched_at
+            FROM saved_search_matches_by_search m
+            JOIN saved_searches s ON s.id = m.saved_search_id
+            ORDER BY m.matched_at
+        ''')
+        conn.execute('DROP TABLE saved_search_matches_by_search')
+
     # Mechanics table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS mechanics (
@@ -308,23 +1712,232 @@ def init_db():
     except sqlite3.OperationalError:
         pass
     
-    conn.commit()
-    conn.close()
-
-# Initialize database on startup
-init_db()
+    # Change sequence for delta sync (/api/listings/changes). Every insert or
+    # update of a listing takes the next value of a single counter, and
+    # deleting a listing leaves a tombstone with its own sequence number, so
+    # a client holding sequence N only needs the rows and tombstones above N.
+    # The triggers keep this true for every writer, including seed-data.
+    try:
+        cursor = conn.execute("PRAGMA table_info(listings)")
+        columns = [row[1] for row in cursor.fetchall()]
+        if 'change_seq' not in columns:
+            conn.execute('ALTER TABLE listings ADD COLUMN change_seq INTEGER')
+            conn.execute('UPDATE listings SET change_seq = id')
+    except sqlite3.OperationalError:
+        pass
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_sequences (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO change_sequences (name, value)
+        SELECT 'listings', COALESCE(MAX(change_seq), 0) FROM listings
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS listing_tombstones (
+            listing_id INTEGER PRIMARY KEY,
+            change_seq INTEGER NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS listings_change_seq_insert AFTER INSERT ON listings
+        BEGIN
+            UPDATE change_sequences SET value = value + 1 WHERE name = 'listings';
+            UPDATE listings SET change_seq = (SELECT value FROM change_sequences WHERE name = 'listings')
+            WHERE id = NEW.id;
+        END
+    ''')
+    # The WHEN clause stops the trigger's own UPDATE from re-firing it if
+    # recursive_triggers is ever enabled
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS listings_change_seq_update AFTER UPDATE ON listings
+        WHEN NEW.change_seq IS OLD.change_seq
+        BEGIN
+            UPDATE change_sequences SET value = value + 1 WHERE name = 'listings';
+            UPDATE listings SET change_seq = (SELECT value FROM change_sequences WHERE name = 'listings')
+            WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS listings_change_seq_delete AFTER DELETE ON listings
+        BEGIN
+            UPDATE change_sequences SET value = value + 1 WHERE name = 'listings';
+            INSERT OR REPLACE INTO listing_tombstones (listing_id, change_seq)
+            VALUES (OLD.id, (SELECT value FROM change_sequences WHERE name = 'listings'));
+        END
+    ''')
 
-# Add default listings if database is empty
-def add_default_listings():
-    """Add sample listings if database is empty"""
-    conn = get_db()
-    existing_listings = conn.execute('SELECT COUNT(*) as count FROM listings').fetchone()
-    existing_users = conn.execute('SELECT COUNT(*) as count FROM users').fetchone()
-    
-    # Only add default listings if listings table is empty and at least one user exists
-    if existing_listings['count'] == 0 and existing_users['count'] > 0:
-        # Get first user ID
-        first_user = conn.execute('SELECT id FROM users LIMIT 1').fetchone()
+    # Materialised market aggregates for /api/market/stats (see refresh_market_stats).
+    # The triggers below queue the groups a write touches in market_dirty.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS market_price_stats (
+            category TEXT NOT NULL,
+            district TEXT NOT NULL,
+            pricing_type TEXT NOT NULL,
+            listings INTEGER NOT NULL,
+            median_price REAL NOT NULL,
+            min_price REAL NOT NULL,
+            max_price REAL NOT NULL,
+            PRIMARY KEY (category, district, pricing_type)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS market_listing_utilisation (
+            listing_id INTEGER PRIMARY KEY,
+            rentals INTEGER NOT NULL,
+            booked_days INTEGER NOT NULL,
+            utilisation REAL NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS market_weekly_demand (
+            week_start DATE PRIMARY KEY,
+            requests INTEGER NOT NULL,
+            confirmed INTEGER NOT NULL,
+            booked_days INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS market_equipment_stats (
+            category TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            equipment_name TEXT NOT NULL,
+            rentals INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (category, brand, equipment_name)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS market_dirty (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            PRIMARY KEY (scope, key)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS market_meta (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS market_listings_insert AFTER INSERT ON listings
+        BEGIN
+            INSERT OR IGNORE INTO market_dirty VALUES ('price', json_array(NEW.category, NEW.district, NEW.pricing_type));
+            INSERT OR IGNORE INTO market_dirty VALUES ('listing', NEW.id);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS market_listings_update
+        AFTER UPDATE OF category, district, pricing_type, price, brand, equipment_name ON listings
+        BEGIN
+            INSERT OR IGNORE INTO market_dirty VALUES ('price', json_array(OLD.category, OLD.district, OLD.pricing_type));
+            INSERT OR IGNORE INTO market_dirty VALUES ('price', json_array(NEW.category, NEW.district, NEW.pricing_type));
+            INSERT OR IGNORE INTO market_dirty VALUES ('equipment', json_array(OLD.category, OLD.brand, OLD.equipment_name));
+            INSERT OR IGNORE INTO market_dirty VALUES ('equipment', json_array(NEW.category, NEW.brand, NEW.equipment_name));
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS market_listings_delete AFTER DELETE ON listings
+        BEGIN
+            INSERT OR IGNORE INTO market_dirty VALUES ('price', json_array(OLD.category, OLD.district, OLD.pricing_type));
+            INSERT OR IGNORE INTO market_dirty VALUES ('equipment', json_array(OLD.category, OLD.brand, OLD.equipment_name));
+            INSERT OR IGNORE INTO market_dirty VALUES ('listing', OLD.id);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS market_rentals_insert AFTER INSERT ON rentals
+        BEGIN
+            INSERT OR IGNORE INTO market_dirty VALUES ('listing', NEW.listing_id);
+            INSERT OR IGNORE INTO market_dirty VALUES ('week', date(NEW.start_date, '-6 days', 'weekday 1'));
+            INSERT OR IGNORE INTO market_dirty
+            SELECT 'equipment', json_array(category, brand, equipment_name) FROM listings WHERE id = NEW.listing_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS market_rentals_update
+        AFTER UPDATE OF status, listing_id, start_date, end_date, days, total_amount ON rentals
+        BEGIN
+            INSERT OR IGNORE INTO market_dirty VALUES ('listing', OLD.listing_id);
+            INSERT OR IGNORE INTO market_dirty VALUES ('listing', NEW.listing_id);
+            INSERT OR IGNORE INTO market_dirty VALUES ('week', date(OLD.start_date, '-6 days', 'weekday 1'));
+            INSERT OR IGNORE INTO market_dirty VALUES ('week', date(NEW.start_date, '-6 days', 'weekday 1'));
+            INSERT OR IGNORE INTO market_dirty
+            SELECT 'equipment', json_array(category, brand, equipment_name) FROM listings WHERE id IN (OLD.listing_id, NEW.listing_id);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS market_rentals_delete AFTER DELETE ON rentals
+        BEGIN
+            INSERT OR IGNORE INTO market_dirty VALUES ('listing', OLD.listing_id);
+            INSERT OR IGNORE INTO market_dirty VALUES ('week', date(OLD.start_date, '-6 days', 'weekday 1'));
+            INSERT OR IGNORE INTO market_dirty
+            SELECT 'equipment', json_array(category, brand, equipment_name) FROM listings WHERE id = OLD.listing_id;
+        END
+    ''')
+
+    # Last Gemini condition analysis per listing, valid while the main image is unchanged
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS condition_analyses (
+            listing_id INTEGER PRIMARY KEY,
+            main_image TEXT NOT NULL,
+            result TEXT NOT NULL,
+            analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (listing_id) REFERENCES listings(id)
+        )
+    ''')
+
+    # Stored responses for requests sent with an Idempotency-Key header
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            user_id INTEGER NOT NULL,
+            idempotency_key TEXT NOT NULL,
+            request_hash TEXT NOT NULL,
+            status INTEGER,
+            headers TEXT,
+            body BLOB,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (user_id, idempotency_key)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at)')
+
+    # Indexes for the hot queries (see HOT_QUERIES and `flask check-query-plans`)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_rentals_listing_status ON rentals(listing_id, status, start_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_rentals_user_created ON rentals(user_id, created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_rentals_booking_group ON rentals(booking_group_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_waitlist_listing_range ON waitlist_entries(listing_id, status, start_date, end_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_waitlist_user ON waitlist_entries(user_id, created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_saved_searches_bucket ON saved_searches(category, district)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_saved_searches_user ON saved_searches(user_id)')
+    # Per-group recomputation in refresh_market_stats
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_listings_market_price ON listings(category, district, pricing_type, price)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_listings_equipment ON listings(category, brand, equipment_name)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_rentals_start ON rentals(start_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_notifications_user_read ON notifications(user_id, is_read)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_listings_change_seq ON listings(change_seq)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_listings_user ON listings(user_id)')
+    # Lets /api/listings stream rows in order instead of sorting the whole table first
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_listings_created ON listings(created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_listing_tombstones_change_seq ON listing_tombstones(change_seq)')
+    
+    conn.commit()
+    conn.close()
+
+# Add default listings if database is empty
+def add_default_listings():
+    """Add sample listings if database is empty"""
+    conn = get_db()
+    existing_listings = conn.execute('SELECT COUNT(*) as count FROM listings').fetchone()
+    existing_users = conn.execute('SELECT COUNT(*) as count FROM users').fetchone()
+    
+    # Only add default listings if listings table is empty and at least one user exists
+    if existing_listings['count'] == 0 and existing_users['count'] > 0:
+        # Get first user ID
+        first_user = conn.execute('SELECT id FROM users LIMIT 1').fetchone()
         user_id = first_user['id'] if first_user else 1
         # Sample listings data
         sample_listings = [
@@ -539,8 +2152,35 @@ def add_default_listings():
         conn.commit()
     conn.close()
 
-# Add default listings on startup (only if empty)
-add_default_listings()
+
+database_ready = False
+database_lock = threading.Lock()
+
+
+def ensure_database():
+    """Create tables and add sample listings once per process, on first use"""
+    global database_ready
+    if database_ready:
+        return
+    with database_lock:
+        if not database_ready:
+            init_db()
+            add_default_listings()
+            database_ready = True
+
+
+@app.before_request
+def prepare_database():
+    """Make sure the schema exists before the first request is handled"""
+    ensure_database()
+
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the database tables and add the sample listings"""
+    init_db()
+    add_default_listings()
+    click.echo(f'Initialised database {DATABASE}')
 
 def login_required(f):
     """Decorator to require login for protected routes"""
@@ -553,18 +2193,232 @@ def login_required(f):
     return decorated_function
 
 
+# Comma-separated emails of users allowed to see the diagnostics pages
+ADMIN_EMAILS = {
+    email.strip().lower() for email in os.environ.get('AGRORENT_ADMIN_EMAILS', '').split(',') if email.strip()
+}
+
+
+def is_admin():
+    """Whether the signed-in user is listed in AGRORENT_ADMIN_EMAILS"""
+    return session.get('user_email', '').lower() in ADMIN_EMAILS
+
+
+def admin_required(f):
+    """Decorator to restrict a route to administrators"""
+    @wraps(f)
+    @login_required
+    def decorated_function(*args, **kwargs):
+        if not is_admin():
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@app.route('/admin/queries')
+@admin_required
+def admin_queries():
+    """Per-request SQL waterfall for the most recent requests served by this worker"""
+    return render_template(
+        'admin_queries.html',
+        profiles=list(reversed(query_profiles)),
+        slow_query_ms=SLOW_QUERY_MS,
+        repeated_threshold=REPEATED_QUERY_THRESHOLD,
+        pid=os.getpid()
+    )
+
+
+# Live profiling. Both tools act on the worker process that serves the
+# request; the responses include its pid.
+PROFILE_MAX_SECONDS = 60
+PROFILE_MAX_RATE = 1000  # samples per second
+ALLOCATION_TOP = 25
+
+profiler_lock = threading.Lock()
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def sample_stacks(seconds, rate, exclude=()):
+    """Sample every thread's stack; return {collapsed stack: samples} and the sample count"""
+    counts = {}
+    samples = 0
+    interval = 1.0 / rate
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident in exclude:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f'thread-{ident}'))
+            key = ';'.join(reversed(stack))
+            counts[key] = counts.get(key, 0) + 1
+        samples += 1
+        time.sleep(interval)
+    return counts, samples
+
+
+@app.route('/admin/profile', methods=['POST'])
+@admin_required
+def admin_profile():
+    """Sample this worker's stacks for a few seconds and return a collapsed-stack (flamegraph) file"""
+    try:
+        seconds = min(float(request.values.get('seconds', 10)), PROFILE_MAX_SECONDS)
+        rate = min(max(int(request.values.get('rate', 100)), 1), PROFILE_MAX_RATE)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'seconds and rate must be numbers'}), 400
+    if not profiler_lock.acquire(blocking=False):
+        return jsonify({'success': False, 'message': 'A profile is already running on this worker'}), 409
+    try:
+        counts, samples = sample_stacks(seconds, rate, exclude={threading.get_ident()})
+    finally:
+        profiler_lock.release()
+    body = ''.join(f'{stack} {count}\n' for stack, count in sorted(counts.items()))
+    response = Response(body, mimetype='text/plain')
+    response.headers['Content-Disposition'] = (
+        f"attachment; filename=profile-{os.getpid()}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded"
+    )
+    response.headers['X-Profile-Samples'] = str(samples)
+    response.headers['X-Profile-Pid'] = str(os.getpid())
+    return response
+
+
+class AllocationTracker:
+    """Diff tracemalloc snapshots taken before and after the next N requests"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.active = False
+        self.endpoint = None
+        self.remaining = 0
+        self.requests = 0
+        self.frames = 1
+        self.baseline = None
+        self.started_at = None
+        self.report = None
+
+    def start(self, requests, endpoint=None, frames=1):
+        import tracemalloc
+        with self.lock:
+            if self.active:
+                return False
+            self.endpoint = endpoint
+            self.remaining = requests
+            self.requests = requests
+            self.frames = frames
+            self.report = None
+            self.started_at = datetime.now().isoformat(timespec='seconds')
+            tracemalloc.start(frames)
+            self.baseline = tracemalloc.take_snapshot()
+            self.active = True
+            return True
+
+    def record(self, endpoint):
+        """Count a finished request; take the second snapshot after the last one"""
+        if not self.active or endpoint == 'admin_allocations' or (self.endpoint and endpoint != self.endpoint):
+            return
+        with self.lock:
+            if not self.active:
+                return
+            self.remaining -= 1
+            if self.remaining > 0:
+                return
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self.active = False
+            ignored = [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, '<unknown>'),
+            ]
+            key_type = 'traceback' if self.frames > 1 else 'lineno'
+            stats = snapshot.filter_traces(ignored).compare_to(self.baseline.filter_traces(ignored), key_type)
+            self.baseline = None
+            self.report = [
+                {
+                    'size_diff_bytes': stat.size_diff,
+                    'count_diff': stat.count_diff,
+                    'size_bytes': stat.size,
+                    'count': stat.count,
+                    'traceback': [f'{frame.filename}:{frame.lineno}' for frame in stat.traceback],
+                }
+                for stat in stats[:ALLOCATION_TOP]
+            ]
+
+    def status(self):
+        return {
+            'pid': os.getpid(),
+            'active': self.active,
+            'endpoint': self.endpoint,
+            'requests': self.requests,
+            'remaining': self.remaining if self.active else 0,
+            'started_at': self.started_at,
+            'report': self.report,
+        }
+
+
+allocation_tracker = AllocationTracker()
+
+
+@app.after_request
+def track_allocations(response):
+    """Feed finished requests to a running allocation diff"""
+    allocation_tracker.record(request.endpoint)
+    return response
+
+
+@app.route('/admin/allocations', methods=['GET', 'POST'])
+@admin_required
+def admin_allocations():
+    """POST starts a tracemalloc diff over the next N requests; GET returns its status and report"""
+    if request.method == 'GET':
+        return jsonify(allocation_tracker.status())
+    try:
+        requests_to_track = max(int(request.values.get('requests', 50)), 1)
+        frames = min(max(int(request.values.get('frames', 1)), 1), 25)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'requests and frames must be numbers'}), 400
+    endpoint = request.values.get('endpoint') or None
+    if endpoint and endpoint not in app.view_functions:
+        return jsonify({'success': False, 'message': f'Unknown endpoint {endpoint}'}), 400
+    if not allocation_tracker.start(requests_to_track, endpoint, frames):
+        return jsonify({'success': False, 'message': 'An allocation diff is already running on this worker'}), 409
+    return jsonify({'success': True, **allocation_tracker.status()})
+
+
 @app.route('/set_language/<lang_code>')
 def set_language(lang_code):
     """Update preferred language for the active session"""
     next_url = request.referrer or url_for('index')
+    wants_json = request.accept_mimetypes.best == 'application/json'
     if lang_code in SUPPORTED_LANGUAGES:
         session['lang'] = lang_code
         g.current_locale = lang_code
+        if wants_json:
+            # i18n.js switches client-rendered text itself, no page reload needed
+            return jsonify({
+                'success': True,
+                'locale': lang_code,
+                'bundle': translation_bundle_url(lang_code)
+            })
         flash(
             translate_text('alerts.language_changed', locale=lang_code, language=LANGUAGE_NAMES[lang_code]),
             'success'
         )
     else:
+        if wants_json:
+            return jsonify({'success': False, 'message': translate_text('alerts.language_invalid')}), 400
         flash(translate_text('alerts.language_invalid'), 'warning')
     return redirect(next_url)
 
@@ -584,6 +2438,677 @@ def market():
     """Market overview page"""
     return render_template('market.html')
 
+
+# ============================================
+# Market analytics
+# ============================================
+# Aggregates for /market live in the market_* tables. Triggers on listings
+# and rentals queue the groups a write touches in market_dirty, and
+# refresh_market_stats recomputes just those groups with indexed queries.
+# Utilisation is measured over a window ending today, so the first refresh of
+# each day rebuilds everything. Refreshes take SQLite's write lock, so they
+# run from `flask refresh-market-stats` (cron) and from a background thread
+# every MARKET_REFRESH_INTERVAL seconds, never on a request: /api/market/stats
+# only reads the tables, and serves a per-process copy for MARKET_STATS_TTL
+# seconds.
+
+MARKET_STATS_TTL = int(os.environ.get('AGRORENT_MARKET_STATS_TTL', 60))
+MARKET_REFRESH_INTERVAL = int(os.environ.get('AGRORENT_MARKET_REFRESH_INTERVAL', 60))
+MARKET_UTILISATION_DAYS = 90
+MARKET_DEMAND_WEEKS = 12  # weeks of demand shown before the current one
+MARKET_CONFIRMED = ('Approved', 'Active')
+
+market_stats_cache = {'payload': None, 'expires_at': 0.0}
+
+
+def median(values):
+    """Median of a non-empty sorted list"""
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def utilisation_window():
+    today = datetime.now().date()
+    return (today - timedelta(days=MARKET_UTILISATION_DAYS - 1)).strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d')
+
+
+def booked_days_in_window(ranges, window_start, window_end):
+    """Distinct days covered by (start, end) ranges sorted by start, clipped to the window"""
+    first = datetime.strptime(window_start, '%Y-%m-%d').date()
+    last = datetime.strptime(window_end, '%Y-%m-%d').date()
+    days = 0
+    for start, end in merge_date_intervals(ranges):
+        start = max(datetime.strptime(start, '%Y-%m-%d').date(), first)
+        end = min(datetime.strptime(end, '%Y-%m-%d').date(), last)
+        if end >= start:
+            days += (end - start).days + 1
+    return days
+
+
+def confirmed_ranges_by_listing(conn, window, listing_ids=None):
+    """Confirmed (start, end) ranges overlapping the window, per listing and sorted by start"""
+    query = '''
+        SELECT listing_id, start_date, end_date FROM rentals
+        WHERE status IN ('Approved', 'Active') AND start_date <= ? AND end_date >= ?
+    '''
+    params = [window[1], window[0]]
+    if listing_ids is not None:
+        query += f" AND listing_id IN ({','.join('?' * len(listing_ids))})"
+        params.extend(listing_ids)
+    ranges = {}
+    for rental in conn.execute(query + ' ORDER BY listing_id, start_date', params).fetchall():
+        ranges.setdefault(rental['listing_id'], []).append((rental['start_date'], rental['end_date']))
+    return ranges
+
+
+def price_stats_row(key, prices):
+    """market_price_stats row for one (category, district, pricing_type) and its sorted prices"""
+    return (*key, len(prices), median(prices), prices[0], prices[-1])
+
+
+def listing_utilisation_row(listing_id, ranges, window):
+    """market_listing_utilisation row for one listing's confirmed (start, end) ranges"""
+    booked = booked_days_in_window(ranges, *window)
+    return (listing_id, len(ranges), booked, booked / MARKET_UTILISATION_DAYS)
+
+
+def rebuild_market_stats(conn):
+    """Recompute every market table from listings and rentals"""
+    for table in ('market_price_stats', 'market_listing_utilisation', 'market_weekly_demand', 'market_equipment_stats'):
+        conn.execute(f'DELETE FROM {table}')
+
+    rows = conn.execute('''
+        SELECT category, district, pricing_type, price FROM listings
+        ORDER BY category, district, pricing_type, price
+    ''').fetchall()
+    conn.executemany('INSERT INTO market_price_stats VALUES (?, ?, ?, ?, ?, ?, ?)', [
+        price_stats_row(key, [row['price'] for row in group])
+        for key, group in itertools.groupby(rows, key=lambda row: (row['category'], row['district'], row['pricing_type']))
+    ])
+
+    window = utilisation_window()
+    listing_ids = [listing['id'] for listing in conn.execute('SELECT id FROM listings').fetchall()]
+    ranges = confirmed_ranges_by_listing(conn, window)
+    conn.executemany('INSERT INTO market_listing_utilisation VALUES (?, ?, ?, ?)', [
+        listing_utilisation_row(listing_id, ranges.get(listing_id, []), window) for listing_id in listing_ids
+    ])
+
+    conn.execute('''
+        INSERT INTO market_weekly_demand
+        SELECT date(start_date, '-6 days', 'weekday 1'), COUNT(*),
+               SUM(status IN ('Approved', 'Active')),
+               SUM(CASE WHEN status IN ('Approved', 'Active') THEN days ELSE 0 END)
+        FROM rentals
+        GROUP BY 1
+    ''')
+    conn.execute('''
+        INSERT INTO market_equipment_stats
+        SELECT l.category, l.brand, l.equipment_name, COUNT(*), SUM(r.total_amount)
+        FROM rentals r
+        JOIN listings l ON r.listing_id = l.id
+        WHERE r.status IN ('Approved', 'Active')
+        GROUP BY l.category, l.brand, l.equipment_name
+    ''')
+    return len(listing_ids)
+
+
+def refresh_market_group(conn, scope, key, window):
+    """Recompute the aggregate row(s) for one group queued in market_dirty"""
+    if scope == 'price':
+        key = tuple(json.loads(key))
+        prices = [row['price'] for row in conn.execute('''
+            SELECT price FROM listings WHERE category IS ? AND district IS ? AND pricing_type IS ?
+            ORDER BY price
+        ''', key).fetchall()]
+        if prices:
+            conn.execute('INSERT OR REPLACE INTO market_price_stats VALUES (?, ?, ?, ?, ?, ?, ?)', price_stats_row(key, prices))
+        else:
+            conn.execute('DELETE FROM market_price_stats WHERE category IS ? AND district IS ? AND pricing_type IS ?', key)
+    elif scope == 'listing':
+        if conn.execute('SELECT 1 FROM listings WHERE id = ?', (key,)).fetchone():
+            ranges = confirmed_ranges_by_listing(conn, window, [int(key)])
+            conn.execute(
+                'INSERT OR REPLACE INTO market_listing_utilisation VALUES (?, ?, ?, ?)',
+                listing_utilisation_row(int(key), ranges.get(int(key), []), window)
+            )
+        else:
+            conn.execute('DELETE FROM market_listing_utilisation WHERE listing_id = ?', (key,))
+    elif scope == 'week':
+        row = conn.execute('''
+            SELECT COUNT(*) AS requests,
+                   SUM(status IN ('Approved', 'Active')) AS confirmed,
+                   SUM(CASE WHEN status IN ('Approved', 'Active') THEN days ELSE 0 END) AS booked_days
+            FROM rentals
+            WHERE start_date BETWEEN ? AND date(?, '+6 days')
+        ''', (key, key)).fetchone()
+        if row['requests']:
+            conn.execute(
+                'INSERT OR REPLACE INTO market_weekly_demand VALUES (?, ?, ?, ?)',
+                (key, row['requests'], row['confirmed'], row['booked_days'])
+            )
+        else:
+            conn.execute('DELETE FROM market_weekly_demand WHERE week_start = ?', (key,))
+    elif scope == 'equipment':
+        key = tuple(json.loads(key))
+        row = conn.execute('''
+            SELECT COUNT(r.id) AS rentals, SUM(r.total_amount) AS revenue
+            FROM listings l
+            JOIN rentals r ON r.listing_id = l.id AND r.status IN ('Approved', 'Active')
+            WHERE l.category IS ? AND l.brand IS ? AND l.equipment_name IS ?
+        ''', key).fetchone()
+        if row['rentals']:
+            conn.execute('INSERT OR REPLACE INTO market_equipment_stats VALUES (?, ?, ?, ?, ?)', (*key, row['rentals'], row['revenue']))
+        else:
+            conn.execute(
+                'DELETE FROM market_equipment_stats WHERE category IS ? AND brand IS ? AND equipment_name IS ?', key
+            )
+
+
+def refresh_market_stats(conn, full=False):
+    """Bring the market tables up to date; returns (groups recomputed, whether it was a full rebuild)"""
+    today = datetime.now().strftime('%Y-%m-%d')
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        built_on = conn.execute("SELECT value FROM market_meta WHERE name = 'built_on'").fetchone()
+        full = full or not built_on or built_on['value'] != today
+        if full:
+            conn.execute('DELETE FROM market_dirty')
+            with span('market.rebuild'):
+                groups = rebuild_market_stats(conn)
+            conn.execute("INSERT OR REPLACE INTO market_meta VALUES ('built_on', ?)", (today,))
+        else:
+            dirty = conn.execute('DELETE FROM market_dirty RETURNING scope, key').fetchall()
+            window = utilisation_window()
+            for row in dirty:
+                refresh_market_group(conn, row['scope'], row['key'], window)
+            groups = len(dirty)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    metrics.inc('agrorent_market_refresh_groups_total', groups, kind='full' if full else 'incremental')
+    return groups, full
+
+
+class MarketRefresher:
+    """Refreshes the market tables from a background thread so readers never take the write lock"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, name='market-refresher', daemon=True)
+                    self.thread.start()
+
+    def run(self):
+        while True:
+            conn = get_db()
+            try:
+                _, rebuilt = refresh_market_stats(conn)
+                if rebuilt:
+                    # The cached payload was read before the window moved
+                    market_stats_cache['expires_at'] = 0.0
+            except Exception as e:
+                app.logger.warning('Could not refresh market stats: %s', e)
+            finally:
+                conn.close()
+            time.sleep(MARKET_REFRESH_INTERVAL)
+
+
+market_refresher = MarketRefresher()
+
+
+def market_stats():
+    """Read the payload for /api/market/stats from the market tables"""
+    conn = get_db()
+    try:
+        window = utilisation_window()
+        today = datetime.now().date()
+        this_week = today - timedelta(days=today.weekday())
+        first_week = (this_week - timedelta(weeks=MARKET_DEMAND_WEEKS)).strftime('%Y-%m-%d')
+
+        totals = conn.execute('''
+            SELECT COUNT(*) AS listings, AVG(u.utilisation) AS utilisation, SUM(u.rentals > 0) AS rented_listings
+            FROM market_listing_utilisation u
+        ''').fetchone()
+        prices = conn.execute('''
+            SELECT * FROM market_price_stats
+            ORDER BY category, listings DESC, district
+        ''').fetchall()
+        busiest = conn.execute('''
+            SELECT u.listing_id, u.rentals, u.booked_days, u.utilisation, l.title, l.category, l.district
+            FROM market_listing_utilisation u
+            JOIN listings l ON l.id = u.listing_id
+            ORDER BY u.utilisation DESC, u.rentals DESC
+            LIMIT 10
+        ''').fetchall()
+        demand = conn.execute(
+            'SELECT * FROM market_weekly_demand WHERE week_start BETWEEN ? AND ? ORDER BY week_start',
+            (first_week, this_week.strftime('%Y-%m-%d'))
+        ).fetchall()
+        equipment = conn.execute('''
+            SELECT * FROM market_equipment_stats
+            ORDER BY rentals DESC, revenue DESC
+            LIMIT 10
+        ''').fetchall()
+    finally:
+        conn.close()
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'utilisation_window': {'start': window[0], 'end': window[1]},
+        'totals': {
+            'listings': totals['listings'],
+            'rented_listings': totals['rented_listings'] or 0,
+            'average_utilisation': round(totals['utilisation'] or 0, 4)
+        },
+        'median_prices': [{
+            'category': row['category'],
+            'district': row['district'],
+            'pricing_type': row['pricing_type'],
+            'listings': row['listings'],
+            'median_price': row['median_price'],
+            'min_price': row['min_price'],
+            'max_price': row['max_price']
+        } for row in prices],
+        'utilisation': [{
+            'listing_id': row['listing_id'],
+            'title': row['title'],
+            'category': row['category'],
+            'district': row['district'],
+            'rentals': row['rentals'],
+            'booked_days': row['booked_days'],
+            'utilisation': round(row['utilisation'], 4)
+        } for row in busiest],
+        'weekly_demand': [{
+            'week_start': row['week_start'],
+            'requests': row['requests'],
+            'confirmed': row['confirmed'],
+            'booked_days': row['booked_days']
+        } for row in demand],
+        'top_equipment': [{
+            'category': row['category'],
+            'brand': row['brand'],
+            'equipment_name': row['equipment_name'],
+            'rentals': row['rentals'],
+            'revenue': row['revenue']
+        } for row in equipment]
+    }
+
+
+def cached_market_stats():
+    """The market payload, recomputed at most once per MARKET_STATS_TTL per process"""
+    market_refresher.ensure_started()
+    now = time.monotonic()
+    if market_stats_cache['payload'] is None or now >= market_stats_cache['expires_at']:
+        market_stats_cache['payload'] = single_flight.do('market_stats', None, market_stats)
+        market_stats_cache['expires_at'] = time.monotonic() + MARKET_STATS_TTL
+    return market_stats_cache['payload']
+
+
+@app.route('/api/market/stats')
+def get_market_stats():
+    """Marketplace aggregates: median prices, utilisation, weekly demand, top equipment"""
+    response = jsonify(cached_market_stats())
+    response.add_etag()
+    response.headers['Cache-Control'] = f'public, max-age={MARKET_STATS_TTL}'
+    return response.make_conditional(request)
+
+
+@app.cli.command('refresh-market-stats')
+@click.option('--full/--incremental', default=False, help='Rebuild every aggregate instead of only the changed groups.')
+def refresh_market_stats_command(full):
+    """Refresh the materialised market analytics tables (for cron)"""
+    init_db()
+    conn = get_db()
+    try:
+        groups, rebuilt = refresh_market_stats(conn, full=full)
+    finally:
+        conn.close()
+    click.echo(f"{'Rebuilt' if rebuilt else 'Refreshed'} {groups} market aggregate groups")
+
+
+# ============================================
+# In-process listing indexes
+# ============================================
+# The chatbot's ListingIndex and the PriceIndex keep one NumPy row per listing
+# in each worker. A worker patches its own index in place when it writes a
+# listing or a rental; writes made by other workers are picked up by the full
+# rebuild once the index is INDEX_MAX_AGE old.
+INDEX_MAX_AGE = 300  # seconds
+
+
+class ListingRows:
+    """Listing id to row slots for an in-process index.
+
+    Rows are reused through a free list and the arrays grow by doubling, so a
+    listing can be added, replaced or removed without reshaping. Subclasses
+    keep their own per-row storage in step in _grow_rows, _clear_row and
+    _fill_row.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.row_ids = []
+        self.rows = {}
+        self.free_rows = []
+        self.built_at = None
+        self.build_seconds = 0.0
+
+    def _grow_rows(self, extra):
+        """Extend per-row storage by extra empty rows"""
+
+    def _clear_row(self, row, listing_id):
+        """Forget what a removed listing stored in its row"""
+
+    def _fill_row(self, row, listing, *values):
+        """Store a listing in a free row"""
+
+    def _grow(self):
+        capacity = max(16, len(self.row_ids) * 2)
+        extra = capacity - len(self.row_ids)
+        self._grow_rows(extra)
+        self.free_rows.extend(range(len(self.row_ids) + extra - 1, len(self.row_ids) - 1, -1))
+        self.row_ids.extend([None] * extra)
+
+    def _remove(self, listing_id):
+        row = self.rows.pop(listing_id, None)
+        if row is None:
+            return
+        self._clear_row(row, listing_id)
+        self.row_ids[row] = None
+        self.free_rows.append(row)
+
+    def _add(self, listing, *values):
+        self._remove(listing['id'])
+        if not self.free_rows:
+            self._grow()
+        row = self.free_rows.pop()
+        self._fill_row(row, listing, *values)
+        self.row_ids[row] = listing['id']
+        self.rows[listing['id']] = row
+
+    def _rebuild(self, entries):
+        """Replace the whole index with (listing, *values) entries"""
+        started = time.perf_counter()
+        with self.lock:
+            self.reset()
+            for entry in entries:
+                self._add(*entry)
+            self.built_at = time.time()
+            self.build_seconds = time.perf_counter() - started
+
+    def upsert(self, listing, *values):
+        with self.lock:
+            if self.built_at is not None:
+                self._add(listing, *values)
+
+    def remove(self, listing_id):
+        with self.lock:
+            if self.built_at is not None:
+                self._remove(listing_id)
+
+    def is_stale(self):
+        return self.built_at is None or time.time() - self.built_at > INDEX_MAX_AGE
+
+
+# ============================================
+# Price suggestions
+# ============================================
+# /api/price-suggestion is called as an owner fills in the listing form, so it
+# answers from an in-process PriceIndex instead of querying listings and
+# rentals. Each listing is one NumPy row of integer codes for its comparables
+# key (category, brand, power band, district, pricing type) plus its price and
+# utilisation over the market window. A suggestion narrows to the most specific
+# group with enough comparables and takes percentiles of their prices.
+
+PRICE_MIN_COMPARABLES = 5
+PRICE_TARGET_UTILISATION = 0.5  # comparables this busy support asking the upper quartile
+POWER_BANDS = (10, 20, 35, 50, 75, 100, 200)  # HP band edges
+PRICE_KEY_FIELDS = ('category', 'brand', 'power_band', 'district', 'pricing_type')
+ANY_VALUE = -1  # query code for a field the owner has not filled in
+UNKNOWN_VALUE = -2  # query code for a value no listing has
+
+# Comparables groups tried in order, most specific first; category and pricing
+# type always have to match
+PRICE_COMPARABLE_LEVELS = (
+    ('brand', 'power_band', 'district'),
+    ('power_band', 'district'),
+    ('brand', 'power_band'),
+    ('district',),
+    ('power_band',),
+    (),
+)
+
+
+def power_band(power_spec):
+    """Band of a power_spec such as '65 HP' or '30 kW' in POWER_BANDS, or None without a rating"""
+    match = re.search(r'(\d+(?:\.\d+)?)\s*(hp|kw)\b', power_spec or '', re.IGNORECASE)
+    if not match:
+        return None
+    horsepower = float(match.group(1)) * (1.341 if match.group(2).lower() == 'kw' else 1)
+    return bisect.bisect_right(POWER_BANDS, horsepower)
+
+
+def power_band_label(band):
+    if band == 0:
+        return f'under {POWER_BANDS[0]} HP'
+    if band == len(POWER_BANDS):
+        return f'{POWER_BANDS[-1]}+ HP'
+    return f'{POWER_BANDS[band - 1]}-{POWER_BANDS[band]} HP'
+
+
+class PriceIndex(ListingRows):
+    """Price comparables for every listing stored in NumPy arrays.
+
+    Text fields are interned as integer codes, so selecting a comparables group
+    is a handful of vectorised comparisons over the key matrix.
+    """
+
+    def reset(self):
+        super().reset()
+        self.codes = {field: {} for field in PRICE_KEY_FIELDS if field != 'power_band'}
+        self.keys = np.zeros((0, len(PRICE_KEY_FIELDS)), dtype=np.int32)
+        self.prices = np.zeros(0)
+        self.utilisation = np.zeros(0)
+        self.live = np.zeros(0, dtype=bool)
+
+    def encode(self, field, value, add=False):
+        """Integer code for a field value; case and surrounding spaces are ignored"""
+        if field == 'power_band':
+            band = power_band(value)
+            return ANY_VALUE if band is None else band
+        value = (value or '').strip().lower()
+        if not value:
+            return ANY_VALUE
+        codes = self.codes[field]
+        if add:
+            return codes.setdefault(value, len(codes))
+        return codes.get(value, UNKNOWN_VALUE)
+
+    def _grow_rows(self, extra):
+        self.keys = np.vstack([self.keys, np.full((extra, len(PRICE_KEY_FIELDS)), ANY_VALUE, dtype=np.int32)])
+        self.prices = np.concatenate([self.prices, np.zeros(extra)])
+        self.utilisation = np.concatenate([self.utilisation, np.zeros(extra)])
+        self.live = np.concatenate([self.live, np.zeros(extra, dtype=bool)])
+
+    def _clear_row(self, row, listing_id):
+        self.live[row] = False
+
+    def _fill_row(self, row, listing, utilisation):
+        self.keys[row] = [
+            self.encode(field, listing['power_spec' if field == 'power_band' else field], add=True)
+            for field in PRICE_KEY_FIELDS
+        ]
+        self.prices[row] = listing['price']
+        self.utilisation[row] = utilisation
+        self.live[row] = True
+
+    def build(self, listings, utilisation):
+        """Rebuild the whole index from listing rows and {listing_id: utilisation}"""
+        self._rebuild((listing, utilisation.get(listing['id'], 0.0)) for listing in listings)
+
+    def set_utilisation(self, utilisation):
+        """Update {listing_id: utilisation} for listings already in the index"""
+        with self.lock:
+            for listing_id, value in utilisation.items():
+                row = self.rows.get(listing_id)
+                if row is not None:
+                    self.utilisation[row] = value
+
+    def suggest(self, listing, exclude_id=None):
+        """Price statistics for the closest comparables group of a draft listing, or None"""
+        with self.lock:
+            query = {
+                field: self.encode(field, listing.get('power_spec' if field == 'power_band' else field))
+                for field in PRICE_KEY_FIELDS
+            }
+            base = self.live.copy()
+            for field in ('category', 'pricing_type'):
+                base &= self.keys[:, PRICE_KEY_FIELDS.index(field)] == query[field]
+            if exclude_id in self.rows:
+                base[self.rows[exclude_id]] = False
+            if not base.any():
+                return None
+
+            for level in PRICE_COMPARABLE_LEVELS:
+                fields = [field for field in level if query[field] != ANY_VALUE]
+                selected = base.copy()
+                for field in fields:
+                    selected &= self.keys[:, PRICE_KEY_FIELDS.index(field)] == query[field]
+                if selected.sum() >= PRICE_MIN_COMPARABLES:
+                    break
+            if selected.sum() < PRICE_MIN_COMPARABLES:
+                # Fewer comparables than we would like even at category level: use them all
+                selected, fields = base, []
+
+            prices = self.prices[selected]
+            utilisation = self.utilisation[selected]
+            low, middle, high = np.percentile(prices, [25, 50, 75])
+            demand = float(utilisation.mean())
+            # Busy comparables support asking towards the upper quartile, idle ones the lower
+            suggested = float(np.percentile(prices, 25 + 50 * min(demand / PRICE_TARGET_UTILISATION, 1.0)))
+
+        return {
+            'suggested_price': round(suggested, -1) if suggested >= 100 else round(suggested),
+            'low': float(low),
+            'median': float(middle),
+            'high': float(high),
+            'comparables': int(selected.sum()),
+            'rented': int((utilisation > 0).sum()),
+            'utilisation': round(demand, 4),
+            'matched_on': ['category', 'pricing_type'] + fields,
+            'power_band': power_band_label(query['power_band']) if 'power_band' in fields else None
+        }
+
+
+price_index = None
+price_index_lock = threading.Lock()
+
+
+def get_price_index():
+    """Create the price index on first use, or return None without NumPy"""
+    global price_index, np
+    if price_index is None and NUMPY_AVAILABLE:
+        with price_index_lock:
+            if price_index is None:
+                import numpy as np
+                price_index = PriceIndex()
+    return price_index
+
+
+PRICE_INDEX_COLUMNS = 'id, category, brand, power_spec, district, pricing_type, price'
+
+
+def listing_utilisation(ranges, window):
+    """Share of the market window covered by a listing's confirmed ranges"""
+    return booked_days_in_window(ranges, *window) / MARKET_UTILISATION_DAYS
+
+
+def build_price_index(index):
+    window = utilisation_window()
+    conn = get_db()
+    try:
+        listings = conn.execute(f'SELECT {PRICE_INDEX_COLUMNS} FROM listings').fetchall()
+        ranges = confirmed_ranges_by_listing(conn, window)
+    finally:
+        conn.close()
+    index.build(listings, {
+        listing_id: listing_utilisation(listing_ranges, window) for listing_id, listing_ranges in ranges.items()
+    })
+
+
+def ensure_price_index():
+    """Build the price index on first use and periodically afterwards"""
+    index = get_price_index()
+    if index is not None and index.is_stale():
+        single_flight.do('price_index', None, lambda: build_price_index(index))
+    return index
+
+
+def refresh_listing_price(listing_id):
+    """Re-index a single listing's comparables after it was created or updated"""
+    if price_index is None or price_index.built_at is None:
+        return
+    window = utilisation_window()
+    conn = get_db()
+    try:
+        listing = conn.execute(f'SELECT {PRICE_INDEX_COLUMNS} FROM listings WHERE id = ?', (listing_id,)).fetchone()
+        ranges = confirmed_ranges_by_listing(conn, window, [listing_id])
+    finally:
+        conn.close()
+    if listing:
+        price_index.upsert(listing, listing_utilisation(ranges.get(listing_id, []), window))
+    else:
+        price_index.remove(listing_id)
+
+
+def refresh_price_utilisation(listing_ids):
+    """Recompute utilisation in the price index after rentals were approved or withdrawn"""
+    listing_ids = sorted(set(listing_ids))
+    if price_index is None or price_index.built_at is None or not listing_ids:
+        return
+    window = utilisation_window()
+    conn = get_db()
+    try:
+        ranges = confirmed_ranges_by_listing(conn, window, listing_ids)
+    finally:
+        conn.close()
+    price_index.set_utilisation({
+        listing_id: listing_utilisation(ranges.get(listing_id, []), window) for listing_id in listing_ids
+    })
+
+
+@app.route('/api/price-suggestion')
+@login_required
+def price_suggestion():
+    """Suggested price for a draft listing from comparable listings and how busy they are"""
+    draft = {field: request.args.get(field, '') for field in ('category', 'brand', 'power_spec', 'district', 'pricing_type')}
+    if not draft['category'].strip() or not draft['pricing_type'].strip():
+        return jsonify({'success': False, 'message': 'Category and pricing type are required'}), 400
+
+    index = ensure_price_index()
+    if index is None:
+        return jsonify({'success': False, 'message': 'Price suggestions are not available'}), 503
+    suggestion = index.suggest(draft, exclude_id=request.args.get('listing_id', type=int))
+    if suggestion is None:
+        metrics.inc('agrorent_price_suggestions_total', level='none')
+        return jsonify({'success': False, 'message': 'No comparable listings yet'}), 404
+
+    metrics.inc('agrorent_price_suggestions_total', level=str(len(suggestion['matched_on'])))
+    return jsonify({'success': True, 'suggestion': suggestion})
+
+
 @app.route('/signup', methods=['GET', 'POST'])
 def signup():
     """User registration"""
@@ -656,7 +3181,8 @@ def signin():
         conn.close()
         
         if user and check_password_hash(user['password'], password):
-            # Set session
+            # Set session under a new id so an id planted before sign-in is worthless
+            session.regenerate()
             session['user_id'] = user['id']
             session['user_name'] = user['name']
             session['user_email'] = user['email']
@@ -672,6 +3198,7 @@ def signin():
 def signout():
     """User logout"""
     session.clear()
+    session.regenerate()
     flash(translate_text('auth.signout.success'), 'success')
     return redirect(url_for('index'))
 
@@ -681,6 +3208,19 @@ def rentdashboard():
     """Renting dashboard page"""
     return render_template('rentdashboard.html')
 
+
+MY_RENTALS_SQL = hot_query('get_my_rentals', '''
+    SELECT r.*, l.title, l.category, l.equipment_name, l.brand, l.main_image,
+           l.price, l.pricing_type, l.state, l.district, l.village_city,
+           l.owner_name, l.phone, l.contact_method
+    FROM rentals r
+    JOIN listings l ON r.listing_id = l.id
+    WHERE r.user_id = ?
+    AND NOT (r.status = 'Cancelled' AND date(r.created_at) < ?)
+    ORDER BY r.created_at DESC
+''', lambda sample: (sample['user_id'], sample['five_days_ago']))
+
+
 @app.route('/api/my_rentals')
 @login_required
 def get_my_rentals():
@@ -690,16 +3230,7 @@ def get_my_rentals():
     today = datetime.now().date()
     five_days_ago = today - timedelta(days=5)
     
-    rentals = conn.execute('''
-        SELECT r.*, l.title, l.category, l.equipment_name, l.brand, l.main_image,
-               l.price, l.pricing_type, l.state, l.district, l.village_city,
-               l.owner_name, l.phone, l.contact_method
-        FROM rentals r
-        JOIN listings l ON r.listing_id = l.id
-        WHERE r.user_id = ?
-        AND NOT (r.status = 'Cancelled' AND date(r.created_at) < ?)
-        ORDER BY r.created_at DESC
-    ''', (user_id, five_days_ago.strftime('%Y-%m-%d'))).fetchall()
+    rentals = conn.execute(MY_RENTALS_SQL, (user_id, five_days_ago.strftime('%Y-%m-%d'))).fetchall()
     conn.close()
     
     rentals_data = []
@@ -763,6 +3294,11 @@ def listing():
     # Check if editing mode
     editing_data = None
     editing_id = None
+    if session.get('editing_listing_expires', 0) < time.time():
+        # Abandoned edit drafts expire instead of lingering in the session
+        session.pop('editing_listing_data', None)
+        session.pop('editing_listing_id', None)
+        session.pop('editing_listing_expires', None)
     if 'editing_listing_data' in session and 'editing_listing_id' in session:
         # Verify ownership before allowing edit
         user_id = session['user_id']
@@ -777,10 +3313,12 @@ def listing():
                 # Only allow editing if user owns the listing
                 editing_data = session.pop('editing_listing_data', None)
                 editing_id = session.pop('editing_listing_id', None)
+                session.pop('editing_listing_expires', None)
             else:
                 # Clear invalid session data
                 session.pop('editing_listing_data', None)
                 session.pop('editing_listing_id', None)
+                session.pop('editing_listing_expires', None)
                 flash(translate_text('listings.edit.forbidden'), 'danger')
     
     return render_template('listing.html', editing_data=editing_data, editing_id=editing_id)
@@ -862,7 +3400,9 @@ def create_listing():
                 
                 filename = f"main_{user_id}_{int(os.urandom(4).hex(), 16)}.{main_image.filename.rsplit('.', 1)[1].lower()}"
                 filepath = os.path.join(upload_folder, filename)
-                main_image.save(filepath)
+                with span('file.write', path=filepath):
+                    main_image.save(filepath)
+                record_upload('main_image', filepath)
                 main_image_path = f"uploads/{filename}"
             elif is_edit:
                 # Keep existing image if no new one uploaded
@@ -886,7 +3426,9 @@ def create_listing():
                     if file.filename:
                         filename = f"add_{user_id}_{int(os.urandom(4).hex(), 16)}_{idx}.{file.filename.rsplit('.', 1)[1].lower()}"
                         filepath = os.path.join(upload_folder, filename)
-                        file.save(filepath)
+                        with span('file.write', path=filepath):
+                            file.save(filepath)
+                        record_upload('additional_images', filepath)
                         additional_images_paths.append(f"uploads/{filename}")
             elif is_edit and listing['additional_images']:
                 # Keep existing images if no new ones uploaded
@@ -914,9 +3456,10 @@ def create_listing():
                 editing_id_int, user_id
             ))
             message = 'Your listing has been updated successfully!'
+            saved_listing_id = editing_id_int
         else:
             # Insert new listing
-            conn.execute('''
+            cursor = conn.execute('''
                 INSERT INTO listings (
                     user_id, owner_name, phone, email, contact_method,
                     category, equipment_name, brand, year, condition, power_spec,
@@ -934,10 +3477,17 @@ def create_listing():
                 main_image_path, ','.join(additional_images_paths) if additional_images_paths else None
             ))
             message = 'Your equipment has been listed successfully!'
+            saved_listing_id = cursor.lastrowid
+        
+        match_saved_searches(conn, saved_listing_id)
         
         # Commit transaction
         conn.commit()
         
+        # Keep the chatbot's listing index and the price comparables in step with the catalogue
+        refresh_listing_in_index(saved_listing_id)
+        refresh_listing_price(saved_listing_id)
+        
         return jsonify({
             'success': True,
             'message': message
@@ -955,59 +3505,272 @@ def create_listing():
         if 'conn' in locals() and conn:
             conn.close()
 
-@app.route('/renting')
-@login_required
-def renting():
-    """Renting page with equipment listings"""
-    return render_template('renting.html')
+# ============================================
+# Saved searches
+# ============================================
+# A saved search sits in one of four buckets for any listing: its exact
+# (category, district), category in any district, district in any category,
+# or neither. When a listing is saved only those buckets are read from
+# idx_saved_searches_bucket; the remaining predicates (state, price, date
+# window) are checked in Python on that short list.
+
+SAVED_SEARCH_LIMIT = 20
+
+SAVED_SEARCH_BUCKET_SQL = hot_query('match_saved_searches', '''
+    SELECT * FROM saved_searches
+    WHERE category IN (?, '') AND district IN (?, '')
+    AND user_id != ?
+''', lambda sample: ('tractor', 'pune', sample['owner_id']))
+
+
+def saved_search_matches(search, listing):
+    """Whether a listing satisfies a saved search's non-bucket predicates"""
+    if search['state'] and search['state'] != (listing['state'] or '').strip().lower():
+        return False
+    if search['price_min'] is not None and listing['price'] < search['price_min']:
+        return False
+    if search['price_max'] is not None and listing['price'] > search['price_max']:
+        return False
+    # The listing's availability window must overlap the search's date window
+    if search['date_to'] and listing['available_from'] > search['date_to']:
+        return False
+    if search['date_from'] and listing['available_till'] and listing['available_till'] < search['date_from']:
+        return False
+    return True
+
+
+def match_saved_searches(conn, listing_id):
+    """Notify renters whose saved searches a created or updated listing now matches.
+
+    Runs inside the caller's transaction; each renter is notified once per
+    listing, however many of their searches match it now or after later edits.
+    """
+    listing = conn.execute('SELECT * FROM listings WHERE id = ?', (listing_id,)).fetchone()
+    candidates = conn.execute(SAVED_SEARCH_BUCKET_SQL, (
+        (listing['category'] or '').strip().lower(),
+        (listing['district'] or '').strip().lower(),
+        listing['user_id']
+    )).fetchall()
+    metrics.inc('agrorent_saved_search_candidates_total', len(candidates))
+
+    # One notification per renter, however many of their searches match
+    notify = set()
+    for search in candidates:
+        if not saved_search_matches(search, listing):
+            continue
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO saved_search_matches (user_id, listing_id, saved_search_id) VALUES (?, ?, ?)',
+            (search['user_id'], listing_id, search['id'])
+        )
+        if cursor.rowcount:
+            notify.add(search['user_id'])
+    conn.executemany('''
+        INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
+        VALUES (?, 'saved_search_match', ?, ?, ?, 'listing')
+    ''', [
+        (
+            user_id,
+            'New Equipment Matches Your Search',
+            f'"{listing["title"]}" in {listing["district"]}, {listing["state"]} is now available at ₹{listing["price"]:,.0f} ({listing["pricing_type"]}).',
+            listing_id
+        )
+        for user_id in sorted(notify)
+    ])
+    metrics.inc('agrorent_saved_search_matches_total', len(notify))
+    return len(notify)
 
-@app.route('/api/listings')
+
+def saved_search_dict(search):
+    return {
+        'id': search['id'],
+        'category': search['category'],
+        'district': search['district'],
+        'state': search['state'],
+        'price_min': search['price_min'],
+        'price_max': search['price_max'],
+        'date_from': search['date_from'],
+        'date_to': search['date_to'],
+        'created_at': search['created_at']
+    }
+
+
+@app.route('/api/saved-searches', methods=['GET', 'POST'])
 @login_required
-def get_listings():
-    """Get all available listings - machines should always be visible"""
+def saved_searches():
+    """List or create the current user's saved searches"""
+    user_id = session['user_id']
     conn = get_db()
-    # Get all listings - machines are always visible, availability is checked via calendar
-    listings = conn.execute('''
+    try:
+        if request.method == 'GET':
+            searches = conn.execute(
+                'SELECT * FROM saved_searches WHERE user_id = ? ORDER BY created_at DESC', (user_id,)
+            ).fetchall()
+            return jsonify([saved_search_dict(search) for search in searches])
+
+        data = request.get_json(silent=True) or {}
+        text = {field: (data.get(field) or '').strip().lower() for field in ('category', 'district', 'state')}
+        if not any(text.values()):
+            return jsonify({'success': False, 'message': 'Choose a category, district or state to watch'}), 400
+        try:
+            prices = {field: float(data[field]) if data.get(field) not in (None, '') else None for field in ('price_min', 'price_max')}
+            dates = {
+                field: datetime.strptime(data[field], '%Y-%m-%d').strftime('%Y-%m-%d') if data.get(field) else None
+                for field in ('date_from', 'date_to')
+            }
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'Invalid price or date (use YYYY-MM-DD)'}), 400
+
+        count = conn.execute('SELECT COUNT(*) FROM saved_searches WHERE user_id = ?', (user_id,)).fetchone()[0]
+        if count >= SAVED_SEARCH_LIMIT:
+            return jsonify({'success': False, 'message': f'You can keep up to {SAVED_SEARCH_LIMIT} saved searches'}), 400
+
+        search_id = conn.execute('''
+            INSERT INTO saved_searches (user_id, category, district, state, price_min, price_max, date_from, date_to)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            user_id, text['category'], text['district'], text['state'],
+            prices['price_min'], prices['price_max'], dates['date_from'], dates['date_to']
+        )).lastrowid
+        conn.commit()
+        search = conn.execute('SELECT * FROM saved_searches WHERE id = ?', (search_id,)).fetchone()
+        return jsonify({
+            'success': True,
+            'message': 'Search saved. We will notify you when matching equipment is listed.',
+            'search': saved_search_dict(search)
+        })
+    finally:
+        conn.close()
+
+
+@app.route('/api/saved-searches/<int:search_id>', methods=['DELETE'])
+@login_required
+def delete_saved_search(search_id):
+    """Delete one of the current user's saved searches"""
+    conn = get_db()
+    # Its matches stay, so the renter isn't notified again about those listings
+    cursor = conn.execute('DELETE FROM saved_searches WHERE id = ? AND user_id = ?', (search_id, session['user_id']))
+    conn.commit()
+    conn.close()
+
+    if cursor.rowcount == 0:
+        return jsonify({'success': False, 'message': 'Saved search not found'}), 404
+    return jsonify({'success': True, 'message': 'Saved search deleted'})
+
+
+@app.route('/renting')
+@login_required
+def renting():
+    """Renting page with equipment listings"""
+    return render_template('renting.html')
+
+@app.route('/api/listings')
+@login_required
+def get_listings():
+    """Get all available listings - machines should always be visible"""
+    conn = get_db()
+    # Get all listings - machines are always visible, availability is checked via calendar
+    return stream_json(conn, '''
         SELECT * FROM listings 
         ORDER BY created_at DESC
-    ''').fetchall()
+    ''', (), listing_card)
+
+
+def listing_card(listing):
+    """Fields shown on a listing card"""
+    return {
+        'id': listing['id'],
+        'title': listing['title'],
+        'category': listing['category'],
+        'equipment_name': listing['equipment_name'],
+        'brand': listing['brand'],
+        'price': listing['price'],
+        'pricing_type': listing['pricing_type'],
+        'state': listing['state'],
+        'district': listing['district'],
+        'village_city': listing['village_city'],
+        'main_image': listing['main_image'],
+        'condition': listing['condition'],
+        'power_spec': listing['power_spec'],
+        'service_radius': listing['service_radius'],
+        'transport_included': listing['transport_included'],
+        'transport_charge': listing['transport_charge'],
+        'available_from': listing['available_from'],
+        'available_till': listing['available_till'],
+        'created_at': listing['created_at'],
+        'change_seq': listing['change_seq']
+    }
+
+
+LISTING_CHANGES_LIMIT = 500
+
+LISTING_CHANGES_SQL = hot_query('listing_changes', '''
+    SELECT * FROM listings
+    WHERE change_seq > ?
+    ORDER BY change_seq
+    LIMIT ?
+''', lambda sample: (0, LISTING_CHANGES_LIMIT))
+
+LISTING_TOMBSTONES_SQL = hot_query('listing_changes.tombstones', '''
+    SELECT listing_id, change_seq FROM listing_tombstones
+    WHERE change_seq > ?
+    ORDER BY change_seq
+    LIMIT ?
+''', lambda sample: (0, LISTING_CHANGES_LIMIT))
+
+
+@app.route('/api/listings/changes')
+@login_required
+def get_listing_changes():
+    """Listings changed and deleted since a change sequence, for clients keeping a local copy"""
+    since = request.args.get('since', 0, type=int)
+    limit = min(max(request.args.get('limit', LISTING_CHANGES_LIMIT, type=int), 1), LISTING_CHANGES_LIMIT)
+    conn = get_db()
+    latest = conn.execute("SELECT value FROM change_sequences WHERE name = 'listings'").fetchone()['value']
+    # A client ahead of the server has a copy of a different database: resync
+    reset = since < 0 or since > latest
+    if reset:
+        since = 0
+    listings = conn.execute(LISTING_CHANGES_SQL, (since, limit)).fetchall()
+    # A full sync starts from nothing, so there is nothing to delete
+    tombstones = conn.execute(LISTING_TOMBSTONES_SQL, (since, limit)).fetchall() if since else []
     conn.close()
-    
-    listings_data = []
-    for listing in listings:
-        listings_data.append({
-            'id': listing['id'],
-            'title': listing['title'],
-            'category': listing['category'],
-            'equipment_name': listing['equipment_name'],
-            'brand': listing['brand'],
-            'price': listing['price'],
-            'pricing_type': listing['pricing_type'],
-            'state': listing['state'],
-            'district': listing['district'],
-            'village_city': listing['village_city'],
-            'main_image': listing['main_image'],
-            'condition': listing['condition'],
-            'power_spec': listing['power_spec'],
-            'service_radius': listing['service_radius'],
-            'transport_included': listing['transport_included'],
-            'transport_charge': listing['transport_charge'],
-            'available_from': listing['available_from'],
-            'available_till': listing['available_till']
-        })
-    
-    return jsonify(listings_data)
+
+    # Both lists are ordered by sequence; keep the first `limit` changes overall
+    # so the next request can resume from the last one returned
+    changes = sorted(
+        [(listing['change_seq'], listing, None) for listing in listings]
+        + [(tombstone['change_seq'], None, tombstone['listing_id']) for tombstone in tombstones],
+        key=lambda change: change[0]
+    )[:limit]
+    has_more = len(changes) == limit and changes[-1][0] < latest
+
+    return jsonify({
+        'seq': changes[-1][0] if has_more else latest,
+        'reset': reset or since == 0,
+        'has_more': has_more,
+        'listings': [listing_card(listing) for _, listing, _ in changes if listing is not None],
+        'deleted': [listing_id for _, _, listing_id in changes if listing_id is not None]
+    })
 
 @app.route('/api/listing/<int:listing_id>')
 @login_required
 def get_listing_details(listing_id):
     """Get detailed information about a specific listing"""
+    listing_data = single_flight.do('listing_details', listing_id, lambda: listing_details(listing_id))
+    
+    if not listing_data:
+        return jsonify({'error': 'Listing not found'}), 404
+    
+    return jsonify(listing_data)
+
+
+def listing_details(listing_id):
     conn = get_db()
     listing = conn.execute('SELECT * FROM listings WHERE id = ?', (listing_id,)).fetchone()
     conn.close()
     
     if not listing:
-        return jsonify({'error': 'Listing not found'}), 404
+        return None
     
     listing_data = dict(listing)
     # Parse additional images
@@ -1016,28 +3779,24 @@ def get_listing_details(listing_id):
     else:
         listing_data['additional_images'] = []
     
-    return jsonify(listing_data)
+    return listing_data
+
+# Get all confirmed (Approved/Active) and pending rentals for a listing.
+# Rental ids start at 1, so excluding id 0 excludes nothing.
+DATE_CONFLICT_SQL = hot_query('check_date_conflict', '''
+    SELECT id, start_date, end_date, status
+    FROM rentals 
+    WHERE listing_id = ? 
+    AND status IN ('Pending', 'Approved', 'Active')
+    AND id != ?
+    ORDER BY start_date
+''', lambda sample: (sample['listing_id'], 0))
+
 
 def check_date_conflict(listing_id, start_date, end_date, exclude_rental_id=None):
     """Check if the given date range conflicts with existing rentals"""
     conn = get_db()
-    
-    # Get all confirmed (Approved/Active) and pending rentals for this listing
-    query = '''
-        SELECT id, start_date, end_date, status
-        FROM rentals 
-        WHERE listing_id = ? 
-        AND status IN ('Pending', 'Approved', 'Active')
-    '''
-    params = [listing_id]
-    
-    if exclude_rental_id:
-        query += ' AND id != ?'
-        params.append(exclude_rental_id)
-    
-    query += ' ORDER BY start_date'
-    
-    rentals = conn.execute(query, tuple(params)).fetchall()
+    rentals = conn.execute(DATE_CONFLICT_SQL, (listing_id, exclude_rental_id or 0)).fetchall()
     conn.close()
     
     # Convert input dates
@@ -1061,10 +3820,19 @@ def check_date_conflict(listing_id, start_date, end_date, exclude_rental_id=None
     
     return conflicts
 
+
+def date_ranges_overlap(a, b):
+    """Inclusive overlap of two rentals' ISO date ranges"""
+    return a['start_date'] <= b['end_date'] and b['start_date'] <= a['end_date']
+
 @app.route('/api/listing/<int:listing_id>/availability')
 @login_required
 def get_listing_availability(listing_id):
     """Get booked dates for a specific listing (separated by status)"""
+    return jsonify(single_flight.do('listing_availability', listing_id, lambda: listing_availability(listing_id)))
+
+
+def listing_availability(listing_id):
     conn = get_db()
     
     # Get all rentals for this listing with different statuses
@@ -1100,13 +3868,272 @@ def get_listing_availability(listing_id):
                     confirmed_dates.append(date_string)
             current_date += timedelta(days=1)
     
-    return jsonify({
+    return {
         'pending_dates': pending_dates,
         'confirmed_dates': confirmed_dates
-    })
+    }
+
+LISTING_OVERVIEW_FIELDS = ('listing', 'availability', 'condition', 'owner')
+
+OWNER_SUMMARY_SQL = hot_query('get_listing_overview.owner', '''
+    SELECT u.name, u.created_at,
+           (SELECT COUNT(*) FROM listings WHERE user_id = u.id) AS listings,
+           COUNT(r.id) AS requests,
+           SUM(r.status IN ('Approved', 'Active')) AS approved,
+           SUM(r.status = 'Cancelled') AS declined,
+           SUM(r.status IN ('Approved', 'Active') AND r.end_date < ?) AS completed
+    FROM users u
+    LEFT JOIN listings l ON l.user_id = u.id
+    LEFT JOIN rentals r ON r.listing_id = l.id
+    WHERE u.id = ?
+    GROUP BY u.id
+''', lambda sample: (datetime.now().strftime('%Y-%m-%d'), sample['owner_id']))
+
+
+def merge_date_intervals(ranges):
+    """Merge inclusive (start, end) ISO date ranges sorted by start into disjoint intervals"""
+    merged = []
+    for start, end in ranges:
+        if merged:
+            last_end = datetime.strptime(merged[-1][1], '%Y-%m-%d').date()
+            if datetime.strptime(start, '%Y-%m-%d').date() <= last_end + timedelta(days=1):
+                merged[-1][1] = max(merged[-1][1], end)
+                continue
+        merged.append([start, end])
+    return merged
+
+
+def owner_summary(conn, owner_id):
+    """Owner's track record on AgroRent (there are no user ratings yet)"""
+    row = conn.execute(OWNER_SUMMARY_SQL, (datetime.now().strftime('%Y-%m-%d'), owner_id)).fetchone()
+    if not row:
+        return None
+    decided = (row['approved'] or 0) + (row['declined'] or 0)
+    return {
+        'name': row['name'],
+        'member_since': row['created_at'],
+        'listings': row['listings'],
+        'rental_requests': row['requests'],
+        'completed_rentals': row['completed'] or 0,
+        'approval_rate': round((row['approved'] or 0) / decided, 2) if decided else None
+    }
+
+
+@app.route('/api/listing/<int:listing_id>/overview')
+@login_required
+def get_listing_overview(listing_id):
+    """Listing details, availability, cached condition analysis and owner summary in one response.
+
+    `?fields=listing,availability` limits the sections returned. The ETag
+    covers the whole body, so repeat requests revalidate with a 304.
+    """
+    requested = request.args.get('fields')
+    fields = [field for field in requested.split(',') if field in LISTING_OVERVIEW_FIELDS] if requested else LISTING_OVERVIEW_FIELDS
+    if not fields:
+        return jsonify({'error': f"fields must be a comma-separated subset of {','.join(LISTING_OVERVIEW_FIELDS)}"}), 400
+
+    overview = single_flight.do('listing_overview', (listing_id, tuple(fields)), lambda: listing_overview(listing_id, fields))
+    if overview is None:
+        return jsonify({'error': 'Listing not found'}), 404
+
+    response = jsonify(overview)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def listing_overview(listing_id, fields):
+    conn = get_db()
+    try:
+        listing = conn.execute('SELECT * FROM listings WHERE id = ?', (listing_id,)).fetchone()
+        if not listing:
+            return None
+
+        overview = {}
+        if 'listing' in fields:
+            listing_data = dict(listing)
+            listing_data['additional_images'] = listing_data['additional_images'].split(',') if listing_data['additional_images'] else []
+            overview['listing'] = listing_data
+        if 'availability' in fields:
+            rentals = conn.execute(DATE_CONFLICT_SQL, (listing_id, 0)).fetchall()
+            overview['availability'] = {
+                'pending': merge_date_intervals(
+                    (rental['start_date'], rental['end_date']) for rental in rentals if rental['status'] == 'Pending'
+                ),
+                'confirmed': merge_date_intervals(
+                    (rental['start_date'], rental['end_date']) for rental in rentals if rental['status'] != 'Pending'
+                )
+            }
+        if 'condition' in fields:
+            overview['condition'] = cached_condition_analysis(listing, conn)
+        if 'owner' in fields:
+            overview['owner'] = owner_summary(conn, listing['user_id'])
+    finally:
+        conn.close()
+    return overview
+
+# ============================================
+# Idempotency keys
+# ============================================
+# Clients send an Idempotency-Key header with writes they may retry. The
+# first request with a key claims it and runs; its response is stored for
+# IDEMPOTENCY_TTL and replayed for repeats without running the view again.
+# A repeat that arrives while the first is still running gets 409, and
+# reusing a key for a different request gets 422. Server errors (5xx) are
+# not stored, so the client can retry them with the same key. A claim only
+# holds the key for IDEMPOTENCY_LEASE until its response is stored, so a
+# worker that dies mid-request doesn't block the key for the whole TTL: a
+# repeat after the lease has expired takes the claim over and runs.
+IDEMPOTENCY_TTL = int(os.environ.get('AGRORENT_IDEMPOTENCY_TTL', 24 * 60 * 60))
+IDEMPOTENCY_LEASE = int(os.environ.get('AGRORENT_IDEMPOTENCY_LEASE', 60))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_REPLAY_HEADERS = ('Content-Type', 'Content-Disposition')
+
+
+def idempotency_request_hash():
+    """Fingerprint of the request, so a key can't be reused for a different one"""
+    payload = json.dumps([
+        request.method,
+        request.path,
+        sorted(request.form.items(multi=True)),
+        request.get_json(silent=True),
+    ], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def idempotent(f):
+    """Replay the stored response for a repeated Idempotency-Key (use under login_required)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return f(*args, **kwargs)
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return jsonify({
+                'success': False,
+                'message': f'Idempotency-Key must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters'
+            }), 400
+
+        user_id = session['user_id']
+        request_hash = idempotency_request_hash()
+        now = time.time()
+        lease = now + IDEMPOTENCY_LEASE
+        conn = get_db()
+        try:
+            # Drops stored responses past their TTL and claims whose lease ran out
+            conn.execute('DELETE FROM idempotency_keys WHERE expires_at < ?', (now,))
+            claimed = conn.execute('''
+                INSERT OR IGNORE INTO idempotency_keys (user_id, idempotency_key, request_hash, expires_at)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, key, request_hash, lease)).rowcount == 1
+            conn.commit()
+            stored = None if claimed else conn.execute(
+                'SELECT * FROM idempotency_keys WHERE user_id = ? AND idempotency_key = ?', (user_id, key)
+            ).fetchone()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        if stored is not None:
+            if stored['request_hash'] != request_hash:
+                return jsonify({
+                    'success': False,
+                    'message': 'This Idempotency-Key was already used for a different request'
+                }), 422
+            if stored['status'] is None:
+                response = jsonify({
+                    'success': False,
+                    'in_progress': True,
+                    'message': 'A request with this Idempotency-Key is still being processed'
+                })
+                response.status_code = 409
+                response.headers['Retry-After'] = '1'
+                return response
+            response = app.response_class(stored['body'], status=stored['status'])
+            for name, value in json.loads(stored['headers']).items():
+                response.headers[name] = value
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = app.make_response(f(*args, **kwargs))
+        except Exception:
+            release_idempotency_key(user_id, key, lease)
+            raise
+        if response.status_code >= 500:
+            release_idempotency_key(user_id, key, lease)
+            return response
+
+        # Files from send_file are streamed; read them so they can be stored
+        response.direct_passthrough = False
+        body = response.get_data()
+        headers = {name: response.headers[name] for name in IDEMPOTENCY_REPLAY_HEADERS if name in response.headers}
+        conn = get_db()
+        try:
+            # Only while the claim is still ours; a takeover owns the key now
+            conn.execute('''
+                UPDATE idempotency_keys SET status = ?, headers = ?, body = ?, expires_at = ?
+                WHERE user_id = ? AND idempotency_key = ? AND status IS NULL AND expires_at = ?
+            ''', (response.status_code, json.dumps(headers), body, time.time() + IDEMPOTENCY_TTL, user_id, key, lease))
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            app.logger.warning('Could not store response for Idempotency-Key %r: %s', key, e)
+        finally:
+            conn.close()
+        return response
+    return decorated_function
+
+
+def release_idempotency_key(user_id, key, lease):
+    """Forget a claimed key whose request failed, so a retry runs again"""
+    conn = get_db()
+    try:
+        conn.execute('''
+            DELETE FROM idempotency_keys
+            WHERE user_id = ? AND idempotency_key = ? AND status IS NULL AND expires_at = ?
+        ''', (user_id, key, lease))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def availability_window_error(listing, start_date, end_date):
+    """Message if a rental's dates fall outside the listing's availability window"""
+    if start_date < listing['available_from']:
+        return f'Start date must be on or after {listing["available_from"]}'
+    if listing['available_till'] and end_date > listing['available_till']:
+        return f'End date must be on or before {listing["available_till"]}'
+    return None
+
+
+def rental_total(listing, days):
+    """Total charge for renting a listing for the given number of days"""
+    price = listing['price']
+    pricing_type = listing['pricing_type']
+    # Handle None transport_charge - convert to 0 if None
+    if listing['transport_included'] == 'No' and listing['transport_charge'] is not None:
+        transport_charge = float(listing['transport_charge'])
+    else:
+        transport_charge = 0
+    
+    if pricing_type == 'Per day':
+        total_amount = price * days
+    elif pricing_type == 'Per hour':
+        total_amount = price * days * 8  # Assuming 8 hours per day
+    elif pricing_type == 'Per acre':
+        total_amount = price * days  # Assuming days = acres
+    else:
+        total_amount = price  # Per season
+    
+    return total_amount + transport_charge
+
 
 @app.route('/rent_equipment', methods=['POST'])
 @login_required
+@idempotent
 def rent_equipment():
     """Handle equipment rental request with conflict detection"""
     try:
@@ -1158,49 +4185,21 @@ def rent_equipment():
                     'success': False,
                     'message': f'Selected dates are already booked ({conflict_info["start_date"]} to {conflict_info["end_date"]}). Please choose different dates.',
                     'conflict': True,
-                    'booked': True
+                    'booked': True,
+                    'waitlist': True
                 }), 400
         
         # Validate date range against listing availability
-        listing_available_from = datetime.strptime(listing['available_from'], '%Y-%m-%d').date()
-        listing_available_till = datetime.strptime(listing['available_till'], '%Y-%m-%d').date() if listing['available_till'] else None
-        
-        requested_start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-        requested_end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        
-        if requested_start_date < listing_available_from:
+        window_error = availability_window_error(listing, start_date, end_date)
+        if window_error:
             conn.close()
             return jsonify({
                 'success': False,
-                'message': f'Start date must be on or after {listing["available_from"]}'
-            }), 400
-        
-        if listing_available_till and requested_end_date > listing_available_till:
-            conn.close()
-            return jsonify({
-                'success': False,
-                'message': f'End date must be on or before {listing["available_till"]}'
+                'message': window_error
             }), 400
         
         # Calculate total amount
-        price = listing['price']
-        pricing_type = listing['pricing_type']
-        # Handle None transport_charge - convert to 0 if None
-        if listing['transport_included'] == 'No' and listing['transport_charge'] is not None:
-            transport_charge = float(listing['transport_charge'])
-        else:
-            transport_charge = 0
-        
-        if pricing_type == 'Per day':
-            total_amount = price * days
-        elif pricing_type == 'Per hour':
-            total_amount = price * days * 8  # Assuming 8 hours per day
-        elif pricing_type == 'Per acre':
-            total_amount = price * days  # Assuming days = acres
-        else:
-            total_amount = price  # Per season
-        
-        total_amount += transport_charge
+        total_amount = rental_total(listing, days)
         
         # Get additional rental information
         renter_address = request.form.get('renter_address', '').strip()
@@ -1252,6 +4251,180 @@ def rent_equipment():
         if conn:
             conn.close()
 
+BOOKING_GROUP_LIMIT = 20
+
+
+@app.route('/api/booking-groups', methods=['POST'])
+@login_required
+@idempotent
+def create_booking_group():
+    """Request several machines at once from the booking cart, all or nothing.
+
+    Body: {"items": [{"listing_id": 1, "start_date": "2025-06-01", "days": 3}, ...],
+    "renter_address": "...", "location_of_use": "..."}. Every line is checked
+    against the others and against confirmed bookings before anything is
+    written; if any line fails, nothing is booked and the errors are returned
+    per line. Each owner gets one notification covering all their machines.
+    """
+    user_id = session['user_id']
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Request body must be a JSON object'}), 400
+    items = data.get('items')
+    renter_address = (data.get('renter_address') or '').strip()
+    location_of_use = (data.get('location_of_use') or '').strip()
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'message': 'items must be a non-empty list'}), 400
+    if len(items) > BOOKING_GROUP_LIMIT:
+        return jsonify({'success': False, 'message': f'At most {BOOKING_GROUP_LIMIT} machines per booking'}), 400
+
+    lines = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            listing_id = int(item['listing_id'])
+            days = int(item['days'])
+            start = datetime.strptime(item['start_date'], '%Y-%m-%d')
+        except (KeyError, TypeError, ValueError):
+            errors.append({'index': index, 'message': 'Each item needs listing_id, start_date (YYYY-MM-DD) and days'})
+            continue
+        if days < 1:
+            errors.append({'index': index, 'message': 'days must be at least 1'})
+            continue
+        lines.append({
+            'index': index,
+            'listing_id': listing_id,
+            'start_date': start.strftime('%Y-%m-%d'),
+            'end_date': (start + timedelta(days=days)).strftime('%Y-%m-%d'),
+            'days': days
+        })
+    if errors:
+        return jsonify({'success': False, 'message': 'Invalid booking items', 'errors': errors}), 400
+
+    conn = None
+    try:
+        conn = get_db()
+        # Hold the write lock from the conflict checks to the commit, so no
+        # machine in the cart can be booked by someone else in between
+        conn.execute('BEGIN IMMEDIATE')
+
+        listing_ids = sorted({line['listing_id'] for line in lines})
+        placeholders = ','.join('?' * len(listing_ids))
+        listings = {
+            listing['id']: listing
+            for listing in conn.execute(f'SELECT * FROM listings WHERE id IN ({placeholders})', listing_ids).fetchall()
+        }
+        booked = {}
+        for rental in conn.execute(f'''
+            SELECT listing_id, start_date, end_date FROM rentals
+            WHERE listing_id IN ({placeholders})
+            AND status IN ('Approved', 'Active')
+        ''', listing_ids).fetchall():
+            booked.setdefault(rental['listing_id'], []).append(rental)
+
+        in_cart = {}
+        for line in lines:
+            listing = listings.get(line['listing_id'])
+            if not listing:
+                message = 'Listing not found'
+            elif listing['user_id'] == user_id:
+                message = 'You cannot rent your own equipment'
+            else:
+                message = availability_window_error(listing, line['start_date'], line['end_date'])
+            if not message:
+                conflict = next((rental for rental in booked.get(line['listing_id'], []) if date_ranges_overlap(line, rental)), None)
+                if conflict:
+                    message = f'Selected dates are already booked ({conflict["start_date"]} to {conflict["end_date"]})'
+                elif any(date_ranges_overlap(line, other) for other in in_cart.get(line['listing_id'], [])):
+                    message = 'The same machine is in the cart twice for overlapping dates'
+            if message:
+                errors.append({'index': line['index'], 'listing_id': line['listing_id'], 'message': message})
+            else:
+                line['total_amount'] = rental_total(listing, line['days'])
+                in_cart.setdefault(line['listing_id'], []).append(line)
+
+        if errors:
+            conn.rollback()
+            return jsonify({
+                'success': False,
+                'message': 'Some machines could not be booked; nothing was submitted',
+                'errors': errors,
+                'booked': any(error['message'].startswith('Selected dates are already booked') for error in errors)
+            }), 409
+
+        total_amount = sum(line['total_amount'] for line in lines)
+        group_id = conn.execute(
+            'INSERT INTO booking_groups (user_id, total_amount) VALUES (?, ?)',
+            (user_id, total_amount)
+        ).lastrowid
+        for line in lines:
+            line['rental_id'] = conn.execute('''
+                INSERT INTO rentals (user_id, listing_id, start_date, end_date, days, total_amount, status, renter_address, location_of_use, booking_group_id)
+                VALUES (?, ?, ?, ?, ?, ?, 'Pending', ?, ?, ?)
+            ''', (user_id, line['listing_id'], line['start_date'], line['end_date'], line['days'], line['total_amount'],
+                  renter_address, location_of_use, group_id)).lastrowid
+
+        renter = conn.execute('SELECT name FROM users WHERE id = ?', (user_id,)).fetchone()
+        renter_name_text = renter['name'] if renter else 'A user'
+        by_owner = {}
+        for line in lines:
+            by_owner.setdefault(listings[line['listing_id']]['user_id'], []).append(line)
+        notifications = []
+        for owner_id, owner_lines in by_owner.items():
+            machines = '; '.join(
+                f'"{listings[line["listing_id"]]["title"]}" from {line["start_date"]} to {line["end_date"]}'
+                for line in owner_lines
+            )
+            notifications.append((
+                owner_id,
+                'New Rental Request',
+                f'{renter_name_text} has requested to rent {len(owner_lines)} machine{"s" if len(owner_lines) != 1 else ""} together: {machines}.',
+                owner_lines[0]['rental_id']
+            ))
+        conn.executemany('''
+            INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
+            VALUES (?, 'rental_request', ?, ?, ?, 'rental')
+        ''', notifications)
+
+        conn.commit()
+
+        return jsonify({
+            'success': True,
+            'message': 'Rental requests submitted successfully! Each owner will review and approve their machines.',
+            'booking_group_id': group_id,
+            'total_amount': total_amount,
+            'rentals': [
+                {key: line[key] for key in ('rental_id', 'listing_id', 'start_date', 'end_date', 'days', 'total_amount')}
+                for line in lines
+            ]
+        })
+    except Exception as e:
+        # Rollback transaction on any error
+        if conn:
+            conn.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Error processing booking: {str(e)}'
+        }), 500
+    finally:
+        # Always close connection
+        if conn:
+            conn.close()
+
+LISTING_OWNER_SQL = hot_query(
+    'get_rental_requests.ownership',
+    'SELECT * FROM listings WHERE id = ? AND user_id = ?',
+    lambda sample: (sample['listing_id'], sample['owner_id'])
+)
+RENTAL_REQUESTS_SQL = hot_query('get_rental_requests', '''
+    SELECT r.*, u.name as renter_name, u.email as renter_email, u.phone as renter_phone
+    FROM rentals r
+    JOIN users u ON r.user_id = u.id
+    WHERE r.listing_id = ?
+    ORDER BY r.created_at DESC
+''', lambda sample: (sample['listing_id'],))
+
+
 @app.route('/api/listings/<int:listing_id>/rental-requests')
 @login_required
 def get_rental_requests(listing_id):
@@ -1260,20 +4433,14 @@ def get_rental_requests(listing_id):
     conn = get_db()
     
     # Verify ownership
-    listing = conn.execute('SELECT * FROM listings WHERE id = ? AND user_id = ?', (listing_id, user_id)).fetchone()
+    listing = conn.execute(LISTING_OWNER_SQL, (listing_id, user_id)).fetchone()
     
     if not listing:
         conn.close()
         return jsonify({'error': 'Listing not found or access denied'}), 404
     
     # Get all rental requests for this listing
-    rentals = conn.execute('''
-        SELECT r.*, u.name as renter_name, u.email as renter_email, u.phone as renter_phone
-        FROM rentals r
-        JOIN users u ON r.user_id = u.id
-        WHERE r.listing_id = ?
-        ORDER BY r.created_at DESC
-    ''', (listing_id,)).fetchall()
+    rentals = conn.execute(RENTAL_REQUESTS_SQL, (listing_id,)).fetchall()
     conn.close()
     
     rentals_data = []
@@ -1295,6 +4462,7 @@ def get_rental_requests(listing_id):
 
 @app.route('/api/rentals/<int:rental_id>/approve', methods=['POST'])
 @login_required
+@idempotent
 def approve_rental(rental_id):
     """Approve a rental request (owner only) - with proper transaction management"""
     user_id = session['user_id']
@@ -1302,9 +4470,9 @@ def approve_rental(rental_id):
     try:
         conn = get_db()
         
-        # Get rental and verify ownership
+        # Get rental with the listing title and verify ownership
         rental = conn.execute('''
-            SELECT r.*, l.user_id as owner_id, l.id as listing_id
+            SELECT r.*, l.user_id as owner_id, l.id as listing_id, l.title as listing_title
             FROM rentals r
             JOIN listings l ON r.listing_id = l.id
             WHERE r.id = ?
@@ -1338,21 +4506,16 @@ def approve_rental(rental_id):
             UPDATE rentals SET status = 'Approved' WHERE id = ?
         ''', (rental_id,))
         
-        # Get renter info for notification
-        renter = conn.execute('SELECT u.name, u.id FROM users u JOIN rentals r ON u.id = r.user_id WHERE r.id = ?', (rental_id,)).fetchone()
-        listing_info = conn.execute('SELECT title FROM listings WHERE id = ?', (rental['listing_id'],)).fetchone()
-        
         # Create notification for renter
-        if renter and listing_info:
-            conn.execute('''
-                INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
-                VALUES (?, 'rental_approved', ?, ?, ?, 'rental')
-            ''', (
-                renter['id'],
-                'Rental Request Approved',
-                f'Your rental request for "{listing_info["title"]}" from {rental["start_date"]} to {rental["end_date"]} has been approved!',
-                rental_id
-            ))
+        conn.execute('''
+            INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
+            VALUES (?, 'rental_approved', ?, ?, ?, 'rental')
+        ''', (
+            rental['user_id'],
+            'Rental Request Approved',
+            f'Your rental request for "{rental["listing_title"]}" from {rental["start_date"]} to {rental["end_date"]} has been approved!',
+            rental_id
+        ))
         
         # Cancel any other pending requests that conflict with this approved rental
         cancelled_rentals = conn.execute('''
@@ -1373,28 +4536,429 @@ def approve_rental(rental_id):
             rental['start_date'], rental['end_date']   # Overlap check 3
         )).fetchall()
         
-        # Update cancelled rentals and notify users
-        for cancelled in cancelled_rentals:
-            conn.execute('UPDATE rentals SET status = "Cancelled" WHERE id = ?', (cancelled['id'],))
-            
-            # Notify user about cancellation
-            if listing_info:
-                conn.execute('''
-                    INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
-                    VALUES (?, 'rental_cancelled', ?, ?, ?, 'rental')
-                ''', (
-                    cancelled['user_id'],
-                    'Rental Request Cancelled',
-                    f'Your rental request for "{listing_info["title"]}" was cancelled due to another approved booking.',
-                    cancelled['id']
-                ))
+        # Update cancelled rentals and notify users, one batched statement each
+        conn.executemany(
+            'UPDATE rentals SET status = "Cancelled" WHERE id = ?',
+            [(cancelled['id'],) for cancelled in cancelled_rentals]
+        )
+        conn.executemany('''
+            INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
+            VALUES (?, 'rental_cancelled', ?, ?, ?, 'rental')
+        ''', [
+            (
+                cancelled['user_id'],
+                'Rental Request Cancelled',
+                f'Your rental request for "{rental["listing_title"]}" was cancelled due to another approved booking.',
+                cancelled['id']
+            )
+            for cancelled in cancelled_rentals
+        ])
         
         # Commit transaction - all updates succeed together
         conn.commit()
+        refresh_price_utilisation([rental['listing_id']])
+        
+        return jsonify({
+            'success': True,
+            'message': 'Rental request approved successfully'
+        })
+    except Exception as e:
+        # Rollback transaction on any error
+        if conn:
+            conn.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Error approving rental: {str(e)}'
+        }), 500
+    finally:
+        # Always close connection
+        if conn:
+            conn.close()
+
+@app.route('/api/rentals/<int:rental_id>/reject', methods=['POST'])
+@login_required
+@idempotent
+def reject_rental(rental_id):
+    """Reject a rental request (owner only) - with proper transaction management"""
+    user_id = session['user_id']
+    conn = None
+    try:
+        conn = get_db()
+        
+        # Get rental and verify ownership
+        rental = conn.execute('''
+            SELECT r.*, l.user_id as owner_id
+            FROM rentals r
+            JOIN listings l ON r.listing_id = l.id
+            WHERE r.id = ?
+        ''', (rental_id,)).fetchone()
+        
+        if not rental:
+            return jsonify({'success': False, 'message': 'Rental request not found'}), 404
+        
+        if rental['owner_id'] != user_id:
+            return jsonify({'success': False, 'message': 'Access denied'}), 403
+        
+        if rental['status'] != 'Pending':
+            return jsonify({
+                'success': False,
+                'message': f'Rental request is already {rental["status"]}'
+            }), 400
         
+        # Update rental status to 'Cancelled'
+        conn.execute('''
+            UPDATE rentals SET status = 'Cancelled' WHERE id = ?
+        ''', (rental_id,))
+        promote_waitlist(conn, rental['listing_id'], rental['start_date'], rental['end_date'])
+        
+        # Get renter info for notification
+        renter = conn.execute('SELECT u.name, u.id FROM users u JOIN rentals r ON u.id = r.user_id WHERE r.id = ?', (rental_id,)).fetchone()
+        listing_info = conn.execute('SELECT title FROM listings WHERE id = ?', (rental['listing_id'],)).fetchone()
+        
+        # Create notification for renter
+        if renter and listing_info:
+            conn.execute('''
+                INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
+                VALUES (?, 'rental_rejected', ?, ?, ?, 'rental')
+            ''', (
+                renter['id'],
+                'Rental Request Rejected',
+                f'Your rental request for "{listing_info["title"]}" from {rental["start_date"]} to {rental["end_date"]} has been rejected by the owner.',
+                rental_id
+            ))
+        
+        # Commit transaction
+        conn.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Rental request rejected'
+        })
+        
+        return jsonify({
+            'success': True,
+            'message': 'Rental request rejected'
+        })
+    except Exception as e:
+        # Rollback transaction on any error
+        if conn:
+            conn.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Error rejecting rental: {str(e)}'
+        }), 500
+    finally:
+        # Always close connection
+        if conn:
+            conn.close()
+
+BULK_DECISION_LIMIT = 200
+
+
+@app.route('/api/rentals/bulk', methods=['POST'])
+@login_required
+@idempotent
+def bulk_rental_decisions():
+    """Approve and reject many rental requests (owner only) in one transaction.
+
+    Body: {"decisions": [{"rental_id": 1, "action": "approve"}, ...]}.
+    Rejections are applied first, then approvals in date order; an approval
+    cancels pending requests it overlaps, including later ones in the batch.
+    Each decision gets its own result, and the batch commits as a whole.
+    """
+    user_id = session['user_id']
+    data = request.get_json(silent=True)
+    decisions = data.get('decisions') if isinstance(data, dict) else None
+    if not isinstance(decisions, list) or not decisions:
+        return jsonify({'success': False, 'message': 'decisions must be a non-empty list'}), 400
+    if len(decisions) > BULK_DECISION_LIMIT:
+        return jsonify({'success': False, 'message': f'At most {BULK_DECISION_LIMIT} decisions per batch'}), 400
+
+    results = []
+    wanted = {}
+    for decision in decisions:
+        rental_id = decision.get('rental_id') if isinstance(decision, dict) else None
+        action = decision.get('action') if isinstance(decision, dict) else None
+        result = {'rental_id': rental_id, 'action': action, 'success': False}
+        results.append(result)
+        if not isinstance(rental_id, int) or action not in ('approve', 'reject'):
+            result['message'] = 'Each decision needs an integer rental_id and action "approve" or "reject"'
+        elif rental_id in wanted:
+            result['message'] = 'Duplicate decision for this rental in the batch'
+        else:
+            wanted[rental_id] = result
+
+    conn = None
+    try:
+        conn = get_db()
+        # Take the write lock before reading so no other request can approve
+        # overlapping dates between the checks below and the commit
+        conn.execute('BEGIN IMMEDIATE')
+
+        placeholders = ','.join('?' * len(wanted))
+        rentals = {
+            rental['id']: rental for rental in conn.execute(f'''
+                SELECT r.*, l.user_id as owner_id, l.title as listing_title
+                FROM rentals r
+                JOIN listings l ON r.listing_id = l.id
+                WHERE r.id IN ({placeholders})
+            ''', list(wanted)).fetchall()
+        } if wanted else {}
+
+        approvals = []
+        rejections = []
+        for rental_id, result in wanted.items():
+            rental = rentals.get(rental_id)
+            if not rental:
+                result['message'] = 'Rental request not found'
+            elif rental['owner_id'] != user_id:
+                result['message'] = 'Access denied'
+            elif rental['status'] != 'Pending':
+                result['message'] = f'Rental request is already {rental["status"]}'
+            elif result['action'] == 'approve':
+                approvals.append(rental)
+            else:
+                rejections.append(rental)
+
+        # Current bookings on the affected listings, including the batch's own rows
+        listing_ids = sorted({rental['listing_id'] for rental in approvals})
+        bookings = conn.execute(f'''
+            SELECT r.id, r.user_id, r.listing_id, r.start_date, r.end_date, r.status, l.title as listing_title
+            FROM rentals r
+            JOIN listings l ON r.listing_id = l.id
+            WHERE r.listing_id IN ({','.join('?' * len(listing_ids))})
+            AND r.status IN ('Pending', 'Approved', 'Active')
+        ''', listing_ids).fetchall() if listing_ids else []
+
+        rejected_ids = {rental['id'] for rental in rejections}
+        confirmed = {}
+        pending = {}
+        for booking in bookings:
+            if booking['status'] == 'Pending':
+                if booking['id'] not in rejected_ids:
+                    pending.setdefault(booking['listing_id'], []).append(booking)
+            else:
+                confirmed.setdefault(booking['listing_id'], []).append(booking)
+
+        approved = []
+        cancelled = {}  # rental id -> (booking, id of the approval that displaced it)
+        for rental in sorted(approvals, key=lambda rental: (rental['start_date'], rental['end_date'], rental['id'])):
+            result = wanted[rental['id']]
+            if rental['id'] in cancelled:
+                result['message'] = f'Cancelled: overlaps rental #{cancelled[rental["id"]][1]} approved in this batch'
+                result['status'] = 'Cancelled'
+                continue
+            if any(date_ranges_overlap(rental, booking) for booking in confirmed.get(rental['listing_id'], [])):
+                result['message'] = 'Cannot approve: dates conflict with another confirmed booking'
+                continue
+            approved.append(rental)
+            confirmed.setdefault(rental['listing_id'], []).append(rental)
+            for booking in pending.get(rental['listing_id'], []):
+                if booking['id'] != rental['id'] and booking['id'] not in cancelled and date_ranges_overlap(rental, booking):
+                    cancelled[booking['id']] = (booking, rental['id'])
+            result.update(success=True, status='Approved', message='Rental request approved')
+
+        for rental in rejections:
+            wanted[rental['id']].update(success=True, status='Cancelled', message='Rental request rejected')
+        # Approvals that were themselves displaced already have their result
+        displaced = [booking for booking, _ in cancelled.values() if booking['id'] not in wanted]
+
+        conn.executemany(
+            'UPDATE rentals SET status = "Approved" WHERE id = ?',
+            [(rental['id'],) for rental in approved]
+        )
+        conn.executemany(
+            'UPDATE rentals SET status = "Cancelled" WHERE id = ?',
+            [(rental['id'],) for rental in rejections] + [(booking['id'],) for booking, _ in cancelled.values()]
+        )
+        conn.executemany('''
+            INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
+            VALUES (?, ?, ?, ?, ?, 'rental')
+        ''', [
+            (
+                rental['user_id'], 'rental_approved', 'Rental Request Approved',
+                f'Your rental request for "{rental["listing_title"]}" from {rental["start_date"]} to {rental["end_date"]} has been approved!',
+                rental['id']
+            )
+            for rental in approved
+        ] + [
+            (
+                rental['user_id'], 'rental_rejected', 'Rental Request Rejected',
+                f'Your rental request for "{rental["listing_title"]}" from {rental["start_date"]} to {rental["end_date"]} has been rejected by the owner.',
+                rental['id']
+            )
+            for rental in rejections
+        ] + [
+            (
+                booking['user_id'], 'rental_cancelled', 'Rental Request Cancelled',
+                f'Your rental request for "{booking["listing_title"]}" was cancelled due to another approved booking.',
+                booking['id']
+            )
+            for booking, _ in cancelled.values()
+        ])
+        for rental in rejections:
+            promote_waitlist(conn, rental['listing_id'], rental['start_date'], rental['end_date'])
+
+        conn.commit()
+        refresh_price_utilisation(rental['listing_id'] for rental in approved)
+
+        return jsonify({
+            'success': True,
+            'message': f'{len(approved)} approved, {len(rejections)} rejected, {len(displaced)} other requests cancelled',
+            'results': results,
+            'cancelled': [booking['id'] for booking in displaced]
+        })
+    except Exception as e:
+        # Rollback transaction on any error
+        if conn:
+            conn.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Error applying decisions: {str(e)}'
+        }), 500
+    finally:
+        # Always close connection
+        if conn:
+            conn.close()
+
+# ============================================
+# Waitlist
+# ============================================
+# Renters whose dates are already booked can queue for them instead of
+# polling availability. When a booking on a listing is rejected or withdrawn,
+# the waiting entries overlapping the freed range are re-checked oldest first
+# and the ones that now fit become Pending rental requests. An entry that
+# overlaps one promoted ahead of it keeps waiting, so the first in line gets
+# the slot and the next one moves up if that request falls through too.
+
+WAITLIST_PROMOTION_SQL = hot_query('promote_waitlist', '''
+    SELECT * FROM waitlist_entries
+    WHERE listing_id = ? AND status = 'Waiting'
+    AND start_date BETWEEN ? AND ?
+    AND end_date >= ?
+    ORDER BY id
+''', lambda sample: (sample['listing_id'], sample['five_days_ago'], '9999-12-31', sample['five_days_ago']))
+
+
+def promote_waitlist(conn, listing_id, start_date, end_date):
+    """Promote waiting entries that fit dates freed on a listing, in FIFO order.
+
+    Runs inside the caller's transaction; returns the new rental ids.
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    entries = conn.execute(WAITLIST_PROMOTION_SQL, (listing_id, today, end_date, start_date)).fetchall()
+    if not entries:
+        return []
+
+    listing = conn.execute('SELECT * FROM listings WHERE id = ?', (listing_id,)).fetchone()
+    # Earlier promotions still awaiting the owner hold their place in line
+    promoted_rentals = {row['rental_id'] for row in conn.execute(
+        "SELECT rental_id FROM waitlist_entries WHERE listing_id = ? AND status = 'Promoted'", (listing_id,)
+    ).fetchall()}
+    taken = [
+        rental for rental in conn.execute(DATE_CONFLICT_SQL, (listing_id, 0)).fetchall()
+        if rental['status'] in ('Approved', 'Active') or rental['id'] in promoted_rentals
+    ]
+    promoted = []
+    for entry in entries:
+        if any(date_ranges_overlap(entry, rental) for rental in taken):
+            continue
+        rental_id = conn.execute('''
+            INSERT INTO rentals (user_id, listing_id, start_date, end_date, days, total_amount, status, renter_address, location_of_use)
+            VALUES (?, ?, ?, ?, ?, ?, 'Pending', ?, ?)
+        ''', (
+            entry['user_id'], listing_id, entry['start_date'], entry['end_date'], entry['days'],
+            rental_total(listing, entry['days']), entry['renter_address'], entry['location_of_use']
+        )).lastrowid
+        conn.execute(
+            "UPDATE waitlist_entries SET status = 'Promoted', rental_id = ? WHERE id = ?",
+            (rental_id, entry['id'])
+        )
+        taken.append(entry)
+        promoted.append(rental_id)
+        conn.executemany('''
+            INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
+            VALUES (?, ?, ?, ?, ?, 'rental')
+        ''', [
+            (
+                entry['user_id'], 'waitlist_promoted', 'Waitlisted Dates Available',
+                f'"{listing["title"]}" is now free from {entry["start_date"]} to {entry["end_date"]}. Your waitlist spot has been turned into a rental request for the owner to approve.',
+                rental_id
+            ),
+            (
+                listing['user_id'], 'rental_request', 'New Rental Request',
+                f'A waitlisted request for "{listing["title"]}" from {entry["start_date"]} to {entry["end_date"]} ({entry["days"]} day{"s" if entry["days"] != 1 else ""}) is now waiting for your approval.',
+                rental_id
+            )
+        ])
+    metrics.inc('agrorent_waitlist_promotions_total', len(promoted))
+    return promoted
+
+
+@app.route('/api/listing/<int:listing_id>/waitlist', methods=['POST'])
+@login_required
+@idempotent
+def join_waitlist(listing_id):
+    """Queue for dates on a listing that are already booked"""
+    user_id = session['user_id']
+    start_date = request.form.get('start_date')
+    try:
+        days = int(request.form.get('days', 0))
+        start = datetime.strptime(start_date or '', '%Y-%m-%d')
+    except ValueError:
+        days = 0
+    if not days or days < 1:
+        return jsonify({'success': False, 'message': 'Missing required fields'}), 400
+    start_date = start.strftime('%Y-%m-%d')
+    end_date = (start + timedelta(days=days)).strftime('%Y-%m-%d')
+
+    conn = None
+    try:
+        conn = get_db()
+        listing = conn.execute('SELECT * FROM listings WHERE id = ?', (listing_id,)).fetchone()
+        if not listing:
+            return jsonify({'success': False, 'message': 'Listing not found'}), 404
+        if listing['user_id'] == user_id:
+            return jsonify({'success': False, 'message': 'You cannot rent your own equipment'}), 400
+        window_error = availability_window_error(listing, start_date, end_date)
+        if window_error:
+            return jsonify({'success': False, 'message': window_error}), 400
+
+        conflicts = check_date_conflict(listing_id, start_date, end_date)
+        if not any(conflict['status'] in ('Approved', 'Active') for conflict in conflicts):
+            return jsonify({
+                'success': False,
+                'message': 'These dates are not booked yet. Send a rental request instead.'
+            }), 400
+
+        entry = conn.execute('''
+            SELECT id FROM waitlist_entries
+            WHERE listing_id = ? AND user_id = ? AND status = 'Waiting' AND start_date = ? AND end_date = ?
+        ''', (listing_id, user_id, start_date, end_date)).fetchone()
+        if entry:
+            waitlist_id = entry['id']
+        else:
+            waitlist_id = conn.execute('''
+                INSERT INTO waitlist_entries (user_id, listing_id, start_date, end_date, days, renter_address, location_of_use)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                user_id, listing_id, start_date, end_date, days,
+                request.form.get('renter_address', '').strip(), request.form.get('location_of_use', '').strip()
+            )).lastrowid
+            conn.commit()
+
+        # Entries ahead in the queue for any of the same days
+        position = conn.execute('''
+            SELECT COUNT(*) FROM waitlist_entries
+            WHERE listing_id = ? AND status = 'Waiting'
+            AND start_date <= ? AND end_date >= ? AND id <= ?
+        ''', (listing_id, end_date, start_date, waitlist_id)).fetchone()[0]
+
         return jsonify({
             'success': True,
-            'message': 'Rental request approved successfully'
+            'message': f'You are number {position} on the waitlist. We will turn it into a rental request if these dates free up.',
+            'waitlist_id': waitlist_id,
+            'position': position
         })
     except Exception as e:
         # Rollback transaction on any error
@@ -1402,74 +4966,102 @@ def approve_rental(rental_id):
             conn.rollback()
         return jsonify({
             'success': False,
-            'message': f'Error approving rental: {str(e)}'
+            'message': f'Error joining waitlist: {str(e)}'
         }), 500
     finally:
         # Always close connection
         if conn:
             conn.close()
 
-@app.route('/api/rentals/<int:rental_id>/reject', methods=['POST'])
+
+@app.route('/api/waitlist')
 @login_required
-def reject_rental(rental_id):
-    """Reject a rental request (owner only) - with proper transaction management"""
+def get_my_waitlist():
+    """Get the current user's waitlist entries"""
+    conn = get_db()
+    entries = conn.execute('''
+        SELECT w.*, l.title
+        FROM waitlist_entries w
+        JOIN listings l ON w.listing_id = l.id
+        WHERE w.user_id = ?
+        ORDER BY w.created_at DESC
+    ''', (session['user_id'],)).fetchall()
+    conn.close()
+
+    return jsonify([{
+        'id': entry['id'],
+        'listing_id': entry['listing_id'],
+        'title': entry['title'],
+        'start_date': entry['start_date'],
+        'end_date': entry['end_date'],
+        'days': entry['days'],
+        'status': entry['status'],
+        'rental_id': entry['rental_id'],
+        'created_at': entry['created_at']
+    } for entry in entries])
+
+
+@app.route('/api/waitlist/<int:waitlist_id>/leave', methods=['POST'])
+@login_required
+def leave_waitlist(waitlist_id):
+    """Remove one of the current user's waiting entries"""
+    conn = get_db()
+    cursor = conn.execute(
+        "UPDATE waitlist_entries SET status = 'Left' WHERE id = ? AND user_id = ? AND status = 'Waiting'",
+        (waitlist_id, session['user_id'])
+    )
+    conn.commit()
+    conn.close()
+
+    if cursor.rowcount == 0:
+        return jsonify({'success': False, 'message': 'Waitlist entry not found'}), 404
+    return jsonify({'success': True, 'message': 'Removed from the waitlist'})
+
+
+@app.route('/api/rentals/<int:rental_id>/withdraw', methods=['POST'])
+@login_required
+@idempotent
+def withdraw_rental(rental_id):
+    """Withdraw the current user's own rental before it starts, freeing the dates"""
     user_id = session['user_id']
     conn = None
     try:
         conn = get_db()
-        
-        # Get rental and verify ownership
         rental = conn.execute('''
-            SELECT r.*, l.user_id as owner_id
+            SELECT r.*, l.user_id as owner_id, l.title as listing_title
             FROM rentals r
             JOIN listings l ON r.listing_id = l.id
             WHERE r.id = ?
         ''', (rental_id,)).fetchone()
-        
+
         if not rental:
             return jsonify({'success': False, 'message': 'Rental request not found'}), 404
-        
-        if rental['owner_id'] != user_id:
+        if rental['user_id'] != user_id:
             return jsonify({'success': False, 'message': 'Access denied'}), 403
-        
-        if rental['status'] != 'Pending':
-            return jsonify({
-                'success': False,
-                'message': f'Rental request is already {rental["status"]}'
-            }), 400
-        
-        # Update rental status to 'Cancelled'
+        if rental['status'] not in ('Pending', 'Approved'):
+            return jsonify({'success': False, 'message': f'Rental is already {rental["status"]}'}), 400
+        if rental['start_date'] <= datetime.now().strftime('%Y-%m-%d'):
+            return jsonify({'success': False, 'message': 'Rentals can only be withdrawn before the start date'}), 400
+
+        conn.execute("UPDATE rentals SET status = 'Withdrawn' WHERE id = ?", (rental_id,))
         conn.execute('''
-            UPDATE rentals SET status = 'Cancelled' WHERE id = ?
-        ''', (rental_id,))
-        
-        # Get renter info for notification
-        renter = conn.execute('SELECT u.name, u.id FROM users u JOIN rentals r ON u.id = r.user_id WHERE r.id = ?', (rental_id,)).fetchone()
-        listing_info = conn.execute('SELECT title FROM listings WHERE id = ?', (rental['listing_id'],)).fetchone()
-        
-        # Create notification for renter
-        if renter and listing_info:
-            conn.execute('''
-                INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
-                VALUES (?, 'rental_rejected', ?, ?, ?, 'rental')
-            ''', (
-                renter['id'],
-                'Rental Request Rejected',
-                f'Your rental request for "{listing_info["title"]}" from {rental["start_date"]} to {rental["end_date"]} has been rejected by the owner.',
-                rental_id
-            ))
-        
-        # Commit transaction
+            INSERT INTO notifications (user_id, type, title, message, related_id, related_type)
+            VALUES (?, 'rental_cancelled', ?, ?, ?, 'rental')
+        ''', (
+            rental['owner_id'],
+            'Rental Withdrawn',
+            f'The renter withdrew their booking for "{rental["listing_title"]}" from {rental["start_date"]} to {rental["end_date"]}.',
+            rental_id
+        ))
+        promote_waitlist(conn, rental['listing_id'], rental['start_date'], rental['end_date'])
+
         conn.commit()
-        
-        return jsonify({
-            'success': True,
-            'message': 'Rental request rejected'
-        })
-        
+        if rental['status'] == 'Approved':
+            refresh_price_utilisation([rental['listing_id']])
+
         return jsonify({
             'success': True,
-            'message': 'Rental request rejected'
+            'message': 'Rental withdrawn'
         })
     except Exception as e:
         # Rollback transaction on any error
@@ -1477,7 +5069,7 @@ def reject_rental(rental_id):
             conn.rollback()
         return jsonify({
             'success': False,
-            'message': f'Error rejecting rental: {str(e)}'
+            'message': f'Error withdrawing rental: {str(e)}'
         }), 500
     finally:
         # Always close connection
@@ -1514,6 +5106,12 @@ def get_notifications():
     
     return jsonify(notifications_data)
 
+NOTIFICATION_COUNT_SQL = hot_query('get_notification_count', '''
+    SELECT COUNT(*) as count FROM notifications 
+    WHERE user_id = ? AND is_read = 0
+''', lambda sample: (sample['user_id'],))
+
+
 @app.route('/api/notifications/count')
 @login_required
 def get_notification_count():
@@ -1521,10 +5119,7 @@ def get_notification_count():
     user_id = session['user_id']
     conn = get_db()
     
-    count = conn.execute('''
-        SELECT COUNT(*) as count FROM notifications 
-        WHERE user_id = ? AND is_read = 0
-    ''', (user_id,)).fetchone()
+    count = conn.execute(NOTIFICATION_COUNT_SQL, (user_id,)).fetchone()
     conn.close()
     
     return jsonify({'count': count['count'] if count else 0})
@@ -1580,6 +5175,13 @@ def generate_rental_agreement_pdf(rental_data):
     if not REPORTLAB_AVAILABLE:
         raise Exception("ReportLab library is not installed. Please install it using: pip install reportlab")
     
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+    from reportlab.lib import colors
+    
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
                            topMargin=72, bottomMargin=18)
@@ -1700,6 +5302,7 @@ def generate_rental_agreement_pdf(rental_data):
 
 @app.route('/api/rentals/<int:rental_id>/generate-contract', methods=['POST'])
 @login_required
+@idempotent
 def generate_contract(rental_id):
     """Generate and download PDF contract for a rental"""
     if not REPORTLAB_AVAILABLE:
@@ -1756,7 +5359,10 @@ def generate_contract(rental_id):
     }
     
     # Generate PDF
-    pdf_buffer = generate_rental_agreement_pdf(rental_data)
+    started = time.perf_counter()
+    with span('reportlab.build', rental_id=rental_id):
+        pdf_buffer = generate_rental_agreement_pdf(rental_data)
+    metrics.observe('agrorent_pdf_render_duration_seconds', time.perf_counter() - started)
     
     # Save PDF to contracts directory
     contracts_dir = 'contracts'
@@ -1765,7 +5371,7 @@ def generate_contract(rental_id):
     filename = f"Rental_Agreement_{rental_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
     contract_path = os.path.join(contracts_dir, filename)
     
-    with open(contract_path, 'wb') as f:
+    with span('file.write', path=contract_path), open(contract_path, 'wb') as f:
         f.write(pdf_buffer.getvalue())
     
     # Update rental record with contract path
@@ -1925,10 +5531,15 @@ def delete_listing(listing_id):
         
         # Delete listing from database
         conn.execute('DELETE FROM listings WHERE id = ? AND user_id = ?', (listing_id, user_id))
+        conn.execute('DELETE FROM condition_analyses WHERE listing_id = ?', (listing_id,))
+        conn.execute('DELETE FROM saved_search_matches WHERE listing_id = ?', (listing_id,))
         
         # Commit transaction
         conn.commit()
         
+        remove_listing_from_index(listing_id)
+        refresh_listing_price(listing_id)
+        
         return jsonify({
             'success': True,
             'message': 'Listing deleted successfully'
@@ -1959,9 +5570,10 @@ def edit_listing(listing_id):
         flash(translate_text('listings.edit.not_found'), 'danger')
         return redirect(url_for('listdashboard'))
     
-    # Store listing data in session for pre-filling form
+    # Store listing data in the (server-side) session for pre-filling the form
     session['editing_listing_id'] = listing_id
     session['editing_listing_data'] = dict(listing)
+    session['editing_listing_expires'] = time.time() + LISTING_DRAFT_TTL
     
     return redirect(url_for('listing'))
 
@@ -2255,6 +5867,10 @@ def heatmap():
 @app.route('/api/heatmap_locations')
 def get_heatmap_locations():
     """Get aggregated location data for heatmap"""
+    return jsonify(single_flight.do('heatmap_locations', None, heatmap_locations))
+
+
+def heatmap_locations():
     conn = get_db()
     # Group by location fields to get density. 
     # Using village_city, district, state to form a unique address.
@@ -2273,7 +5889,7 @@ def get_heatmap_locations():
             'weight': loc['count']
         })
     
-    return jsonify(result)
+    return result
 
 
 # ============================================
@@ -2285,8 +5901,36 @@ GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', "AIzaSyDHpTcJAYkrxQWh6bY0kvhYz
 # Set the API key in environment (for compatibility)
 os.environ['GEMINI_API_KEY'] = GEMINI_API_KEY
 
-# Initialize the Gemini client with API key
-client = genai.Client(api_key=GEMINI_API_KEY)
+# The Gemini client is created on the first chat or analysis request
+genai_client = None
+genai_client_lock = threading.Lock()
+
+
+def get_genai_client():
+    """Return the shared Gemini client, importing google.genai on first use"""
+    global genai_client
+    if genai_client is None:
+        with genai_client_lock:
+            if genai_client is None:
+                from google import genai
+                genai_client = genai.Client(api_key=GEMINI_API_KEY)
+    return genai_client
+
+
+def generate_content(operation, **kwargs):
+    """Call Gemini's generate_content and record how long it took"""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        with span(f'gemini {operation}', SPAN_KIND_CLIENT, model=kwargs.get('model', '')):
+            response = get_genai_client().models.generate_content(**kwargs)
+        outcome = 'success'
+        return response
+    finally:
+        metrics.observe(
+            'agrorent_gemini_request_duration_seconds', time.perf_counter() - started, GEMINI_BUCKETS,
+            operation=operation, outcome=outcome
+        )
 
 # System prompt for AgroRent chatbot
 PLATFORM_DATA = """
@@ -2348,6 +5992,237 @@ Instructions:
 - If someone wants to rent equipment, guide them through the process and provide links from platform data
 - IMPORTANT: When providing links, include the full URL (e.g., https://agrorent-r3i4.onrender.com/renting) so they become clickable. You can use markdown format [link text](url) or just include the URL directly."""
 
+
+# ============================================
+# Listing retrieval index for the chatbot
+# ============================================
+# Only the top matching listings are added to the prompt, so the prompt size
+# stays flat no matter how large the catalogue grows.
+CHAT_INDEX_DIMENSIONS = 4096
+CHAT_TOP_K = 5
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def listing_summary(listing):
+    """Build the one-line text used to index and describe a listing"""
+    location = ', '.join(part for part in (listing['village_city'], listing['district'], listing['state']) if part)
+    availability = f"available from {listing['available_from']}"
+    if listing['available_till']:
+        availability += f" till {listing['available_till']}"
+    return (
+        f"{listing['title']} | {listing['category']} | {listing['brand']} {listing['equipment_name']} | "
+        f"{location} | ₹{listing['price']:g} {listing['pricing_type']} | {availability}"
+    )
+
+
+class ListingIndex(ListingRows):
+    """TF-IDF index over listings stored as sparse NumPy vectors.
+
+    Terms are hashed into a fixed number of columns, and each row keeps only
+    the columns its summary uses, so memory grows with the text indexed
+    rather than rows x columns. Document frequencies are kept up to date
+    incrementally. When the catalogue has changed, the next search derives
+    IDF weights, row norms and a term-sorted postings array from the rows, so
+    a query only touches the postings of its own terms.
+    """
+
+    def __init__(self, dimensions=CHAT_INDEX_DIMENSIONS):
+        self.dimensions = dimensions
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.terms = []  # per row: sorted hashed term columns
+        self.frequencies = []  # per row: sublinear term frequency of each column
+        self.doc_freq = np.zeros(self.dimensions, dtype=np.float32)
+        self.summaries = {}
+        self.postings = None
+
+    def vectorize(self, text):
+        """Sorted hashed term columns of text and their sublinear term frequencies"""
+        counts = {}
+        for token in tokenize(text):
+            column = zlib.crc32(token.encode('utf-8')) % self.dimensions
+            counts[column] = counts.get(column, 0) + 1
+        terms = np.array(sorted(counts), dtype=np.int32)
+        return terms, (1 + np.log([counts[term] for term in terms])).astype(np.float32)
+
+    def _grow_rows(self, extra):
+        self.terms.extend([None] * extra)
+        self.frequencies.extend([None] * extra)
+
+    def _clear_row(self, row, listing_id):
+        self.doc_freq[self.terms[row]] -= 1
+        self.terms[row] = self.frequencies[row] = None
+        self.summaries.pop(listing_id, None)
+        self.postings = None
+
+    def _fill_row(self, row, listing):
+        summary = listing_summary(listing)
+        self.terms[row], self.frequencies[row] = self.vectorize(summary)
+        self.doc_freq[self.terms[row]] += 1
+        self.summaries[listing['id']] = summary
+        self.postings = None
+
+    def _index_postings(self):
+        """IDF weights, row norms and term-sorted postings for the current rows"""
+        idf = np.log((1 + len(self.rows)) / (1 + self.doc_freq)) + 1
+        rows = np.fromiter(self.rows.values(), dtype=np.int32, count=len(self.rows))
+        terms = np.concatenate([self.terms[row] for row in rows])
+        row_of = np.repeat(rows, [len(self.terms[row]) for row in rows])
+        weights = np.concatenate([self.frequencies[row] for row in rows]) * idf[terms]
+        norms = np.zeros(len(self.row_ids), dtype=np.float32)
+        np.add.at(norms, row_of, weights * weights)
+        norms = np.sqrt(norms)
+        norms[norms == 0] = 1
+        order = np.argsort(terms, kind='stable')
+        self.postings = (idf, norms, terms[order], row_of[order], weights[order])
+
+    def memory_bytes(self):
+        """Approximate bytes held by the vectors and the derived postings"""
+        total = self.doc_freq.nbytes + sum(
+            terms.nbytes + frequencies.nbytes
+            for terms, frequencies in zip(self.terms, self.frequencies) if terms is not None
+        )
+        if self.postings is not None:
+            total += sum(array.nbytes for array in self.postings)
+        return total
+
+    def build(self, listings):
+        """Rebuild the whole index from listing rows"""
+        self._rebuild((listing,) for listing in listings)
+
+    def search(self, query, top_k=CHAT_TOP_K):
+        """Return (listing_id, score, summary) for the best matching listings"""
+        with self.lock:
+            if not self.rows:
+                return []
+            if self.postings is None:
+                # Weights, norms and postings only change when the catalogue does
+                self._index_postings()
+            idf, norms, posting_terms, posting_rows, posting_weights = self.postings
+            terms, frequencies = self.vectorize(query)
+            if not len(terms):
+                return []
+            scores = np.zeros(len(norms), dtype=np.float32)
+            starts = np.searchsorted(posting_terms, terms)
+            ends = np.searchsorted(posting_terms, terms, side='right')
+            for start, end, weight in zip(starts, ends, frequencies * idf[terms]):
+                np.add.at(scores, posting_rows[start:end], posting_weights[start:end] * weight)
+            scores /= norms
+            count = min(top_k, len(scores))
+            best = np.argpartition(-scores, count - 1)[:count]
+            best = best[np.argsort(-scores[best])]
+            return [
+                (self.row_ids[row], float(scores[row]), self.summaries[self.row_ids[row]])
+                for row in best
+                if scores[row] > 0 and self.row_ids[row] is not None
+            ]
+
+
+listing_index = None
+listing_index_lock = threading.Lock()
+
+
+def get_listing_index():
+    """Create the listing index on first use, or return None without NumPy"""
+    global listing_index, np
+    if listing_index is None and NUMPY_AVAILABLE:
+        with listing_index_lock:
+            if listing_index is None:
+                import numpy as np
+                listing_index = ListingIndex()
+    return listing_index
+
+
+def build_listing_index(index):
+    """Rebuild the listing index from the listings table"""
+    conn = get_db()
+    listings = conn.execute('SELECT * FROM listings').fetchall()
+    conn.close()
+    index.build(listings)
+
+
+def ensure_listing_index():
+    """Build the listing index on first use and periodically afterwards"""
+    index = get_listing_index()
+    if index is None:
+        return None
+    if index.is_stale():
+        single_flight.do('listing_index', None, lambda: build_listing_index(index))
+    return index
+
+
+def refresh_listing_in_index(listing_id):
+    """Re-index a single listing after it was created or updated"""
+    if listing_index is None or listing_index.built_at is None:
+        return
+    conn = get_db()
+    listing = conn.execute('SELECT * FROM listings WHERE id = ?', (listing_id,)).fetchone()
+    conn.close()
+    if listing:
+        listing_index.upsert(listing)
+    else:
+        listing_index.remove(listing_id)
+
+
+def remove_listing_from_index(listing_id):
+    """Drop a deleted listing from the index"""
+    if listing_index is not None:
+        listing_index.remove(listing_id)
+
+
+def build_listing_context(user_message, top_k=CHAT_TOP_K):
+    """Describe the listings that best match the message, with their upcoming bookings"""
+    index = ensure_listing_index()
+    if index is None:
+        return ''
+    matches = index.search(user_message, top_k)
+    if not matches:
+        return ''
+
+    listing_ids = [listing_id for listing_id, _, _ in matches]
+    placeholders = ','.join('?' * len(listing_ids))
+    conn = get_db()
+    bookings = conn.execute(f'''
+        SELECT listing_id, start_date, end_date
+        FROM rentals
+        WHERE listing_id IN ({placeholders})
+        AND status IN ('Approved', 'Active')
+        AND end_date >= ?
+        ORDER BY start_date
+    ''', (*listing_ids, datetime.now().strftime('%Y-%m-%d'))).fetchall()
+    conn.close()
+
+    booked = {}
+    for booking in bookings:
+        booked.setdefault(booking['listing_id'], []).append(f"{booking['start_date']} to {booking['end_date']}")
+
+    lines = []
+    for listing_id, _, summary in matches:
+        line = f"- [ID {listing_id}] {summary}"
+        if listing_id in booked:
+            line += f" | booked: {'; '.join(booked[listing_id])}"
+        lines.append(line)
+    return (
+        f"Live listings matching the question (today is {datetime.now().strftime('%Y-%m-%d')}; "
+        f"only these were retrieved, more may exist on the Renting page):\n" + '\n'.join(lines)
+    )
+
+
+def build_chat_prompt(user_message):
+    """Combine the system prompt, retrieved listings and the user message"""
+    listing_context = build_listing_context(user_message)
+    if listing_context:
+        return f"{AGRORENT_SYSTEM_PROMPT}\n\n{listing_context}\n\nUser: {user_message}\nAssistant:"
+    return f"{AGRORENT_SYSTEM_PROMPT}\n\nUser: {user_message}\nAssistant:"
+
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """Handle chat messages from the frontend"""
@@ -2358,11 +6233,12 @@ def chat():
         if not user_message:
             return jsonify({'error': 'No message provided'}), 400
         
-        # Combine system prompt with user message
-        full_prompt = f"{AGRORENT_SYSTEM_PROMPT}\n\nUser: {user_message}\nAssistant:"
+        # Combine system prompt, retrieved listings and user message
+        full_prompt = build_chat_prompt(user_message)
         
         # Generate response using Gemini
-        response = client.models.generate_content(
+        response = generate_content(
+            'chat',
             model="gemini-2.5-flash",
             contents=full_prompt
         )
@@ -2405,6 +6281,119 @@ Tasks:
 
 Analyze only what is visible in the image. Keep issues_found list items very brief (3-5 words each)."""
 
+def cached_condition_analysis(listing, conn=None):
+    """Stored analysis of the listing's current main image, or None"""
+    own_conn = conn is None
+    conn = conn or get_db()
+    try:
+        row = conn.execute(
+            'SELECT result, analyzed_at FROM condition_analyses WHERE listing_id = ? AND main_image = ?',
+            (listing['id'], listing['main_image'] or '')
+        ).fetchone()
+    finally:
+        if own_conn:
+            conn.close()
+    if not row:
+        return None
+    result = json.loads(row['result'])
+    result['analyzed_at'] = row['analyzed_at']
+    return result
+
+
+def save_condition_analysis(listing, result):
+    """Remember a structured analysis so the listing isn't sent to Gemini again"""
+    conn = get_db()
+    try:
+        conn.execute(
+            'INSERT OR REPLACE INTO condition_analyses (listing_id, main_image, result) VALUES (?, ?, ?)',
+            (listing['id'], listing['main_image'], json.dumps(result))
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        app.logger.warning('Could not cache condition analysis for listing %s: %s', listing['id'], e)
+    finally:
+        conn.close()
+
+
+def run_condition_analysis(listing):
+    """Send the listing's main image to Gemini; returns (result, status)"""
+    # Read image from file system
+    image_path = os.path.join('static', listing['main_image'])
+    if not os.path.exists(image_path):
+        return {'error': 'Image file not found'}, 404
+    
+    with span('file.read', path=image_path), open(image_path, 'rb') as f:
+        image_bytes = f.read()
+    
+    # Determine MIME type from file extension
+    file_ext = os.path.splitext(image_path)[1].lower()
+    mime_type_map = {
+        '.jpg': 'image/jpeg',
+        '.jpeg': 'image/jpeg',
+        '.png': 'image/png',
+        '.gif': 'image/gif',
+        '.webp': 'image/webp'
+    }
+    mime_type = mime_type_map.get(file_ext, 'image/jpeg')
+    
+    # Create image part for Gemini
+    from google.genai import types
+    image = types.Part.from_bytes(
+        data=image_bytes,
+        mime_type=mime_type
+    )
+    
+    # Generate content with Gemini
+    response = generate_content(
+        'analyze_condition',
+        model="gemini-2.5-flash",
+        contents=[ANALYSIS_PROMPT, image],
+    )
+    
+    # Parse the response
+    response_text = response.text
+    
+    # Try to extract JSON from the response
+    # Gemini might wrap JSON in markdown code blocks
+    json_match = re.search(r'\{[\s\S]*\}', response_text)
+    if json_match:
+        json_str = json_match.group(0)
+        try:
+            result = json.loads(json_str)
+            # Ensure all required fields exist
+            if 'condition_score' not in result:
+                result['condition_score'] = None
+            if 'issues_found' not in result:
+                result['issues_found'] = []
+            if 'summary' not in result:
+                result['summary'] = response_text[:100] if response_text else 'Analysis completed'
+            if 'recommendation' not in result:
+                result['recommendation'] = 'Review the equipment before renting'
+            
+            if result['condition_score'] is not None:
+                save_condition_analysis(listing, result)
+            return result, 200
+        except json.JSONDecodeError:
+            # If JSON parsing fails, return structured response with raw text
+            return {
+                'condition_score': None,
+                'issues_found': [],
+                'summary': response_text[:150] if len(response_text) > 150 else response_text,
+                'recommendation': 'Could not parse structured response. Please review the equipment manually.',
+                'raw_response': response_text
+            }, 200
+    else:
+        # If no JSON found, return structured response
+        return {
+            'condition_score': None,
+            'issues_found': [],
+            'summary': response_text[:150] if len(response_text) > 150 else response_text,
+            'recommendation': 'Could not parse structured response. Please review the equipment manually.',
+            'raw_response': response_text
+        }, 200
+
+
 @app.route('/api/analyze-condition/<int:listing_id>', methods=['POST'])
 @login_required
 def analyze_machine_condition(listing_id):
@@ -2420,86 +6409,587 @@ def analyze_machine_condition(listing_id):
         if not listing['main_image']:
             return jsonify({'error': 'No image available for analysis'}), 400
         
-        # Read image from file system
-        image_path = os.path.join('static', listing['main_image'])
-        if not os.path.exists(image_path):
-            return jsonify({'error': 'Image file not found'}), 404
-        
-        with open(image_path, 'rb') as f:
-            image_bytes = f.read()
-        
-        # Determine MIME type from file extension
-        file_ext = os.path.splitext(image_path)[1].lower()
-        mime_type_map = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp'
-        }
-        mime_type = mime_type_map.get(file_ext, 'image/jpeg')
-        
-        # Create image part for Gemini
-        image = types.Part.from_bytes(
-            data=image_bytes,
-            mime_type=mime_type
-        )
+        cached = cached_condition_analysis(listing)
+        if cached:
+            return jsonify(cached)
         
-        # Generate content with Gemini
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=[ANALYSIS_PROMPT, image],
+        result, status = single_flight.do(
+            'analyze_condition', (listing_id, listing['main_image']), lambda: run_condition_analysis(listing)
         )
-        
-        # Parse the response
-        response_text = response.text
-        
-        # Try to extract JSON from the response
-        # Gemini might wrap JSON in markdown code blocks
-        json_match = re.search(r'\{[\s\S]*\}', response_text)
-        if json_match:
-            json_str = json_match.group(0)
-            try:
-                result = json.loads(json_str)
-                # Ensure all required fields exist
-                if 'condition_score' not in result:
-                    result['condition_score'] = None
-                if 'issues_found' not in result:
-                    result['issues_found'] = []
-                if 'summary' not in result:
-                    result['summary'] = response_text[:100] if response_text else 'Analysis completed'
-                if 'recommendation' not in result:
-                    result['recommendation'] = 'Review the equipment before renting'
-                
-                return jsonify(result)
-            except json.JSONDecodeError:
-                # If JSON parsing fails, return structured response with raw text
-                return jsonify({
-                    'condition_score': None,
-                    'issues_found': [],
-                    'summary': response_text[:150] if len(response_text) > 150 else response_text,
-                    'recommendation': 'Could not parse structured response. Please review the equipment manually.',
-                    'raw_response': response_text
-                })
-        else:
-            # If no JSON found, return structured response
-            return jsonify({
-                'condition_score': None,
-                'issues_found': [],
-                'summary': response_text[:150] if len(response_text) > 150 else response_text,
-                'recommendation': 'Could not parse structured response. Please review the equipment manually.',
-                'raw_response': response_text
-            })
-            
+        return jsonify(result), status
     except Exception as e:
         return jsonify({'error': f'Analysis failed: {str(e)}'}), 500
 
 
+# ============================================
+# Synthetic data
+# ============================================
+# Deterministic bulk data for benchmarks and checks: the same seed and anchor
+# date always produce the same rows. Everything is inserted with executemany
+# in a single transaction, with explicit ids so nothing has to be read back.
+SYNTHETIC_PASSWORD = 'password'  # every generated user can sign in with this
+
+SYNTHETIC_LOCATIONS = {
+    'Maharashtra': ('41', ['Pune', 'Nashik', 'Nagpur', 'Kolhapur', 'Satara', 'Ahmednagar', 'Solapur', 'Aurangabad']),
+    'Punjab': ('14', ['Ludhiana', 'Amritsar', 'Patiala', 'Bathinda', 'Jalandhar', 'Sangrur']),
+    'Haryana': ('13', ['Karnal', 'Hisar', 'Kurukshetra', 'Sirsa', 'Panipat']),
+    'Uttar Pradesh': ('24', ['Meerut', 'Agra', 'Bareilly', 'Muzaffarnagar', 'Varanasi', 'Lucknow']),
+    'Madhya Pradesh': ('45', ['Indore', 'Bhopal', 'Ujjain', 'Jabalpur', 'Hoshangabad']),
+    'Gujarat': ('38', ['Ahmedabad', 'Rajkot', 'Anand', 'Mehsana', 'Junagadh']),
+    'Karnataka': ('58', ['Belagavi', 'Mysuru', 'Dharwad', 'Davanagere', 'Mandya']),
+    'Rajasthan': ('32', ['Kota', 'Jaipur', 'Sri Ganganagar', 'Alwar']),
+    'Tamil Nadu': ('61', ['Thanjavur', 'Coimbatore', 'Madurai', 'Erode']),
+    'Andhra Pradesh': ('52', ['Guntur', 'Krishna', 'East Godavari', 'Kurnool']),
+    'Telangana': ('50', ['Warangal', 'Nizamabad', 'Karimnagar', 'Nalgonda']),
+    'West Bengal': ('71', ['Bardhaman', 'Nadia', 'Hooghly', 'Murshidabad']),
+    'Bihar': ('80', ['Patna', 'Purnia', 'Muzaffarpur', 'Rohtas']),
+}
+# Listing category -> (brands, power/spec choices, price range for 'Per day')
+SYNTHETIC_CATEGORIES = {
+    'Tractor': (['Mahindra', 'John Deere', 'Sonalika', 'Swaraj', 'Massey Ferguson', 'New Holland', 'Eicher'],
+                ['35 HP', '45 HP', '50 HP', '55 HP', '65 HP', '75 HP'], (800, 3000)),
+    'Harvester': (['John Deere', 'Kartar', 'Preet', 'Claas', 'New Holland'],
+                  ['14 ft cutter', '12 ft cutter', '101 HP', '110 HP'], (3000, 9000)),
+    'Sprayer': (['Aspee', 'Kisankraft', 'Neptune', 'Mitra'], ['16 L', '600 L', '1000 L boom'], (200, 1200)),
+    'Tiller': (['VST', 'Kirloskar', 'Honda', 'Kisankraft'], ['9 HP', '12 HP', '15 HP'], (400, 1500)),
+    'Seed Drill': (['Fieldking', 'Lemken', 'Dasmesh', 'Khedut'], ['9 row', '11 row', '13 row'], (500, 1800)),
+    'Pump': (['Kirloskar', 'Crompton', 'Shakti', 'CRI'], ['3 HP', '5 HP', '7.5 HP', '10 HP'], (150, 800)),
+    'Cultivator': (['Fieldking', 'Sonalika', 'Khedut', 'Landforce'], ['9 tyne', '11 tyne', '13 tyne'], (400, 1400)),
+    'Rotavator': (['Shaktiman', 'Maschio Gaspardo', 'Fieldking', 'Sonalika'], ['5 ft', '6 ft', '7 ft'], (600, 2000)),
+    'Thresher': (['Dasmesh', 'Preet', 'Punjab', 'Khedut'], ['Multicrop', 'Paddy', 'Wheat'], (1000, 3500)),
+    'Other': (['Local', 'Kisankraft', 'Mahindra'], ['Trailer 3 ton', 'Baler', 'Laser leveller'], (300, 2500)),
+}
+SYNTHETIC_CATEGORY_WEIGHTS = [30, 8, 10, 8, 7, 12, 8, 9, 5, 3]
+SYNTHETIC_FIRST_NAMES = [
+    'Aarav', 'Anil', 'Asha', 'Baldev', 'Deepa', 'Ganesh', 'Gurpreet', 'Harish', 'Kavita', 'Lakshmi',
+    'Mahesh', 'Manoj', 'Meena', 'Nitin', 'Pooja', 'Rajesh', 'Ramesh', 'Savita', 'Sunil', 'Vijay',
+]
+SYNTHETIC_LAST_NAMES = [
+    'Patil', 'Singh', 'Yadav', 'Sharma', 'Jadhav', 'Reddy', 'Gowda', 'Patel', 'Kumar', 'Pawar',
+    'Chauhan', 'Deshmukh', 'Naidu', 'Verma', 'Mahadik', 'Gill', 'Sandhu', 'Thakur',
+]
+# Relative demand by month (Jan..Dec): kharif sowing in Jun-Jul, kharif
+# harvest and rabi sowing in Oct-Nov, rabi harvest in Mar-Apr.
+SYNTHETIC_MONTH_DEMAND = [0.6, 0.7, 1.3, 1.5, 0.8, 1.4, 1.3, 0.7, 0.8, 1.5, 1.6, 0.9]
+SYNTHETIC_PRICING = {'Per day': 1.0, 'Per hour': 0.15, 'Per acre': 0.35, 'Per season': 20.0}
+SYNTHETIC_ISSUES = [
+    'Engine not starting', 'Hydraulic lift not working', 'Oil leak near gearbox', 'Clutch slipping',
+    'Overheating after an hour', 'Pump not building pressure', 'Harvester belt broken', 'Battery drains overnight',
+]
+
+
+def synthetic_phone(rng):
+    return f'+91 {rng.choice("6789")}{rng.randrange(10 ** 8, 10 ** 9)}'
+
+
+def generate_synthetic_data(conn, users=1000, listings=2000, rentals=20000, mechanics=100, seed=42, anchor=None):
+    """Bulk-insert a realistic dataset and return the number of rows per table.
+
+    Rentals are spread over listings with a long-tailed popularity, follow the
+    seasonal demand curve over the year before and the 90 days after `anchor`
+    (default today), never double-book a listing, and get statuses that match
+    their dates. Each rental also gets the notifications the app would send.
+    Listings need users to own them; rentals are only made when there are
+    listings to book.
+    """
+    if listings and not users:
+        raise ValueError('Listings need at least one user to own them')
+    import random
+    rng = random.Random(seed)
+    today = anchor or datetime.now().date()
+    window_start = today - timedelta(days=365)
+    window_days = 365 + 90
+
+    def next_id(table):
+        return (conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0] or 0) + 1
+
+    def timestamp(day, rng=rng):
+        return f"{day.strftime('%Y-%m-%d')} {rng.randrange(7, 21):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+
+    counts = {}
+    try:
+        # Users
+        first_user = next_id('users')
+        # Same format generate_password_hash() produces, with a seeded salt so the
+        # output is reproducible and few iterations so sign-in doesn't dominate load tests
+        salt = ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(16))
+        password_hash = 'pbkdf2:sha256:1000${}${}'.format(
+            salt, hashlib.pbkdf2_hmac('sha256', SYNTHETIC_PASSWORD.encode(), salt.encode(), 1000).hex()
+        )
+        user_rows = []
+        for n in range(users):
+            name = f'{rng.choice(SYNTHETIC_FIRST_NAMES)} {rng.choice(SYNTHETIC_LAST_NAMES)}'
+            user_rows.append((
+                first_user + n, name, f'user{first_user + n}@agrorent.test', synthetic_phone(rng), password_hash,
+                timestamp(window_start - timedelta(days=rng.randrange(365)))
+            ))
+        conn.executemany(
+            'INSERT INTO users (id, name, email, phone, password, created_at) VALUES (?, ?, ?, ?, ?, ?)', user_rows
+        )
+        counts['users'] = len(user_rows)
+
+        # Listings, owned by roughly a third of the users
+        owners = user_rows[:max(1, users // 3)]
+        states = list(SYNTHETIC_LOCATIONS)
+        categories = list(SYNTHETIC_CATEGORIES)
+        first_listing = next_id('listings')
+        listing_rows = []
+        for n in range(listings):
+            owner = rng.choice(owners)
+            state = rng.choice(states)
+            pincode_prefix, districts = SYNTHETIC_LOCATIONS[state]
+            district = rng.choice(districts)
+            category = rng.choices(categories, SYNTHETIC_CATEGORY_WEIGHTS)[0]
+            brands, specs, (low, high) = SYNTHETIC_CATEGORIES[category]
+            brand = rng.choice(brands)
+            pricing_type = rng.choices(list(SYNTHETIC_PRICING), [70, 15, 12, 3])[0]
+            price = round(rng.uniform(low, high) * SYNTHETIC_PRICING[pricing_type] / 10) * 10 or 10
+            transport = rng.random() < 0.4
+            listing_rows.append((
+                first_listing + n, owner[0], owner[1], owner[3], owner[2], rng.choice(['Call', 'WhatsApp', 'SMS']),
+                category, f'{brand} {category}', brand, rng.randrange(2008, today.year + 1),
+                rng.choices(['New', 'Good', 'Needs maintenance'], [15, 75, 10])[0], rng.choice(specs),
+                state, district, district, f'{pincode_prefix}{rng.randrange(1000, 9999)}',
+                f'within {rng.choice([5, 10, 20, 25, 50])} km', pricing_type, float(price),
+                (window_start - timedelta(days=rng.randrange(30))).strftime('%Y-%m-%d'),
+                'Yes' if transport else 'No', float(rng.randrange(200, 1500, 50)) if transport else None,
+                f'{brand} {category} for rent in {district}',
+                f'Well maintained {category.lower()} available for farmers in and around {district}, {state}.',
+                timestamp(window_start - timedelta(days=rng.randrange(30)))
+            ))
+        conn.executemany('''
+            INSERT INTO listings (
+                id, user_id, owner_name, phone, email, contact_method,
+                category, equipment_name, brand, year, condition, power_spec,
+                state, district, village_city, pincode, service_radius,
+                pricing_type, price, available_from,
+                transport_included, transport_charge, title, description, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', listing_rows)
+        counts['listings'] = len(listing_rows)
+
+        # Rentals: a long-tailed share per listing, laid out back to back in time
+        first_rental = next_id('rentals')
+        # Capped so the busiest machines are booked most days but never beyond the window
+        per_listing = [0] * len(listing_rows)
+        if listing_rows:
+            popularity = [min(rng.paretovariate(2.0), 8.0) for _ in listing_rows]
+            for index in rng.choices(range(len(listing_rows)), popularity, k=rentals):
+                per_listing[index] += 1
+
+        # The loop below runs once per rental, so dates are day numbers with
+        # cached ISO strings and random draws avoid the slower helpers.
+        rand = rng.random
+        today_number = today.toordinal()
+        date_strings = {}
+
+        def iso(day_number):
+            value = date_strings.get(day_number)
+            if value is None:
+                value = date_strings[day_number] = datetime.fromordinal(day_number).strftime('%Y-%m-%d')
+            return value
+
+        times = [f'{rng.randrange(7, 21):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}' for _ in range(997)]
+        month_demand = {}  # day number -> demand multiplier
+        durations = [1, 2, 3, 4, 5, 7, 10, 14]
+        duration_weights = list(itertools.accumulate([30, 22, 16, 10, 8, 7, 4, 3]))
+        user_count = len(user_rows)
+        window_end = window_start.toordinal() + window_days
+
+        rental_rows = []
+        notification_rows = []
+        for listing, booked in zip(listing_rows, per_listing):
+            if not booked:
+                continue
+            listing_id, owner_id, title, price, district = listing[0], listing[1], listing[22], listing[18], listing[14]
+            mean_gap = max(0.5, window_days / booked - 3)
+            lengths = rng.choices(durations, cum_weights=duration_weights, k=booked)
+            while sum(lengths) > window_days:
+                # More bookings than the window can hold back to back
+                lengths.pop()
+            # needed[i]: days that bookings i onwards take back to back, so
+            # starting booking i by window_end - needed[i] keeps them all inside
+            needed = list(itertools.accumulate(reversed(lengths)))[::-1] + [0]
+            day = min(window_start.toordinal() + int(rand() * (int(mean_gap) + 1)), window_end - needed[0])
+            for index, days in enumerate(lengths):
+                end = day + days - 1
+                renter = user_rows[int(rand() * user_count)]
+                roll = rand()
+                if end < today_number:
+                    status = 'Approved' if roll < 0.70 else 'Cancelled' if roll < 0.95 else 'Pending'
+                elif day <= today_number:
+                    status = 'Active' if roll < 0.60 else 'Approved' if roll < 0.90 else 'Cancelled'
+                else:
+                    status = 'Pending' if roll < 0.45 else 'Approved' if roll < 0.85 else 'Cancelled'
+                created = min(today_number, day - 1 - int(rand() * 20))
+                answered = min(today_number, created + 1)
+                is_old = today_number - created > 7
+                rental_id = first_rental + len(rental_rows)
+                start_string, end_string, created_string = iso(day), iso(end), iso(created)
+                rental_rows.append((
+                    rental_id, renter[0], listing_id, start_string, end_string, days, float(days * price), status,
+                    f'{renter[1]}, {district}', district, f'{created_string} {times[rental_id % 997]}'
+                ))
+
+                period = f'{start_string} to {end_string}'
+                notification_rows.append((
+                    owner_id, 'rental_request', 'New Rental Request',
+                    f'{renter[1]} has requested to rent "{title}" from {period} ({days} days).',
+                    rental_id, int(is_old or rand() < 0.3), f'{created_string} {times[rental_id % 997]}'
+                ))
+                if status == 'Approved' or status == 'Active':
+                    notification_rows.append((
+                        renter[0], 'rental_approved', 'Rental Request Approved',
+                        f'Your rental request for "{title}" from {period} has been approved!',
+                        rental_id, int(is_old or rand() < 0.3), f'{iso(answered)} {times[(rental_id + 1) % 997]}'
+                    ))
+                elif status == 'Cancelled':
+                    notification_rows.append((
+                        renter[0], 'rental_rejected', 'Rental Request Rejected',
+                        f'Your rental request for "{title}" from {period} has been rejected.',
+                        rental_id, int(is_old or rand() < 0.3), f'{iso(answered)} {times[(rental_id + 1) % 997]}'
+                    ))
+
+                # Gap to the next booking shrinks in high-demand months,
+                demand = month_demand.get(end)
+                if demand is None:
+                    demand = month_demand[end] = SYNTHETIC_MONTH_DEMAND[datetime.fromordinal(end).month - 1]
+                # but leaves room for the remaining bookings before the window ends
+                day = min(end + 1 + int(rng.expovariate(1 / mean_gap) / demand), window_end - needed[index + 1])
+        conn.executemany('''
+            INSERT INTO rentals (
+                id, user_id, listing_id, start_date, end_date, days, total_amount, status,
+                renter_address, location_of_use, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rental_rows)
+        conn.executemany('''
+            INSERT INTO notifications (user_id, type, title, message, related_id, related_type, is_read, created_at)
+            VALUES (?, ?, ?, ?, ?, 'rental', ?, ?)
+        ''', notification_rows)
+        counts['rentals'] = len(rental_rows)
+        counts['notifications'] = len(notification_rows)
+
+        # Mechanics and their service requests
+        first_mechanic = next_id('mechanics')
+        mechanic_rows = []
+        request_rows = []
+        for n in range(mechanics):
+            user = user_rows[-1 - n] if n < len(user_rows) // 10 else None
+            state = rng.choice(states)
+            districts = rng.sample(SYNTHETIC_LOCATIONS[state][1], 2)
+            mechanic_id = first_mechanic + n
+            joined = timestamp(window_start - timedelta(days=rng.randrange(365)))
+            mechanic_rows.append((
+                mechanic_id, user[0] if user else None,
+                user[1] if user else f'{rng.choice(SYNTHETIC_FIRST_NAMES)} {rng.choice(SYNTHETIC_LAST_NAMES)}',
+                user[3] if user else synthetic_phone(rng), user[2] if user else None, rng.randrange(1, 30),
+                rng.choice(MECHANIC_SPECIALIZATIONS), f'{districts[0]}, {districts[1]}, {state}',
+                float(rng.randrange(200, 1500, 50)), 'Field repairs and servicing of farm machinery.',
+                int(rng.random() < 0.8), joined, joined
+            ))
+            for _ in range(int(rng.expovariate(1 / 8))):
+                created = today - timedelta(days=rng.randrange(180))
+                request_rows.append((
+                    mechanic_id, f'{rng.choice(SYNTHETIC_FIRST_NAMES)} {rng.choice(SYNTHETIC_LAST_NAMES)}',
+                    synthetic_phone(rng), rng.choice(districts), rng.choice(SYNTHETIC_ISSUES),
+                    rng.choices(MECHANIC_REQUEST_STATUSES, [20, 30, 50] if (today - created).days > 14 else [60, 30, 10])[0],
+                    timestamp(created), timestamp(min(today, created + timedelta(days=rng.randrange(5))))
+                ))
+        conn.executemany('''
+            INSERT INTO mechanics (
+                id, user_id, full_name, phone, email, experience_years,
+                specialization, service_locations, base_charge, description, is_available,
+                created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', mechanic_rows)
+        conn.executemany('''
+            INSERT INTO mechanic_requests (
+                mechanic_id, farmer_name, phone, location, issue_description, status, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', request_rows)
+        counts['mechanics'] = len(mechanic_rows)
+        counts['mechanic_requests'] = len(request_rows)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return counts
+
+
+@app.cli.command('seed-data')
+@click.option('--users', type=click.IntRange(min=0), default=1000, show_default=True)
+@click.option('--listings', type=click.IntRange(min=0), default=2000, show_default=True)
+@click.option('--rentals', type=click.IntRange(min=0), default=20000, show_default=True)
+@click.option('--mechanics', type=click.IntRange(min=0), default=100, show_default=True)
+@click.option('--seed', default=42, show_default=True, help='Same seed and anchor date give the same data.')
+@click.option('--anchor-date', type=click.DateTime(['%Y-%m-%d']), help='Date treated as today (default: today).')
+@click.option('--database', help='SQLite file to fill (default: the app database).')
+def seed_data_command(users, listings, rentals, mechanics, seed, anchor_date, database):
+    """Fill the database with deterministic synthetic users, listings, rentals and mechanics"""
+    global DATABASE
+    if listings and not users:
+        raise click.BadParameter('listings need at least one user to own them', param_hint='--users')
+    if rentals and not listings:
+        raise click.BadParameter('rentals need at least one listing to book', param_hint='--listings')
+    if database:
+        DATABASE = database
+    init_db()
+    conn = get_db()
+    # Nothing here needs to survive a crash, so skip fsyncs during the load, and
+    # give SQLite enough page cache to keep the indexes being built in memory
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+    started = time.perf_counter()
+    counts = generate_synthetic_data(
+        conn, users=users, listings=listings, rentals=rentals, mechanics=mechanics,
+        seed=seed, anchor=anchor_date.date() if anchor_date else None
+    )
+    elapsed = time.perf_counter() - started
+    conn.close()
+    for table, count in counts.items():
+        click.echo(f'{table:<18} {count:>10,}')
+    click.echo(f'Inserted {sum(counts.values()):,} rows into {DATABASE} in {elapsed:.1f}s')
+
+
+# ============================================
+# Query plan checks
+# ============================================
+# Latency budgets (median ms) for the hot queries on a dataset with
+# QUERY_CHECK_RENTALS rentals; queries without an entry get the default.
+QUERY_CHECK_RENTALS = 100000
+QUERY_BUDGET_DEFAULT_MS = 5.0
+QUERY_BUDGETS_MS = {
+    'check_date_conflict': 2.0,
+    'get_notification_count': 2.0,
+    'get_rental_requests.ownership': 1.0,
+}
+
+def hot_query_sample(conn):
+    """Pick the worst-case ids for the hot queries: the busiest listing and renter"""
+    listing = conn.execute('''
+        SELECT l.id, l.user_id FROM rentals r JOIN listings l ON l.id = r.listing_id
+        GROUP BY l.id ORDER BY COUNT(*) DESC LIMIT 1
+    ''').fetchone()
+    user = conn.execute('SELECT user_id FROM rentals GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1').fetchone()
+    return {
+        'listing_id': listing['id'],
+        'owner_id': listing['user_id'],
+        'user_id': user['user_id'],
+        'five_days_ago': (datetime.now().date() - timedelta(days=5)).strftime('%Y-%m-%d'),
+    }
+
+
+def load_query_check_data(conn, rentals, seed):
+    """Fill an empty database with synthetic data sized by rentals and return the hot-query sample"""
+    generate_synthetic_data(
+        conn, users=max(10, rentals // 50), listings=max(10, rentals // 20),
+        rentals=rentals, mechanics=0, seed=seed
+    )
+    return hot_query_sample(conn)
+
+
+def check_hot_query(conn, name, sample, runs):
+    """Return (plan steps, full-scan steps, median ms) for a registered hot query"""
+    query = HOT_QUERIES[name]
+    params = query['sample_params'](sample)
+    plan = explain_query_plan(conn, query['sql'], params)
+    scans = [step for step in plan if step.startswith('SCAN')]
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        conn.execute(query['sql'], params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return plan, scans, timings[len(timings) // 2]
+
+
+def hot_query_failures(name, scans, median_ms):
+    """Messages for a hot query's full scans and for going over its latency budget"""
+    budget_ms = QUERY_BUDGETS_MS.get(name, QUERY_BUDGET_DEFAULT_MS)
+    failures = []
+    if scans:
+        failures.append(f"{name} scans: {'; '.join(scans)}")
+    if median_ms > budget_ms:
+        failures.append(f'{name} took {median_ms:.2f}ms, over its {budget_ms}ms budget')
+    return failures
+
+
+@app.cli.command('check-query-plans')
+@click.option('--rentals', default=QUERY_CHECK_RENTALS, show_default=True, help='Synthetic rentals to load.')
+@click.option('--runs', default=20, show_default=True, help='Timed runs per query; the median counts.')
+@click.option('--seed', default=42, show_default=True)
+def check_query_plans_command(rentals, runs, seed):
+    """Fail if a hot query does a full table scan or exceeds its latency budget"""
+    import tempfile
+    global DATABASE
+    original_database = DATABASE
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        DATABASE = os.path.join(tmp, 'query-plans.db')
+        try:
+            init_db()
+            conn = get_db()
+            started = time.perf_counter()
+            sample = load_query_check_data(conn, rentals, seed)
+            click.echo(f'Loaded {rentals:,} rentals in {time.perf_counter() - started:.1f}s')
+            for name in sorted(HOT_QUERIES):
+                plan, scans, median_ms = check_hot_query(conn, name, sample, runs)
+                query_failures = hot_query_failures(name, scans, median_ms)
+                budget_ms = QUERY_BUDGETS_MS.get(name, QUERY_BUDGET_DEFAULT_MS)
+                click.echo(f"{'FAIL' if query_failures else 'ok  '} {name:<32} {median_ms:>7.2f}ms (budget {budget_ms}ms)")
+                for step in plan:
+                    click.echo(f'       {step}')
+                failures.extend(query_failures)
+            conn.close()
+        finally:
+            DATABASE = original_database
+    if failures:
+        raise click.ClickException('\n'.join(failures))
+    click.echo('OK')
+
+
+# ============================================
+# Startup diagnostics
+# ============================================
+STARTUP_BUDGET_MS = 400  # import app + configure_app() in a fresh interpreter
+LAZY_IMPORTS = ('google.genai', 'reportlab', 'numpy')
+
+
+def configure_app(config=None):
+    """Apply config to the module's single Flask app and return it.
+
+    This is not a factory: every call configures and returns the same `app`,
+    and {'DATABASE': path} repoints the module-wide DATABASE, so one process
+    serves one configuration. Nothing expensive happens here: the database
+    schema, sample listings, PDF library and Gemini client are all set up on
+    first use.
+    """
+    global DATABASE
+    if config:
+        app.config.update(config)
+        DATABASE = app.config.get('DATABASE', DATABASE)
+    return app
+
+
+def warm_up():
+    """Do the one-off startup work in the master process before forking.
+
+    Used by gunicorn's preload mode (see gunicorn.conf.py): the schema is
+    created once instead of by every worker, and the heavy libraries are
+    imported so that workers share those pages copy-on-write.
+    """
+    ensure_database()
+    translation_catalog.load()
+    for module in LAZY_IMPORTS:
+        if importlib.util.find_spec(module.split('.')[0]) is not None:
+            importlib.import_module(module)
+
+
+def reinit_after_fork():
+    """Reset per-process state in a freshly forked worker.
+
+    Locks may have been copied in a held state, and the Gemini client's HTTP
+    connections must not be shared between processes. The listing index is
+    rebuilt lazily by each worker.
+    """
+    global genai_client, genai_client_lock, listing_index, listing_index_lock, database_lock, profiler_lock
+    genai_client = None
+    genai_client_lock = threading.Lock()
+    listing_index = None
+    listing_index_lock = threading.Lock()
+    database_lock = threading.Lock()
+    translation_catalog.lock = threading.Lock()
+    translation_catalog.checked_at = 0.0
+    session_store.reset()
+    metrics.reset()
+    trace_exporter.reset()
+    single_flight.reset()
+    market_refresher.reset()
+    query_profiles.clear()
+    profiler_lock = threading.Lock()
+    allocation_tracker.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reinit_after_fork)
+
+
+def measure_import_times(module='app'):
+    """Import a module in a fresh interpreter under -X importtime and parse the report"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}; {module}.configure_app()'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise click.ClickException(result.stderr.strip().splitlines()[-1])
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us)
+        })
+    return entries
+
+
+def measure_startup_ms(module='app'):
+    """Wall-clock milliseconds to import the app and call configure_app() in a fresh interpreter"""
+    code = (
+        'import time; started = time.perf_counter(); '
+        f'import {module}; {module}.configure_app(); '
+        'print((time.perf_counter() - started) * 1000)'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise click.ClickException(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+@app.cli.command('import-report')
+@click.option('--top', default=20, help='Number of packages to list.')
+def import_report_command(top):
+    """Show which imports dominate app startup (like python -X importtime)"""
+    entries = measure_import_times()
+    total = next(entry for entry in reversed(entries) if entry['module'] == 'app')
+    packages = [entry for entry in entries if entry['depth'] == 1]
+    packages.sort(key=lambda entry: entry['cumulative_us'], reverse=True)
+    click.echo(f"{'cumulative':>12} {'self':>10}  package")
+    for entry in packages[:top]:
+        click.echo(f"{entry['cumulative_us'] / 1000:>10.1f}ms {entry['self_us'] / 1000:>8.1f}ms  {entry['module']}")
+    click.echo(f"{total['cumulative_us'] / 1000:>10.1f}ms {total['self_us'] / 1000:>8.1f}ms  app (total)")
+
+
+@app.cli.command('startup-check')
+@click.option('--budget-ms', default=STARTUP_BUDGET_MS, show_default=True, help='Allowed startup time.')
+@click.option('--runs', default=5, show_default=True, help='Fresh interpreters to time; the fastest counts.')
+def startup_check_command(budget_ms, runs):
+    """Fail if importing the app and calling configure_app() exceeds the budget"""
+    timings = sorted(measure_startup_ms() for _ in range(runs))
+    click.echo(f'Startup: best {timings[0]:.1f}ms, median {timings[len(timings) // 2]:.1f}ms, budget {budget_ms}ms')
+    eager = sorted({
+        name for entry in measure_import_times() for name in LAZY_IMPORTS
+        if entry['module'] == name or entry['module'].startswith(f'{name}.')
+    })
+    if eager:
+        raise click.ClickException(f"Imported at startup but should be lazy: {', '.join(eager)}")
+    if timings[0] > budget_ms:
+        raise click.ClickException(f'Startup took {timings[0]:.1f}ms, over the {budget_ms}ms budget')
+    click.echo('OK')
+
+
 if __name__ == '__main__':
     # Check if API key is set
     if GEMINI_API_KEY == "your-api-key-here" or not GEMINI_API_KEY:
         print("Warning: Please set your GEMINI_API_KEY in the code!")
         print("Edit app.py and replace 'your-api-key-here' with your actual API key.")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    configure_app().run(debug=True, host='0.0.0.0', port=5000)
 
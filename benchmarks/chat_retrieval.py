@@ -0,0 +1,112 @@
+"""Benchmark the chatbot's listing retrieval stage.
+
+Reports index build time, memory, query latency and how much smaller the prompt is
+compared with pasting the whole catalogue into it.
+
+Usage:
+    python -m benchmarks.chat_retrieval --listings 5000 --queries 200
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import app as agrorent
+
+CATEGORIES = ['Tractor', 'Harvester', 'Sprayer', 'Pump', 'Tiller', 'Seed Drill', 'Rotavator', 'Thresher']
+BRANDS = ['Mahindra', 'John Deere', 'Sonalika', 'Swaraj', 'Kubota', 'Kirloskar', 'New Holland', 'Eicher']
+LOCATIONS = [
+    ('Maharashtra', 'Nashik'), ('Maharashtra', 'Pune'), ('Maharashtra', 'Nagpur'),
+    ('Punjab', 'Ludhiana'), ('Punjab', 'Amritsar'), ('Haryana', 'Karnal'),
+    ('Gujarat', 'Ahmedabad'), ('Uttar Pradesh', 'Meerut'), ('Madhya Pradesh', 'Indore'),
+    ('Karnataka', 'Belagavi'), ('Kerala', 'Thrissur'), ('Rajasthan', 'Kota'),
+]
+PRICING_TYPES = ['Per day', 'Per hour', 'Per acre']
+QUERIES = [
+    'is there a harvester available in Nashik next week',
+    'cheap tractor near Pune',
+    'water pump for irrigation in Ludhiana',
+    'John Deere rotavator Karnal',
+    'sprayer per hour Ahmedabad',
+    'seed drill Kerala',
+]
+
+
+def seed_listings(conn, count, rng):
+    user_id = conn.execute(
+        "INSERT INTO users (name, email, password) VALUES ('Bench Owner', 'bench@example.com', 'x')"
+    ).lastrowid
+    rows = []
+    for number in range(count):
+        category = rng.choice(CATEGORIES)
+        brand = rng.choice(BRANDS)
+        state, district = rng.choice(LOCATIONS)
+        rows.append((
+            user_id, 'Bench Owner', '+91 9000000000', 'WhatsApp', category,
+            f'{brand} {category} {number}', brand, 'Good', state, district, district,
+            '400001', 'within 25 km', rng.choice(PRICING_TYPES), float(rng.randrange(500, 5000, 50)),
+            '2024-01-01', 'Yes', f'{brand} {category} for rent in {district}',
+            f'Well maintained {category.lower()} available in {district}.'
+        ))
+    conn.executemany('''
+        INSERT INTO listings (
+            user_id, owner_name, phone, contact_method, category,
+            equipment_name, brand, condition, state, district, village_city,
+            pincode, service_radius, pricing_type, price,
+            available_from, transport_included, title, description
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--listings', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    index = agrorent.get_listing_index()
+    if index is None:
+        raise SystemExit('NumPy is not installed; the retrieval index is disabled.')
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        agrorent.DATABASE = os.path.join(tmp, 'bench.db')
+        agrorent.init_db()
+        conn = agrorent.get_db()
+        seed_listings(conn, args.listings, rng)
+        listings = conn.execute('SELECT * FROM listings').fetchall()
+        conn.close()
+
+        index.build(listings)
+        build_seconds = index.build_seconds
+
+        latencies = []
+        retrieved_sizes = []
+        for number in range(args.queries):
+            query = QUERIES[number % len(QUERIES)]
+            started = time.perf_counter()
+            index.search(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            retrieved_sizes.append(len(agrorent.build_chat_prompt(query)))
+
+        catalogue = '\n'.join(f'- {agrorent.listing_summary(listing)}' for listing in listings)
+        full_size = len(f'{agrorent.AGRORENT_SYSTEM_PROMPT}\n\n{catalogue}\n\nUser: {QUERIES[0]}\nAssistant:')
+        retrieved_size = statistics.mean(retrieved_sizes)
+        latencies.sort()
+
+        print(f'Listings indexed:        {len(listings)}')
+        print(f'Index build time:        {build_seconds * 1000:.1f} ms')
+        print(f'Index memory:            {index.memory_bytes() / 1024 / 1024:.1f} MiB')
+        print(f'Query latency (mean):    {statistics.mean(latencies):.2f} ms')
+        print(f'Query latency (p95):     {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms')
+        print(f'Prompt size (catalogue): {full_size:,} chars')
+        print(f'Prompt size (top-{agrorent.CHAT_TOP_K}):     {retrieved_size:,.0f} chars')
+        print(f'Prompt size reduction:   {100 * (1 - retrieved_size / full_size):.1f}%')
+
+
+if __name__ == '__main__':
+    main()
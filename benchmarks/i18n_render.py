@@ -0,0 +1,66 @@
+"""Benchmark translated page rendering for each locale.
+
+Renders the public pages through the Flask test client in en/hi/mr and
+reports the mean render time per page, plus the raw cost of a single t()
+lookup. Pass --debug to measure with the mtime-based hot reload enabled.
+
+Usage:
+    python -m benchmarks.i18n_render --iterations 50
+    python -m benchmarks.i18n_render --debug
+"""
+import argparse
+import statistics
+import time
+
+import app as agrorent
+
+PAGES = ['/', '/about', '/market', '/signin', '/signup', '/mechanics', '/mechanics/register']
+LOOKUP_KEYS = ['nav.home', 'auth.signin.welcome', 'mechanic.list.request.fields.issue', 'missing.key']
+
+
+def render_times(client, lang, iterations):
+    with client.session_transaction() as session:
+        session['lang'] = lang
+    results = {}
+    for page in PAGES:
+        client.get(page)  # warm up template cache
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = client.get(page)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, (page, response.status_code)
+        results[page] = statistics.mean(samples)
+    return results
+
+
+def lookup_time(lang, iterations):
+    with agrorent.app.test_request_context():
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for key in LOOKUP_KEYS:
+                agrorent.translate_text(key, locale=lang, name='Asha')
+        elapsed = time.perf_counter() - started
+    return elapsed / (iterations * len(LOOKUP_KEYS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--debug', action='store_true', help='enable debug mode (hot reload checks)')
+    args = parser.parse_args()
+
+    agrorent.app.debug = args.debug
+    client = agrorent.app.test_client()
+
+    print(f"{'page':<22}" + ''.join(f'{lang:>10}' for lang in agrorent.SUPPORTED_LANGUAGES))
+    timings = {lang: render_times(client, lang, args.iterations) for lang in agrorent.SUPPORTED_LANGUAGES}
+    for page in PAGES:
+        print(f'{page:<22}' + ''.join(f'{timings[lang][page]:>8.2f}ms' for lang in agrorent.SUPPORTED_LANGUAGES))
+    print(f"{'t() lookup':<22}" + ''.join(
+        f'{lookup_time(lang, args.iterations * 100):>8.2f}us' for lang in agrorent.SUPPORTED_LANGUAGES
+    ))
+
+
+if __name__ == '__main__':
+    main()
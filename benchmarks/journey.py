@@ -0,0 +1,345 @@
+"""Load-test the core rental journey end to end.
+
+Seeds a temporary database with `generate_synthetic_data()`, starts gunicorn
+with the production profile and Gemini replaced by a local stub, then drives
+a mix of virtual users from several client processes:
+
+    browser  GET /api/listings, /api/listing/<id> and its /availability
+    renter   browses, then POST /rent_equipment for future dates
+    owner    GET /api/listings/<id>/rental-requests, POST .../approve,
+             POST .../generate-contract
+    chat     POST /chat (answered by the stub after --gemini-latency-ms)
+
+Reports throughput and p50/p95/p99 per endpoint and writes the results as
+JSON (with the git commit) so runs can be compared across commits.
+
+Usage:
+    python -m benchmarks.journey --clients 8 --duration 30
+    python -m benchmarks.journey --compare benchmarks/results/<older run>.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode
+
+import app as agrorent
+from benchmarks.serving import percentile, wait_for_port
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+# Directories the app reads relative to its working directory
+SHARED_DIRS = ['i18n', 'static', 'assets']
+ROLES = {'browser': 6, 'renter': 3, 'owner': 1, 'chat': 0}
+
+
+class StubModels:
+    """Stands in for genai.Client().models with a fixed delay"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def generate_content(self, model, contents, **kwargs):
+        time.sleep(self.latency)
+        return type('StubResponse', (), {'text': 'Tractors are available near you from Rs 1200 per day.'})()
+
+
+def stubbed_app():
+    """gunicorn entry point: the app with Gemini calls answered locally"""
+    models = StubModels(float(os.environ.get('AGRORENT_GEMINI_STUB_LATENCY_MS', 800)) / 1000)
+    client = type('StubClient', (), {'models': models})()
+    agrorent.get_genai_client = lambda: client
+    return agrorent.configure_app()
+
+
+def prepare_database(path, args):
+    """Seed the database; return the renter/owner accounts the clients use"""
+    agrorent.configure_app({'DATABASE': path})
+    agrorent.init_db()
+    conn = agrorent.get_db()
+    agrorent.generate_synthetic_data(
+        conn, users=args.users, listings=args.listings, rentals=args.rentals,
+        mechanics=0, seed=args.seed, anchor=date.today()
+    )
+    listing_ids = [row['id'] for row in conn.execute('SELECT id FROM listings')]
+    renters = [row['email'] for row in conn.execute('SELECT email FROM users ORDER BY id')]
+    owners = {}
+    for row in conn.execute('''
+        SELECT u.email, l.id FROM listings l JOIN users u ON u.id = l.user_id
+        WHERE EXISTS (SELECT 1 FROM rentals r WHERE r.listing_id = l.id AND r.status = 'Pending')
+    '''):
+        owners.setdefault(row['email'], []).append(row['id'])
+    conn.close()
+    return {'listing_ids': listing_ids, 'renters': renters, 'owners': owners}
+
+
+class Client:
+    """Keep-alive HTTP client that tracks the session cookie and records samples"""
+
+    def __init__(self, port, samples):
+        self.port = port
+        self.samples = samples
+        self.cookie = None
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, endpoint, method, path, form=None):
+        headers = {'Accept': 'application/json'}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+            cookie = response.getheader('Set-Cookie')
+            if cookie:
+                self.cookie = cookie.split(';', 1)[0]
+            if response.getheader('Connection', '').lower() == 'close':
+                self.conn.close()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            data, status = b'', 0
+        self.samples.append((endpoint, (time.perf_counter() - started) * 1000, status))
+        return status, data
+
+    def json(self, endpoint, method, path, form=None):
+        status, data = self.request(endpoint, method, path, form)
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def sign_in(self, email):
+        self.request('POST /signin', 'POST', '/signin', {'email': email, 'password': agrorent.SYNTHETIC_PASSWORD})
+
+    def close(self):
+        self.conn.close()
+
+
+def browse(client, rng, dataset):
+    client.request('GET /api/listings', 'GET', '/api/listings')
+    for _ in range(rng.randint(1, 3)):
+        listing_id = rng.choice(dataset['listing_ids'])
+        client.request('GET /api/listing/<id>', 'GET', f'/api/listing/{listing_id}')
+        client.request('GET /api/listing/<id>/availability', 'GET', f'/api/listing/{listing_id}/availability')
+    return listing_id
+
+
+def renter_journey(client, rng, dataset):
+    listing_id = browse(client, rng, dataset)
+    start = date.today() + timedelta(days=rng.randint(1, 120))
+    client.request('POST /rent_equipment', 'POST', '/rent_equipment', {
+        'listing_id': listing_id,
+        'days': rng.choice([1, 2, 3, 5]),
+        'start_date': start.strftime('%Y-%m-%d'),
+        'renter_address': 'Benchmark Farm, Pune',
+        'location_of_use': 'Pune',
+    })
+
+
+def owner_journey(client, rng, listing_ids):
+    listing_id = rng.choice(listing_ids)
+    status, requests = client.json(
+        'GET /api/listings/<id>/rental-requests', 'GET', f'/api/listings/{listing_id}/rental-requests'
+    )
+    pending = [rental for rental in requests or [] if rental.get('status') == 'Pending']
+    if status != 200 or not pending:
+        return
+    rental_id = rng.choice(pending)['id']
+    status, _ = client.json('POST /api/rentals/<id>/approve', 'POST', f'/api/rentals/{rental_id}/approve', {})
+    if status == 200:
+        client.request(
+            'POST /api/rentals/<id>/generate-contract', 'POST', f'/api/rentals/{rental_id}/generate-contract', {}
+        )
+
+
+def chat_journey(client, rng, dataset):
+    conn = client.conn
+    started = time.perf_counter()
+    try:
+        conn.request('POST', '/chat', body=json.dumps({'message': 'Is there a tractor near Pune next week?'}),
+                     headers={'Content-Type': 'application/json', 'Cookie': client.cookie or ''})
+        response = conn.getresponse()
+        response.read()
+        status = response.status
+    except (http.client.HTTPException, OSError):
+        conn.close()
+        status = 0
+    client.samples.append(('POST /chat', (time.perf_counter() - started) * 1000, status))
+
+
+def client_loop(port, dataset, roles, duration, seed):
+    """Run virtual users back to back for `duration` seconds; return (endpoint, ms, status) samples"""
+    rng = random.Random(seed)
+    samples = []
+    names = [name for name in roles if roles[name]]
+    weights = [roles[name] for name in names]
+    owner_emails = sorted(dataset['owners'])
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        role = rng.choices(names, weights)[0]
+        if role == 'owner' and not owner_emails:
+            role = 'browser'
+        client = Client(port, samples)
+        if role == 'owner':
+            email = rng.choice(owner_emails)
+            client.sign_in(email)
+            for _ in range(rng.randint(1, 3)):
+                owner_journey(client, rng, dataset['owners'][email])
+        else:
+            client.sign_in(rng.choice(dataset['renters']))
+            for _ in range(rng.randint(1, 4)):
+                {'browser': browse, 'renter': renter_journey, 'chat': chat_journey}[role](client, rng, dataset)
+        client.close()
+    return samples
+
+
+def summarize(samples, duration):
+    by_endpoint = {}
+    for endpoint, ms, status in samples:
+        by_endpoint.setdefault(endpoint, []).append((ms, status))
+    endpoints = {}
+    for endpoint, values in sorted(by_endpoint.items()):
+        latencies = sorted(ms for ms, _ in values)
+        statuses = {}
+        for _, status in values:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        endpoints[endpoint] = {
+            'requests': len(values),
+            'throughput_rps': len(values) / duration,
+            'errors': sum(1 for _, status in values if status == 0 or status >= 500),
+            'statuses': statuses,
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+        }
+    latencies = sorted(ms for _, ms, _ in samples)
+    total = {
+        'requests': len(samples),
+        'throughput_rps': len(samples) / duration,
+        'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+    return endpoints, total
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=REPO_DIR, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_report(endpoints, total, baseline=None):
+    print(f"{'endpoint':<44} {'req':>7} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'err':>5}")
+    rows = list(endpoints.items()) + [('TOTAL', total)]
+    for endpoint, result in rows:
+        line = (
+            f"{endpoint:<44} {result['requests']:>7} {result['throughput_rps']:>8.1f} "
+            f"{result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms {result['errors']:>5}"
+        )
+        old = (baseline or {}).get('total' if endpoint == 'TOTAL' else 'endpoints', {})
+        old = old if endpoint == 'TOTAL' else old.get(endpoint)
+        if old and old.get('p95_ms'):
+            line += f"   p95 {100 * (result['p95_ms'] / old['p95_ms'] - 1):+.0f}% vs {baseline['commit']}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=8, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--listings', type=int, default=1000)
+    parser.add_argument('--rentals', type=int, default=10000)
+    parser.add_argument('--mix', default=','.join(f'{role}={weight}' for role, weight in ROLES.items()),
+                        help='virtual user weights, e.g. browser=6,renter=3,owner=1,chat=1')
+    parser.add_argument('--gemini-latency-ms', type=float, default=800)
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='JSON results file (default: benchmarks/results/journey-<time>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier JSON results to compare p95 latencies against')
+    args = parser.parse_args()
+    roles = {role: int(weight) for role, weight in (item.split('=') for item in args.mix.split(','))}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Run the server from a scratch directory so contracts and metrics stay out of the repo
+        for name in SHARED_DIRS:
+            os.symlink(os.path.join(REPO_DIR, name), os.path.join(tmp, name))
+        db_path = os.path.join(tmp, 'journey.db')
+        started = time.perf_counter()
+        dataset = prepare_database(db_path, args)
+        print(f'Seeded {args.rentals:,} rentals in {time.perf_counter() - started:.1f}s')
+
+        env = dict(
+            os.environ,
+            PYTHONPATH=REPO_DIR,
+            AGRORENT_DATABASE=db_path,
+            AGRORENT_SESSION_DATABASE=os.path.join(tmp, 'sessions.db'),
+            AGRORENT_SECRET_KEY='benchmark-secret',
+            AGRORENT_GEMINI_STUB_LATENCY_MS=str(args.gemini_latency_ms),
+            WEB_CONCURRENCY=str(args.workers),
+            GUNICORN_THREADS=str(args.threads),
+            PORT=str(args.port),
+        )
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', os.path.join(REPO_DIR, 'gunicorn.conf.py'),
+             '--access-logfile', '/dev/null', 'benchmarks.journey:stubbed_app()'],
+            cwd=tmp, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for_port(args.port)
+            with ProcessPoolExecutor(args.clients) as pool:
+                futures = [
+                    pool.submit(client_loop, args.port, dataset, roles, args.duration, args.seed + number)
+                    for number in range(args.clients)
+                ]
+                samples = [sample for future in futures for sample in future.result()]
+        finally:
+            server.terminate()
+            server.wait()
+
+    endpoints, total = summarize(samples, args.duration)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(endpoints, total, baseline)
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"journey-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit,
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'cpus': os.cpu_count(),
+            'config': vars(args),
+            'endpoints': endpoints,
+            'total': total,
+        }, f, indent=2)
+    print(f'\nResults written to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Benchmark gunicorn worker/thread layouts to choose a serving profile.
+
+Starts gunicorn with gunicorn.conf.py for each worker x thread combination
+against a temporary seeded database, drives a read-heavy request mix from
+several client processes and reports throughput and latency percentiles.
+
+Usage:
+    python -m benchmarks.serving --workers 1,2,4 --threads 1,4,8 --duration 10
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlencode
+
+import app as agrorent
+from benchmarks.chat_retrieval import seed_listings
+
+BENCH_EMAIL = 'bench@example.com'
+BENCH_PASSWORD = 'bench-password'
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def prepare_database(path, listings, seed):
+    agrorent.configure_app({'DATABASE': path})
+    agrorent.init_db()
+    conn = agrorent.get_db()
+    seed_listings(conn, listings, random.Random(seed))
+    conn.execute(
+        'UPDATE users SET password = ? WHERE email = ?',
+        (agrorent.generate_password_hash(BENCH_PASSWORD), BENCH_EMAIL)
+    )
+    conn.commit()
+    listing_ids = [row['id'] for row in conn.execute('SELECT id FROM listings')]
+    conn.close()
+    return listing_ids
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def sign_in(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request(
+        'POST', '/signin',
+        body=urlencode({'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}),
+        headers={'Content-Type': 'application/x-www-form-urlencoded'}
+    )
+    response = conn.getresponse()
+    response.read()
+    cookie = response.getheader('Set-Cookie')
+    conn.close()
+    return cookie.split(';', 1)[0]
+
+
+def client_loop(port, cookie, listing_ids, duration, seed):
+    """Run requests back to back for `duration` seconds; return (ms, status) samples"""
+    rng = random.Random(seed)
+    paths = [
+        (5, lambda: '/api/listings'),
+        (3, lambda: f'/api/listing/{rng.choice(listing_ids)}'),
+        (3, lambda: f'/api/listing/{rng.choice(listing_ids)}/availability'),
+        (1, lambda: '/api/heatmap_locations'),
+        (1, lambda: '/about'),
+    ]
+    weights = [weight for weight, _ in paths]
+    samples = []
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        path = rng.choices(paths, weights)[0][1]()
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers={'Cookie': cookie})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            status = 0
+        samples.append(((time.perf_counter() - started) * 1000, status))
+    conn.close()
+    return samples
+
+
+def run_layout(workers, threads, args, db_path, listing_ids):
+    env = dict(
+        os.environ,
+        AGRORENT_DATABASE=db_path,
+        AGRORENT_SECRET_KEY='benchmark-secret',
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        PORT=str(args.port),
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--access-logfile', '/dev/null'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(args.port)
+        cookie = sign_in(args.port)
+        with ProcessPoolExecutor(args.clients) as pool:
+            futures = [
+                pool.submit(client_loop, args.port, cookie, listing_ids, args.duration, seed)
+                for seed in range(args.clients)
+            ]
+            samples = [sample for future in futures for sample in future.result()]
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(ms for ms, _ in samples)
+    errors = sum(1 for _, status in samples if status != 200)
+    return {
+        'workers': workers,
+        'threads': threads,
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': len(samples) / args.duration,
+        'mean_ms': statistics.mean(latencies) if latencies else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated worker counts')
+    parser.add_argument('--threads', default='1,4,8', help='comma-separated thread counts')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client processes')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per layout')
+    parser.add_argument('--listings', type=int, default=500)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'serving.db')
+        listing_ids = prepare_database(db_path, args.listings, args.seed)
+        print(f"{'workers':>7} {'threads':>7} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+        for workers in (int(value) for value in args.workers.split(',')):
+            for threads in (int(value) for value in args.threads.split(',')):
+                result = run_layout(workers, threads, args, db_path, listing_ids)
+                results.append(result)
+                print(
+                    f"{workers:>7} {threads:>7} {result['throughput_rps']:>9.1f} "
+                    f"{result['p50_ms']:>6.1f}ms {result['p95_ms']:>6.1f}ms {result['p99_ms']:>6.1f}ms "
+                    f"{result['errors']:>7}"
+                )
+
+    # Prefer the layout within 5% of the best throughput that uses the fewest processes
+    healthy = [result for result in results if result['errors'] == 0] or results
+    best = max(result['throughput_rps'] for result in healthy)
+    recommended = min(
+        (result for result in healthy if result['throughput_rps'] >= 0.95 * best),
+        key=lambda result: (result['workers'], result['p95_ms'])
+    )
+    print(
+        f"\nRecommended: WEB_CONCURRENCY={recommended['workers']} "
+        f"GUNICORN_THREADS={recommended['threads']} ({recommended['throughput_rps']:.1f} req/s, "
+        f"p95 {recommended['p95_ms']:.1f}ms) on {os.cpu_count()} CPUs"
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'cpus': os.cpu_count(), 'results': results, 'recommended': recommended}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
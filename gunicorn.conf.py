@@ -0,0 +1,69 @@
+"""Production serving profile for AgroRent.
+
+    gunicorn -c gunicorn.conf.py
+
+Settings can be overridden with environment variables:
+
+    PORT                  port to bind (default 5000)
+    WEB_CONCURRENCY       worker processes (default: min(2 x CPUs, 4))
+    GUNICORN_THREADS      threads per worker (default 4)
+    AGRORENT_DATABASE     path to the SQLite database
+    AGRORENT_SECRET_KEY   session secret shared by all workers; if unset a key
+                          is generated once into instance/secret_key
+    AGRORENT_METRICS_DIR  where workers write metrics for /metrics to
+                          aggregate (default instance/metrics)
+
+The defaults come from `python -m benchmarks.serving`. SQLite serialises
+writes and most request time is spent in SQLite or waiting on Gemini, so a
+few processes with several threads each beat many single-threaded
+processes; re-run the benchmark on the target machine before tuning.
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'app:configure_app()'
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Must be set before app.py is imported so every worker shares one directory
+os.environ.setdefault('AGRORENT_METRICS_DIR', os.path.join('instance', 'metrics'))
+
+workers = int(os.environ.get('WEB_CONCURRENCY', min(2 * multiprocessing.cpu_count(), 4)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+keepalive = 5
+
+# Load the app once in the master and fork workers from it, so imported
+# libraries and the translation tables are shared copy-on-write.
+preload_app = True
+
+timeout = 60  # Gemini analysis calls can take a while
+graceful_timeout = 30
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before workers are forked.
+    # Per-worker state is reset after the fork by app.reinit_after_fork(),
+    # which app.py registers with os.register_at_fork.
+    import app
+    app.warm_up()
+    app.metrics.clear_directory()
+
+
+def worker_exit(server, worker):
+    # Runs in the worker as it exits: write its last values before the
+    # pending flush timer dies with it
+    import app
+    if app.METRICS_DIR:
+        app.metrics.flush()
+
+
+def child_exit(server, worker):
+    # Runs in the master after a worker exits, e.g. when max_requests recycles
+    # it: fold its metrics file into the archive so the directory stays small
+    import app
+    app.metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,122 @@
+// Client-side translations
+//
+// Bundles are served from content-hashed URLs (/i18n/<lang>.<hash>.json) with
+// immutable caching, so each locale is downloaded once. The last bundle is
+// also kept in localStorage so translations are available synchronously on
+// the next page load.
+
+(function () {
+    const config = window.AGRORENT_I18N || { locale: 'en', bundles: {} };
+    const STORAGE_PREFIX = 'agrorent-i18n:';
+
+    let locale = config.locale;
+    let messages = readStoredBundle(config.bundles[locale]) || {};
+
+    function readStoredBundle(url) {
+        if (!url) return null;
+        try {
+            const stored = localStorage.getItem(STORAGE_PREFIX + url);
+            return stored ? JSON.parse(stored) : null;
+        } catch (error) {
+            return null;
+        }
+    }
+
+    function storeBundle(url, bundle) {
+        try {
+            // Drop bundles for older hashes of the same language before saving the new one
+            const languagePrefix = STORAGE_PREFIX + url.split('.')[0] + '.';
+            Object.keys(localStorage)
+                .filter(key => key.startsWith(languagePrefix) && key !== STORAGE_PREFIX + url)
+                .forEach(key => localStorage.removeItem(key));
+            localStorage.setItem(STORAGE_PREFIX + url, JSON.stringify(bundle));
+        } catch (error) {
+            // Storage full or disabled - the HTTP cache still has the bundle
+        }
+    }
+
+    async function loadBundle(url) {
+        if (!url) return {};
+        const stored = readStoredBundle(url);
+        if (stored) return stored;
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const bundle = await response.json();
+        storeBundle(url, bundle);
+        return bundle;
+    }
+
+    function format(template, params) {
+        if (!params) return template;
+        return template.replace(/\{(\w+)\}/g, (match, name) =>
+            Object.prototype.hasOwnProperty.call(params, name) ? params[name] : match
+        );
+    }
+
+    // Translate a key from the "client" section of i18n/<lang>.json
+    function t(key, params, fallback) {
+        const template = messages[key] !== undefined ? messages[key] : (fallback !== undefined ? fallback : key);
+        return format(template, params);
+    }
+
+    // Re-translate elements marked with data-i18n="key"
+    function applyToDocument(root) {
+        (root || document).querySelectorAll('[data-i18n]').forEach(element => {
+            element.textContent = t(element.dataset.i18n, null, element.textContent);
+        });
+    }
+
+    // Switch language without reloading the page; client-rendered text
+    // listens for the "agrorent:languagechange" event and re-renders itself.
+    async function setLanguage(lang) {
+        const response = await fetch(`/set_language/${lang}`, {
+            headers: { 'Accept': 'application/json' }
+        });
+        const data = await response.json();
+        if (!response.ok || !data.success) throw new Error(data.message || `HTTP ${response.status}`);
+        config.bundles[lang] = data.bundle;
+        messages = await loadBundle(data.bundle);
+        locale = lang;
+        document.documentElement.lang = lang;
+        applyToDocument();
+        document.dispatchEvent(new CustomEvent('agrorent:languagechange', { detail: { locale: lang } }));
+        return lang;
+    }
+
+    // Language menu links marked data-set-language switch in place; the link's
+    // href (a full /set_language navigation) is the fallback if that fails
+    document.addEventListener('click', event => {
+        const link = event.target.closest('a[data-set-language]');
+        if (!link) return;
+        event.preventDefault();
+        setLanguage(link.dataset.setLanguage)
+            .then(() => {
+                document.querySelectorAll('a[data-set-language]').forEach(item => {
+                    item.classList.toggle('active', item === link);
+                });
+                const current = document.getElementById('language-current');
+                if (current) current.textContent = link.textContent.trim();
+                const menu = link.closest('.dropdown-menu');
+                if (menu) menu.classList.remove('active');
+            })
+            .catch(() => {
+                window.location.href = link.href;
+            });
+    });
+
+    const ready = loadBundle(config.bundles[locale])
+        .then(bundle => {
+            messages = bundle;
+            applyToDocument();
+        })
+        .catch(error => console.error('Error loading translations:', error));
+
+    window.i18n = {
+        t,
+        setLanguage,
+        ready,
+        get locale() {
+            return locale;
+        }
+    };
+})();
@@ -7,6 +7,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // Load user's listings
     loadMyListings();
     initEventListeners();
+    document.addEventListener('agrorent:languagechange', loadMyListings);
 
     // Load listings from API
     async function loadMyListings() {
@@ -184,15 +185,15 @@ document.addEventListener('DOMContentLoaded', function() {
                     await loadMyListings();
                     
                     // Show success message
-                    showNotification('Listing deleted successfully', 'success');
+                    showNotification(i18n.t('listdashboard.delete_success', null, 'Listing deleted successfully'), 'success');
                 } else {
-                    alert('Error: ' + (data.message || 'Failed to delete listing'));
+                    alert(i18n.t('common.error_prefix', { message: data.message || i18n.t('listdashboard.delete_failed', null, 'Failed to delete listing') }, 'Error: {message}'));
                     btn.disabled = false;
                     btn.innerHTML = originalText;
                 }
             } catch (error) {
                 console.error('Error deleting listing:', error);
-                alert('An error occurred. Please try again.');
+                alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
                 btn.disabled = false;
                 btn.innerHTML = originalText;
             }
@@ -219,7 +220,7 @@ document.addEventListener('DOMContentLoaded', function() {
             showRentalRequestsModal(listingId, requests);
         } catch (error) {
             console.error('Error loading rental requests:', error);
-            alert('Error loading rental requests. Please try again.');
+            alert(i18n.t('listdashboard.requests_load_error', null, 'Error loading rental requests. Please try again.'));
         }
     };
 
@@ -234,6 +235,19 @@ document.addEventListener('DOMContentLoaded', function() {
                     <i class="fas fa-times"></i>
                 </button>
                 <h2><i class="fas fa-calendar-check"></i> Rental Requests</h2>
+                ${requests.some(request => request.status === 'Pending') ? `
+                <div class="bulk-actions">
+                    <label class="bulk-select-all">
+                        <input type="checkbox" onchange="this.closest('.rental-requests-modal').querySelectorAll('.request-select').forEach(box => { box.checked = this.checked; })">
+                        Select all pending
+                    </label>
+                    <button class="btn-approve" onclick="bulkDecideRentals(this, 'approve', ${listingId})">
+                        <i class="fas fa-check-double"></i> Approve selected
+                    </button>
+                    <button class="btn-reject" onclick="bulkDecideRentals(this, 'reject', ${listingId})">
+                        <i class="fas fa-times"></i> Reject selected
+                    </button>
+                </div>` : ''}
                 <div class="rental-requests-list" id="rental-requests-list-${listingId}">
                     ${requests.length === 0 ? '<p style="text-align: center; padding: 2rem; color: #7a8c6a;">No rental requests yet.</p>' : ''}
                 </div>
@@ -301,7 +315,7 @@ document.addEventListener('DOMContentLoaded', function() {
         card.innerHTML = `
             <div class="request-header">
                 <div>
-                    <h4>${request.renter_name}</h4>
+                    <h4>${request.status === 'Pending' ? `<input type="checkbox" class="request-select" value="${request.id}">` : ''}${request.renter_name}</h4>
                     <div class="request-meta">
                         <i class="fas fa-phone"></i> ${request.renter_phone}
                         ${request.renter_email ? ` | <i class="fas fa-envelope"></i> ${request.renter_email}` : ''}
@@ -335,68 +349,112 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Approve rental
     window.approveRental = async function(rentalId, listingId) {
-        if (!confirm('Are you sure you want to approve this rental request? This will lock the dates and cancel any conflicting pending requests.')) {
+        if (!confirm(i18n.t('listdashboard.approve_confirm', null, 'Are you sure you want to approve this rental request? This will lock the dates and cancel any conflicting pending requests.'))) {
             return;
         }
         
         try {
-            const response = await fetch(`/api/rentals/${rentalId}/approve`, {
+            const response = await fetchIdempotent(`/api/rentals/${rentalId}/approve`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
                 }
-            });
+            }, `approve:${rentalId}`);
             
             const data = await response.json();
             
             if (data.success) {
-                showNotification('Rental request approved successfully', 'success');
+                showNotification(i18n.t('listdashboard.approve_success', null, 'Rental request approved successfully'), 'success');
                 // Reload requests
                 viewRentalRequests(listingId);
             } else {
-                alert('Error: ' + (data.message || 'Failed to approve request'));
+                alert(i18n.t('common.error_prefix', { message: data.message || i18n.t('listdashboard.approve_failed', null, 'Failed to approve request') }, 'Error: {message}'));
             }
         } catch (error) {
             console.error('Error approving rental:', error);
-            alert('An error occurred. Please try again.');
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
         }
     };
 
     // Reject rental
     window.rejectRental = async function(rentalId, listingId) {
-        if (!confirm('Are you sure you want to reject this rental request?')) {
+        if (!confirm(i18n.t('listdashboard.reject_confirm', null, 'Are you sure you want to reject this rental request?'))) {
             return;
         }
         
         try {
-            const response = await fetch(`/api/rentals/${rentalId}/reject`, {
+            const response = await fetchIdempotent(`/api/rentals/${rentalId}/reject`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
                 }
-            });
+            }, `reject:${rentalId}`);
             
             const data = await response.json();
             
             if (data.success) {
-                showNotification('Rental request rejected', 'success');
+                showNotification(i18n.t('listdashboard.reject_success', null, 'Rental request rejected'), 'success');
                 // Reload requests
                 viewRentalRequests(listingId);
             } else {
-                alert('Error: ' + (data.message || 'Failed to reject request'));
+                alert(i18n.t('common.error_prefix', { message: data.message || i18n.t('listdashboard.reject_failed', null, 'Failed to reject request') }, 'Error: {message}'));
             }
         } catch (error) {
             console.error('Error rejecting rental:', error);
-            alert('An error occurred. Please try again.');
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
+        }
+    };
+
+    // Approve or reject all selected requests in one batch
+    window.bulkDecideRentals = async function(button, action, listingId) {
+        const modal = button.closest('.rental-requests-modal');
+        const rentalIds = [...modal.querySelectorAll('.request-select:checked')].map(box => Number(box.value));
+        if (rentalIds.length === 0) {
+            alert(i18n.t('listdashboard.bulk_none_selected', null, 'Select at least one pending request.'));
+            return;
+        }
+        const confirmMessage = action === 'approve'
+            ? i18n.t('listdashboard.bulk_approve_confirm', { count: rentalIds.length }, 'Approve {count} selected requests? Conflicting pending requests will be cancelled.')
+            : i18n.t('listdashboard.bulk_reject_confirm', { count: rentalIds.length }, 'Reject {count} selected requests?');
+        if (!confirm(confirmMessage)) {
+            return;
+        }
+
+        try {
+            const response = await fetchIdempotent('/api/rentals/bulk', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ decisions: rentalIds.map(id => ({ rental_id: id, action: action })) })
+            }, `bulk:${action}:${rentalIds.join(',')}`);
+
+            const data = await response.json();
+
+            if (data.success) {
+                const failed = data.results.filter(result => !result.success);
+                showNotification(data.message, failed.length === 0 ? 'success' : 'error');
+                if (failed.length > 0) {
+                    alert(failed.map(result => `#${result.rental_id}: ${result.message}`).join('\n'));
+                }
+                // Reload requests
+                modal.remove();
+                viewRentalRequests(listingId);
+            } else {
+                alert(i18n.t('common.error_prefix', { message: data.message || i18n.t('listdashboard.bulk_failed', null, 'Failed to update requests') }, 'Error: {message}'));
+            }
+        } catch (error) {
+            console.error('Error updating rentals:', error);
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
         }
     };
 
     // Download contract
     window.downloadContract = async function(rentalId) {
         try {
-            const response = await fetch(`/api/rentals/${rentalId}/generate-contract`, {
+            const response = await fetchIdempotent(`/api/rentals/${rentalId}/generate-contract`, {
                 method: 'POST'
-            });
+            }, `contract:${rentalId}`);
             
             if (response.ok) {
                 const blob = await response.blob();
@@ -414,7 +472,7 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         } catch (error) {
             console.error('Error downloading contract:', error);
-            alert('An error occurred while downloading the contract. Please try again.');
+            alert(i18n.t('listdashboard.contract_download_error', null, 'An error occurred while downloading the contract. Please try again.'));
         }
     };
 
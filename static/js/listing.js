@@ -18,6 +18,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initImagePreviews();
     initTransportToggle();
     initDateValidation();
+    initPriceSuggestion();
 
     // Previous button click
     if (prevBtn) {
@@ -417,6 +418,80 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Suggest a price from comparable listings as the equipment details are filled in
+    function initPriceSuggestion() {
+        const panel = document.getElementById('price-suggestion');
+        const priceInput = document.getElementById('price');
+        if (!panel || !priceInput) return;
+
+        const fields = ['category', 'brand', 'power_spec', 'district', 'pricing_type'];
+        const editingId = document.getElementById('editing_id');
+        let suggestedPrice = null;
+        let suggestionTimeout;
+        let latestQuery = '';
+
+        function describe(suggestion) {
+            const rupees = value => '₹' + Math.round(value).toLocaleString('en-IN');
+            const matched = suggestion.matched_on.filter(field => field !== 'category' && field !== 'pricing_type')
+                .map(field => field === 'power_band' ? suggestion.power_band : field);
+            const group = matched.length ? ` with the same ${matched.join(', ')}` : '';
+            return `Most ${suggestion.comparables} comparable listings${group} charge ${rupees(suggestion.low)} - ${rupees(suggestion.high)} (median ${rupees(suggestion.median)}). ` +
+                `They were booked ${Math.round(suggestion.utilisation * 100)}% of the last 90 days.`;
+        }
+
+        function loadSuggestion() {
+            const params = new URLSearchParams();
+            fields.forEach(field => {
+                const input = document.getElementById(field);
+                if (input && input.value.trim()) params.set(field, input.value.trim());
+            });
+            if (editingId && editingId.value) params.set('listing_id', editingId.value);
+            if (!params.has('category') || !params.has('pricing_type')) {
+                panel.style.display = 'none';
+                return;
+            }
+
+            const query = params.toString();
+            latestQuery = query;
+            fetch('/api/price-suggestion?' + query)
+                .then(response => response.json())
+                .then(data => {
+                    // Ignore answers to a query the owner has typed past
+                    if (query !== latestQuery) return;
+                    if (!data.success) {
+                        panel.style.display = 'none';
+                        return;
+                    }
+                    suggestedPrice = data.suggestion.suggested_price;
+                    const pricingType = document.getElementById('pricing_type').value.toLowerCase();
+                    document.getElementById('price-suggestion-value').textContent =
+                        `Suggested price: ₹${suggestedPrice.toLocaleString('en-IN')} ${pricingType}`;
+                    document.getElementById('price-suggestion-detail').textContent = describe(data.suggestion);
+                    panel.style.display = 'flex';
+                })
+                .catch(error => console.error('Error loading price suggestion:', error));
+        }
+
+        fields.forEach(field => {
+            const input = document.getElementById(field);
+            if (!input) return;
+            ['input', 'change'].forEach(eventName => input.addEventListener(eventName, function() {
+                clearTimeout(suggestionTimeout);
+                suggestionTimeout = setTimeout(loadSuggestion, 300);
+            }));
+        });
+
+        document.getElementById('price-suggestion-use').addEventListener('click', function() {
+            if (suggestedPrice !== null) {
+                priceInput.value = suggestedPrice;
+                priceInput.dispatchEvent(new Event('input', { bubbles: true }));
+            }
+        });
+
+        // Saved or prefilled drafts already have the fields filled in
+        setTimeout(loadSuggestion, 0);
+    }
+
     // Real-time validation on input
     document.querySelectorAll('input, select, textarea').forEach(field => {
         field.addEventListener('blur', function() {
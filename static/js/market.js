@@ -347,4 +347,83 @@ window.addEventListener('load', () => {
     }, 100);
 });
 
-console.log('AgroRent Pitch Deck Loaded Successfully! 🌾');
\ No newline at end of file
+console.log('AgroRent Pitch Deck Loaded Successfully! 🌾');
+
+// Live marketplace data from the materialised aggregates (/api/market/stats)
+function formatRupees(value) {
+    return '₹' + Math.round(value).toLocaleString('en-IN');
+}
+
+function marketCell(text) {
+    const cell = document.createElement('td');
+    cell.textContent = text;
+    return cell;
+}
+
+function renderMarketRows(tbodyId, rows) {
+    const tbody = document.getElementById(tbodyId);
+    tbody.innerHTML = '';
+    rows.forEach(values => {
+        const row = document.createElement('tr');
+        values.forEach(value => row.appendChild(marketCell(value)));
+        tbody.appendChild(row);
+    });
+}
+
+async function loadMarketStats() {
+    const updated = document.getElementById('live-market-updated');
+    if (!updated) return;
+
+    try {
+        const response = await fetch('/api/market/stats');
+        const stats = await response.json();
+        const demand = stats.weekly_demand;
+        const thisWeek = demand.length ? demand[demand.length - 1].requests : 0;
+
+        updated.textContent = `Updated ${new Date(stats.generated_at).toLocaleString()} · utilisation over ${stats.utilisation_window.start} to ${stats.utilisation_window.end}`;
+
+        const totals = document.getElementById('live-market-totals');
+        totals.innerHTML = '';
+        [
+            [stats.totals.listings, 'Machines listed'],
+            [stats.totals.rented_listings, 'Machines rented in the last 90 days'],
+            [Math.round(stats.totals.average_utilisation * 100) + '%', 'Average utilisation'],
+            [thisWeek, 'Rental requests in the latest week']
+        ].forEach(([value, label]) => {
+            const stat = document.createElement('div');
+            stat.className = 'traction-stat';
+            stat.innerHTML = '<div class="stat-number"></div><p></p>';
+            stat.querySelector('.stat-number').textContent = value;
+            stat.querySelector('p').textContent = label;
+            totals.appendChild(stat);
+            statsObserver.observe(stat);
+        });
+
+        const chart = document.getElementById('live-market-demand');
+        const peak = Math.max(1, ...demand.map(week => week.requests));
+        chart.innerHTML = '';
+        demand.forEach(week => {
+            const bar = document.createElement('div');
+            bar.className = 'chart-bar';
+            bar.dataset.value = week.requests;
+            bar.dataset.week = week.week_start.slice(5);
+            bar.title = `${week.requests} requests, ${week.confirmed} confirmed`;
+            bar.style.height = `${Math.max(4, week.requests / peak * 100)}%`;
+            chart.appendChild(bar);
+        });
+
+        const prices = [...stats.median_prices].sort((a, b) => b.listings - a.listings).slice(0, 12);
+        renderMarketRows('live-market-prices', prices.map(row => [
+            row.category, row.district, row.pricing_type, row.listings,
+            formatRupees(row.median_price), `${formatRupees(row.min_price)} - ${formatRupees(row.max_price)}`
+        ]));
+        renderMarketRows('live-market-equipment', stats.top_equipment.map(row => [
+            row.equipment_name, row.category, row.brand, row.rentals, formatRupees(row.revenue)
+        ]));
+    } catch (error) {
+        console.error('Error loading market stats:', error);
+        updated.textContent = 'Live marketplace data is unavailable right now.';
+    }
+}
+
+loadMarketStats();
@@ -6,8 +6,14 @@ let notificationInterval = null;
 document.addEventListener('DOMContentLoaded', function() {
     if (document.getElementById('notification-btn')) {
         loadNotificationCount();
-        // Auto-refresh notifications every 30 seconds
-        notificationInterval = setInterval(loadNotificationCount, 30000);
+        // Auto-refresh notifications every 30 seconds, skipping polls while
+        // offline and catching up as soon as the connection returns
+        notificationInterval = setInterval(function() {
+            if (navigator.onLine !== false) {
+                loadNotificationCount();
+            }
+        }, 30000);
+        window.addEventListener('online', loadNotificationCount);
     }
 });
 
@@ -54,7 +60,7 @@ async function loadNotifications() {
     const empty = document.getElementById('notification-empty');
     const markAllBtn = document.getElementById('mark-all-read-btn');
     
-    list.innerHTML = '<div class="notification-loading">Loading notifications...</div>';
+    list.innerHTML = `<div class="notification-loading">${escapeHtml(i18n.t('notifications.loading', null, 'Loading notifications...'))}</div>`;
     empty.style.display = 'none';
     
     try {
@@ -80,7 +86,7 @@ async function loadNotifications() {
         loadNotificationCount();
     } catch (error) {
         console.error('Error loading notifications:', error);
-        list.innerHTML = '<div class="notification-loading" style="color: #dc3545;">Error loading notifications</div>';
+        list.innerHTML = `<div class="notification-loading" style="color: #dc3545;">${escapeHtml(i18n.t('notifications.load_error', null, 'Error loading notifications'))}</div>`;
     }
 }
 
@@ -100,6 +106,9 @@ function createNotificationItem(notif) {
         icon = 'fa-times-circle';
     } else if (notif.type === 'rental_cancelled') {
         icon = 'fa-ban';
+    } else if (notif.type === 'waitlist_promoted') {
+        icon = 'fa-hourglass-end';    } else if (notif.type === 'saved_search_match') {
+        icon = 'fa-search-location';
     }
     
     // Format time
@@ -140,6 +149,8 @@ async function markNotificationRead(notificationId, notif) {
                     // Navigate to rent dashboard
                     window.location.href = '/rentdashboard';
                 }
+            } else if (notif.related_type === 'listing') {
+                window.location.href = `/renting#listing-${notif.related_id}`;
             }
             
             // Update count
@@ -183,15 +194,21 @@ function formatNotificationTime(timestamp) {
     const days = Math.floor(hours / 24);
     
     if (seconds < 60) {
-        return 'Just now';
+        return i18n.t('notifications.just_now', null, 'Just now');
     } else if (minutes < 60) {
-        return `${minutes} minute${minutes !== 1 ? 's' : ''} ago`;
+        return minutes === 1
+            ? i18n.t('notifications.minute_ago', { count: minutes }, '{count} minute ago')
+            : i18n.t('notifications.minutes_ago', { count: minutes }, '{count} minutes ago');
     } else if (hours < 24) {
-        return `${hours} hour${hours !== 1 ? 's' : ''} ago`;
+        return hours === 1
+            ? i18n.t('notifications.hour_ago', { count: hours }, '{count} hour ago')
+            : i18n.t('notifications.hours_ago', { count: hours }, '{count} hours ago');
     } else if (days < 7) {
-        return `${days} day${days !== 1 ? 's' : ''} ago`;
+        return days === 1
+            ? i18n.t('notifications.day_ago', { count: days }, '{count} day ago')
+            : i18n.t('notifications.days_ago', { count: days }, '{count} days ago');
     } else {
-        return date.toLocaleDateString();
+        return date.toLocaleDateString(i18n.locale);
     }
 }
 
@@ -202,6 +219,14 @@ function escapeHtml(text) {
     return div.innerHTML;
 }
 
+// Re-render the open dropdown when the language is switched client-side
+document.addEventListener('agrorent:languagechange', function() {
+    const menu = document.getElementById('notification-menu');
+    if (menu && menu.classList.contains('active')) {
+        loadNotifications();
+    }
+});
+
 // Close notifications when clicking outside
 document.addEventListener('click', function(event) {
     const notificationDropdown = document.querySelector('.notification-dropdown');
@@ -0,0 +1,39 @@
+// Registers the service worker (static/js/service-worker.js) and reports
+// what happened to rental requests that were queued while offline.
+(function () {
+    if (!('serviceWorker' in navigator)) {
+        return;
+    }
+
+    function translate(key, params, fallback) {
+        return window.i18n ? i18n.t(key, params, fallback) : fallback;
+    }
+
+    function flushOutbox() {
+        navigator.serviceWorker.ready.then(registration => {
+            if (registration.active) {
+                // The worker only replays requests queued by the user signed in here
+                registration.active.postMessage({ type: 'flush-outbox', user_id: document.body.dataset.userId || null });
+            }
+        });
+    }
+
+    navigator.serviceWorker.addEventListener('message', function (event) {
+        const data = event.data || {};
+        if (data.type === 'rental-sent') {
+            alert(translate('renting.queued_request_sent', null, 'Your saved rental request has been sent to the owner.'));
+            if (typeof loadNotificationCount === 'function') {
+                loadNotificationCount();
+            }
+        } else if (data.type === 'rental-failed') {
+            alert(translate('renting.queued_request_failed', { message: data.message }, 'A rental request saved while offline could not be sent: {message}'));
+        }
+    });
+
+    window.addEventListener('load', function () {
+        navigator.serviceWorker.register('/service-worker.js', { scope: '/' })
+            .then(flushOutbox)
+            .catch(error => console.warn('Service worker registration failed:', error));
+    });
+    window.addEventListener('online', flushOutbox);
+})();
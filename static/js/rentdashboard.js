@@ -5,6 +5,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Load user's rentals
     loadMyRentals();
+    document.addEventListener('agrorent:languagechange', loadMyRentals);
 
     // Load rentals from API
     async function loadMyRentals() {
@@ -106,6 +107,11 @@ document.addEventListener('DOMContentLoaded', function() {
             statusText = 'Rejected';
             expiryClass = 'rejected';
             expiryText = 'Request was rejected';
+        } else if (rental.status === 'Withdrawn') {
+            statusClass = 'rejected';
+            statusText = 'Withdrawn';
+            expiryClass = 'rejected';
+            expiryText = 'You withdrew this request';
         } else if (rental.status === 'Active') {
             if (rental.is_expired) {
                 statusClass = 'expired';
@@ -200,6 +206,11 @@ document.addEventListener('DOMContentLoaded', function() {
                     <i class="fas fa-file-pdf"></i> Download Contract
                 </button>
                 ` : ''}
+                ${(rental.status === 'Pending' || rental.status === 'Approved') && rental.start_date > today() ? `
+                <button class="btn-withdraw" onclick="withdrawRental(${rental.id})">
+                    <i class="fas fa-undo"></i> Withdraw
+                </button>
+                ` : ''}
                 <a href="/renting" class="btn-view-listing">
                     <i class="fas fa-search"></i> Rent More Equipment
                 </a>
@@ -209,12 +220,41 @@ document.addEventListener('DOMContentLoaded', function() {
         return card;
     }
     
+    // YYYY-MM-DD for today in local time, comparable with rental dates
+    function today() {
+        const now = new Date();
+        return `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}-${String(now.getDate()).padStart(2, '0')}`;
+    }
+
+    // Withdraw a rental before it starts; the freed dates go to the waitlist
+    window.withdrawRental = async function(rentalId) {
+        if (!confirm(i18n.t('rentdashboard.withdraw_confirm', null, 'Withdraw this rental? The dates will be offered to the next renter on the waitlist.'))) {
+            return;
+        }
+
+        try {
+            const response = await fetchIdempotent(`/api/rentals/${rentalId}/withdraw`, {
+                method: 'POST'
+            }, `withdraw:${rentalId}`);
+            const data = await response.json();
+
+            if (data.success) {
+                loadMyRentals();
+            } else {
+                alert(i18n.t('common.error_prefix', { message: data.message || 'Failed to withdraw rental' }, 'Error: {message}'));
+            }
+        } catch (error) {
+            console.error('Error withdrawing rental:', error);
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
+        }
+    };
+
     // Download contract
     window.downloadContract = async function(rentalId) {
         try {
-            const response = await fetch(`/api/rentals/${rentalId}/generate-contract`, {
+            const response = await fetchIdempotent(`/api/rentals/${rentalId}/generate-contract`, {
                 method: 'POST'
-            });
+            }, `contract:${rentalId}`);
             
             if (response.ok) {
                 const blob = await response.blob();
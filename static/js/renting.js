@@ -5,18 +5,96 @@ let selectedStartDate = null;
 let selectedEndDate = null;
 let isSelectingRange = false;
 
+// Local copy of the listing catalogue in IndexedDB, kept up to date with
+// /api/listings/changes. `seq` is the change sequence the copy reflects.
+const listingCache = (function () {
+    const DB_NAME = 'agrorent';
+    const DB_VERSION = 1;
+    const supported = 'indexedDB' in window;
+    let dbPromise = null;
+
+    function open() {
+        if (!dbPromise) {
+            dbPromise = new Promise((resolve, reject) => {
+                const request = indexedDB.open(DB_NAME, DB_VERSION);
+                request.onupgradeneeded = () => {
+                    const db = request.result;
+                    db.createObjectStore('listings', { keyPath: 'id' });
+                    db.createObjectStore('meta');
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            });
+        }
+        return dbPromise;
+    }
+
+    function done(transaction) {
+        return new Promise((resolve, reject) => {
+            transaction.oncomplete = () => resolve();
+            transaction.onerror = () => reject(transaction.error);
+            transaction.onabort = () => reject(transaction.error);
+        });
+    }
+
+    async function load() {
+        try {
+            const db = await open();
+            const transaction = db.transaction(['listings', 'meta'], 'readonly');
+            const listingsRequest = transaction.objectStore('listings').getAll();
+            const seqRequest = transaction.objectStore('meta').get('listings_seq');
+            await done(transaction);
+            return { listings: listingsRequest.result || [], seq: seqRequest.result || 0 };
+        } catch (error) {
+            console.warn('Listing cache unavailable:', error);
+            return { listings: [], seq: 0 };
+        }
+    }
+
+    // Store one page of changes and the sequence it brings the copy up to
+    async function apply(page) {
+        try {
+            const db = await open();
+            const transaction = db.transaction(['listings', 'meta'], 'readwrite');
+            const listings = transaction.objectStore('listings');
+            if (page.reset) {
+                listings.clear();
+            }
+            page.listings.forEach(listing => listings.put(listing));
+            page.deleted.forEach(id => listings.delete(id));
+            transaction.objectStore('meta').put(page.seq, 'listings_seq');
+            await done(transaction);
+        } catch (error) {
+            console.warn('Could not update listing cache:', error);
+        }
+    }
+
+    return { supported, load, apply };
+})();
+
 document.addEventListener('DOMContentLoaded', function () {
     let allListings = [];
     let currentListing = null;
 
     // Initialize
-    loadListings();
+    loadListings().then(openLinkedListing);
     initEventListeners();
+    window.addEventListener('hashchange', openLinkedListing);
+    document.addEventListener('agrorent:languagechange', renderListings);
+
+    // Notifications link to /renting#listing-<id> (e.g. saved search matches)
+    function openLinkedListing() {
+        const match = window.location.hash.match(/^#listing-(\d+)$/);
+        if (match) {
+            history.replaceState(null, '', window.location.pathname);
+            viewDetails(Number(match[1]));
+        }
+    }
 
-    // Load listings from API
+    // Load listings: show the local IndexedDB copy straight away, then fetch
+    // only what changed since it was saved (/api/listings/changes)
     async function loadListings() {
         const loadingState = document.getElementById('loading-state');
-        const emptyState = document.getElementById('empty-state');
         const listingsGrid = document.getElementById('listings-grid');
 
         try {
@@ -24,26 +102,78 @@ document.addEventListener('DOMContentLoaded', function () {
             listingsGrid.innerHTML = '';
             toggleEmptyState(false);
 
-            const response = await fetch('/api/listings');
-            const listings = await response.json();
+            if (!listingCache.supported) {
+                const response = await fetch('/api/listings');
+                allListings = await response.json();
+                renderListings();
+                return;
+            }
 
-            allListings = listings;
+            const cached = await listingCache.load();
+            if (cached.listings.length > 0) {
+                allListings = orderListings(cached.listings);
+                renderListings();
+                loadingState.style.display = 'none';
+            }
 
-            if (listings.length === 0) {
-                toggleEmptyState(true);
-                listingsGrid.innerHTML = '';
-            } else {
-                displayListings(listings);
-                toggleEmptyState(false);
+            if (await syncListings(cached)) {
+                renderListings();
             }
         } catch (error) {
             console.error('Error loading listings:', error);
-            listingsGrid.innerHTML = '<p style="text-align: center; color: #c94843;">Error loading listings. Please try again.</p>';
+            if (allListings.length === 0) {
+                listingsGrid.innerHTML = `<p style="text-align: center; color: #c94843;">${escapeHtml(i18n.t('renting.listings_load_error', null, 'Error loading listings. Please try again.'))}</p>`;
+            }
         } finally {
             loadingState.style.display = 'none';
         }
     }
 
+    // Apply change pages until caught up; returns whether anything changed
+    async function syncListings(cached) {
+        const byId = new Map(cached.listings.map(listing => [listing.id, listing]));
+        let seq = cached.seq;
+        let changed = false;
+        let hasMore = true;
+
+        while (hasMore) {
+            const response = await fetch(`/api/listings/changes?since=${seq}`);
+            if (!response.ok) {
+                throw new Error(`Listing sync failed: ${response.status}`);
+            }
+            const page = await response.json();
+            if (page.reset && byId.size > 0) {
+                byId.clear();
+                changed = true;
+            }
+            page.listings.forEach(listing => byId.set(listing.id, listing));
+            page.deleted.forEach(id => byId.delete(id));
+            changed = changed || page.listings.length > 0 || page.deleted.length > 0;
+            await listingCache.apply(page);
+            seq = page.seq;
+            hasMore = page.has_more;
+        }
+
+        allListings = orderListings([...byId.values()]);
+        return changed || cached.listings.length === 0;
+    }
+
+    // Same order as /api/listings: newest first
+    function orderListings(listings) {
+        return listings.sort((a, b) =>
+            (b.created_at || '').localeCompare(a.created_at || '') || b.id - a.id
+        );
+    }
+
+    function renderListings() {
+        if (allListings.length === 0) {
+            toggleEmptyState(true);
+            document.getElementById('listings-grid').innerHTML = '';
+        } else {
+            applyFilters();
+        }
+    }
+
     // Display listings as cards
     function displayListings(listings) {
         const listingsGrid = document.getElementById('listings-grid');
@@ -107,22 +237,76 @@ document.addEventListener('DOMContentLoaded', function () {
         return card;
     }
 
-    // View listing details
+    // Availability arrives as merged date intervals from /api/listing/<id>/overview.
+    // The expanded dates are kept per listing so calendar clicks and range
+    // checks reuse them instead of refetching; submissions still refresh.
+    const AVAILABILITY_MAX_AGE_MS = 30000;
+    const availabilityCache = new Map();
+
+    function expandIntervals(intervals) {
+        const dates = [];
+        (intervals || []).forEach(([startDate, endDate]) => {
+            const [startYear, startMonth, startDay] = startDate.split('-').map(Number);
+            const current = new Date(startYear, startMonth - 1, startDay);
+            while (true) {
+                const year = current.getFullYear();
+                const month = String(current.getMonth() + 1).padStart(2, '0');
+                const day = String(current.getDate()).padStart(2, '0');
+                const dateString = `${year}-${month}-${day}`;
+                if (dateString > endDate) {
+                    break;
+                }
+                dates.push(dateString);
+                current.setDate(current.getDate() + 1);
+            }
+        });
+        return dates;
+    }
+
+    function storeAvailability(listingId, availability) {
+        const entry = {
+            pending_dates: expandIntervals(availability.pending),
+            confirmed_dates: expandIntervals(availability.confirmed),
+            fetchedAt: Date.now()
+        };
+        availabilityCache.set(listingId, entry);
+        return entry;
+    }
+
+    async function getAvailability(listingId, maxAgeMs = AVAILABILITY_MAX_AGE_MS) {
+        const cached = availabilityCache.get(listingId);
+        if (cached && Date.now() - cached.fetchedAt < maxAgeMs) {
+            return cached;
+        }
+        const response = await fetch(`/api/listing/${listingId}/overview?fields=availability`);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        const data = await response.json();
+        return storeAvailability(listingId, data.availability);
+    }
+
+    // View listing details: one request for details, availability, any cached
+    // condition analysis and the owner summary
     window.viewDetails = async function (listingId) {
         try {
-            const response = await fetch(`/api/listing/${listingId}`);
-            const listing = await response.json();
+            const response = await fetch(`/api/listing/${listingId}/overview`);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const overview = await response.json();
 
-            currentListing = listing;
-            showDetailsModal(listing);
+            currentListing = overview.listing;
+            storeAvailability(listingId, overview.availability);
+            showDetailsModal(overview.listing, overview);
         } catch (error) {
             console.error('Error loading listing details:', error);
-            alert('Error loading listing details. Please try again.');
+            alert(i18n.t('renting.details_load_error', null, 'Error loading listing details. Please try again.'));
         }
     };
 
     // Show details modal
-    async function showDetailsModal(listing) {
+    async function showDetailsModal(listing, overview) {
         const modal = document.getElementById('details-modal');
         const modalBody = document.getElementById('modal-body');
 
@@ -130,17 +314,10 @@ document.addEventListener('DOMContentLoaded', function () {
         const additionalImages = listing.additional_images || [];
         const allImages = [mainImageUrl, ...additionalImages.map(img => `/static/${img}`)].filter(Boolean);
 
-        // Fetch availability data
-        let pendingDates = [];
-        let confirmedDates = [];
-        try {
-            const availabilityResponse = await fetch(`/api/listing/${listing.id}/availability`);
-            const availabilityData = await availabilityResponse.json();
-            pendingDates = availabilityData.pending_dates || [];
-            confirmedDates = availabilityData.confirmed_dates || [];
-        } catch (error) {
-            console.error('Error loading availability:', error);
-        }
+        const availability = availabilityCache.get(listing.id) || { pending_dates: [], confirmed_dates: [] };
+        const pendingDates = availability.pending_dates;
+        const confirmedDates = availability.confirmed_dates;
+        const owner = overview.owner;
 
         modalBody.innerHTML = `
             <div class="modal-image-gallery">
@@ -243,6 +420,15 @@ document.addEventListener('DOMContentLoaded', function () {
                         <div class="modal-info-value">${listing.phone} (${listing.contact_method})</div>
                     </div>
                 </div>
+                ${owner ? `
+                <div class="modal-info-item">
+                    <i class="fas fa-user-check"></i>
+                    <div>
+                        <div class="modal-info-label">Owner</div>
+                        <div class="modal-info-value">${escapeHtml(owner.name)} · ${owner.completed_rentals} completed rental${owner.completed_rentals === 1 ? '' : 's'}${owner.approval_rate !== null ? ` · ${Math.round(owner.approval_rate * 100)}% of requests approved` : ''}</div>
+                    </div>
+                </div>
+                ` : ''}
                 
                 <div class="modal-ai-section">
                     <h3><i class="fas fa-robot"></i> AI Condition Analysis</h3>
@@ -290,6 +476,10 @@ document.addEventListener('DOMContentLoaded', function () {
             </div>
         `;
 
+        if (overview.condition) {
+            renderConditionResult(document.getElementById(`ai-analysis-container-${listing.id}`), overview.condition);
+        }
+
         // Reset selection when opening modal
         selectedStartDate = null;
         selectedEndDate = null;
@@ -537,7 +727,7 @@ document.addEventListener('DOMContentLoaded', function () {
                 // Reset if range is invalid
                 selectedStartDate = null;
                 selectedEndDate = null;
-                alert('Selected date range includes booked dates. Please select a different range.');
+                alert(i18n.t('renting.range_includes_booked', null, 'Selected date range includes booked dates. Please select a different range.'));
                 return;
             }
         } else {
@@ -560,8 +750,7 @@ document.addEventListener('DOMContentLoaded', function () {
     // Validate date range doesn't include booked dates
     async function validateDateRange(startDate, endDate, listingId) {
         try {
-            const response = await fetch(`/api/listing/${listingId}/availability`);
-            const data = await response.json();
+            const data = await getAvailability(listingId);
 
             const confirmedDates = new Set(data.confirmed_dates || []);
 
@@ -593,10 +782,9 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
     // Fetch availability and re-render calendar
-    async function fetchAvailabilityAndRender(listingId, availableFrom, availableTill) {
+    async function fetchAvailabilityAndRender(listingId, availableFrom, availableTill, maxAgeMs = AVAILABILITY_MAX_AGE_MS) {
         try {
-            const response = await fetch(`/api/listing/${listingId}/availability`);
-            const data = await response.json();
+            const data = await getAvailability(listingId, maxAgeMs);
             renderAvailabilityCalendar(listingId, data.pending_dates || [], data.confirmed_dates || [], availableFrom, availableTill);
         } catch (error) {
             console.error('Error fetching availability:', error);
@@ -640,6 +828,10 @@ document.addEventListener('DOMContentLoaded', function () {
                         <button class="btn-clear-selection" onclick="clearDateSelection(${listingId})" title="Clear selection">
                             <i class="fas fa-times"></i>
                         </button>
+                        ${document.getElementById('cart-button') ? `
+                        <button class="btn-add-cart" onclick="addToCart(${listingId})" title="Add to cart">
+                            <i class="fas fa-cart-plus"></i>
+                        </button>` : ''}
                         <button class="btn-rent-calendar" onclick="completeRentalFromCalendar(${listingId})">
                             <i class="fas fa-check"></i> Rent Now
                         </button>
@@ -690,7 +882,7 @@ document.addEventListener('DOMContentLoaded', function () {
     // Complete rental from calendar selection
     window.completeRentalFromCalendar = async function (listingId) {
         if (!selectedStartDate || !selectedEndDate) {
-            alert('Please select a date range on the calendar');
+            alert(i18n.t('renting.select_range', null, 'Please select a date range on the calendar'));
             return;
         }
 
@@ -709,11 +901,16 @@ document.addEventListener('DOMContentLoaded', function () {
         // Validate one more time
         const isValid = await validateDateRange(selectedStartDate, selectedEndDate, listingId);
         if (!isValid) {
-            alert('Selected dates are already booked. Please choose different dates.');
+            alert(i18n.t('renting.dates_booked', null, 'Selected dates are already booked. Please choose different dates.'));
             return;
         }
 
-        // Calculate total amount
+        // Show agreement preview modal
+        showAgreementPreview(listingId, listing, selectedStartDate, selectedEndDate, days, estimateTotal(listing, days));
+    };
+
+    // Same formula as rental_total() on the server, which has the final say
+    function estimateTotal(listing, days) {
         const price = parseFloat(listing.price);
         const pricingType = listing.pricing_type;
         let totalAmount = 0;
@@ -732,10 +929,17 @@ document.addEventListener('DOMContentLoaded', function () {
         if (listing.transport_included === 'No' && listing.transport_charge) {
             totalAmount += parseFloat(listing.transport_charge);
         }
+        return totalAmount;
+    }
 
-        // Show agreement preview modal
-        showAgreementPreview(listingId, listing, selectedStartDate, selectedEndDate, days, totalAmount);
-    };
+    // Days between two YYYY-MM-DD dates, both included
+    function selectedDays(startDate, endDate) {
+        const parseDate = (dateStr) => {
+            const [year, month, day] = dateStr.split('-').map(Number);
+            return new Date(year, month - 1, day);
+        };
+        return Math.round((parseDate(endDate) - parseDate(startDate)) / (1000 * 60 * 60 * 24)) + 1;
+    }
 
     // Show agreement preview modal
     async function showAgreementPreview(listingId, listing, startDate, endDate, days, totalAmount) {
@@ -848,12 +1052,12 @@ document.addEventListener('DOMContentLoaded', function () {
         const locationOfUse = document.getElementById('location-of-use').value.trim();
 
         if (!renterAddress) {
-            alert('Please enter your address');
+            alert(i18n.t('renting.enter_address', null, 'Please enter your address'));
             return;
         }
 
         if (!locationOfUse) {
-            alert('Please specify the location where you will use the equipment');
+            alert(i18n.t('renting.enter_location', null, 'Please specify the location where you will use the equipment'));
             return;
         }
 
@@ -865,10 +1069,10 @@ document.addEventListener('DOMContentLoaded', function () {
         formData.append('location_of_use', locationOfUse);
 
         try {
-            const response = await fetch('/rent_equipment', {
+            const response = await fetchIdempotent('/rent_equipment', {
                 method: 'POST',
                 body: formData
-            });
+            }, rentalScope(formData));
 
             const data = await response.json();
 
@@ -876,13 +1080,16 @@ document.addEventListener('DOMContentLoaded', function () {
                 // Close agreement modal
                 closeAgreementModal();
 
-                // Show success message with contract download option
-                if (confirm('Rental request submitted successfully! The owner will review and approve your request.\n\nWould you like to download a draft copy of the agreement?')) {
+                // Show success message with contract download option (not
+                // possible for a request queued offline: it has no rental yet)
+                if (data.queued) {
+                    alert(submittedMessage(data));
+                } else if (confirm('Rental request submitted successfully! The owner will review and approve your request.\n\nWould you like to download a draft copy of the agreement?')) {
                     // Generate and download contract (use POST method)
                     try {
-                        const contractResponse = await fetch(`/api/rentals/${data.rental_id}/generate-contract`, {
+                        const contractResponse = await fetchIdempotent(`/api/rentals/${data.rental_id}/generate-contract`, {
                             method: 'POST'
-                        });
+                        }, `contract:${data.rental_id}`);
 
                         if (contractResponse.ok) {
                             const blob = await contractResponse.blob();
@@ -917,27 +1124,68 @@ document.addEventListener('DOMContentLoaded', function () {
             } else {
                 const errorMessage = data.message || 'Failed to submit rental request';
                 if (data.booked) {
-                    alert('These dates are already booked. ' + errorMessage);
+                    await offerWaitlist(formData, data, errorMessage);
                     // Reset selection
                     selectedStartDate = null;
                     selectedEndDate = null;
                     // Re-render calendar
                     const listing = currentListing;
                     if (listing) {
-                        fetchAvailabilityAndRender(listing.id, listing.available_from, listing.available_till);
+                        fetchAvailabilityAndRender(listing.id, listing.available_from, listing.available_till, 0);
                     }
                     closeAgreementModal();
                 } else {
-                    alert('Error: ' + errorMessage);
+                    alert(i18n.t('common.error_prefix', { message: errorMessage }, 'Error: {message}'));
                 }
             }
         } catch (error) {
             console.error('Error submitting rental:', error);
-            alert('An error occurred. Please try again.');
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
         }
     }
 
     // Escape HTML helper
+    // Repeats of the same request (double taps, retries) share an Idempotency-Key
+    function rentalScope(formData) {
+        return ['rent', formData.get('listing_id'), formData.get('start_date'), formData.get('days')].join(':');
+    }
+
+    // The service worker answers rental requests made offline with {queued: true}
+    function submittedMessage(data) {
+        if (data.queued) {
+            return i18n.t('renting.request_queued', null, 'You are offline. Your rental request has been saved and will be sent automatically when you are back online.');
+        }
+        return i18n.t('renting.request_submitted', null, 'Rental request submitted successfully! The owner will review and approve your request.');
+    }
+
+    // Booked dates: offer a waitlist spot instead of a dead end
+    async function offerWaitlist(formData, data, errorMessage) {
+        const bookedMessage = i18n.t('renting.dates_booked_prefix', { message: errorMessage }, 'These dates are already booked. {message}');
+        if (!data.waitlist) {
+            alert(bookedMessage);
+            return;
+        }
+        if (!confirm(bookedMessage + '\n\n' + i18n.t('renting.join_waitlist_confirm', null, 'Join the waitlist? If these dates free up, your request is sent to the owner automatically.'))) {
+            return;
+        }
+
+        try {
+            const response = await fetchIdempotent(`/api/listing/${formData.get('listing_id')}/waitlist`, {
+                method: 'POST',
+                body: formData
+            }, 'waitlist:' + rentalScope(formData));
+            const result = await response.json();
+            if (result.success) {
+                alert(i18n.t('renting.waitlist_joined', { position: result.position }, 'You are number {position} on the waitlist. We will send your request to the owner if these dates free up.'));
+            } else {
+                alert(i18n.t('common.error_prefix', { message: result.message }, 'Error: {message}'));
+            }
+        } catch (error) {
+            console.error('Error joining waitlist:', error);
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
+        }
+    }
+
     function escapeHtml(text) {
         const div = document.createElement('div');
         div.textContent = text;
@@ -952,15 +1200,15 @@ document.addEventListener('DOMContentLoaded', function () {
         formData.append('days', days);
 
         try {
-            const response = await fetch('/rent_equipment', {
+            const response = await fetchIdempotent('/rent_equipment', {
                 method: 'POST',
                 body: formData
-            });
+            }, rentalScope(formData));
 
             const data = await response.json();
 
             if (data.success) {
-                alert('Rental request submitted successfully! The owner will review and approve your request.');
+                alert(submittedMessage(data));
                 // Reset selection
                 selectedStartDate = null;
                 selectedEndDate = null;
@@ -974,25 +1222,192 @@ document.addEventListener('DOMContentLoaded', function () {
             } else {
                 const errorMessage = data.message || 'Failed to submit rental request';
                 if (data.booked) {
-                    alert('These dates are already booked. ' + errorMessage);
+                    await offerWaitlist(formData, data, errorMessage);
                     // Reset selection
                     selectedStartDate = null;
                     selectedEndDate = null;
                     // Re-render calendar
                     const listing = currentListing;
                     if (listing) {
-                        fetchAvailabilityAndRender(listing.id, listing.available_from, listing.available_till);
+                        fetchAvailabilityAndRender(listing.id, listing.available_from, listing.available_till, 0);
                     }
                 } else {
-                    alert('Error: ' + errorMessage);
+                    alert(i18n.t('common.error_prefix', { message: errorMessage }, 'Error: {message}'));
                 }
             }
         } catch (error) {
             console.error('Error submitting rental:', error);
-            alert('An error occurred. Please try again.');
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
         }
     }
 
+    // ============================================
+    // Booking cart: several machines requested together (/api/booking-groups)
+    // ============================================
+
+    const bookingCart = {
+        key: 'agrorent-cart',
+        load() {
+            try {
+                return JSON.parse(localStorage.getItem(this.key)) || [];
+            } catch (error) {
+                return [];
+            }
+        },
+        save(items) {
+            localStorage.setItem(this.key, JSON.stringify(items));
+            updateCartButton();
+        }
+    };
+
+    function updateCartButton() {
+        const button = document.getElementById('cart-button');
+        if (!button) return;
+        const count = bookingCart.load().length;
+        button.style.display = count > 0 ? 'flex' : 'none';
+        document.getElementById('cart-count').textContent = count;
+    }
+
+    window.addToCart = async function (listingId) {
+        const listing = currentListing;
+        if (!listing || !selectedStartDate || !selectedEndDate) {
+            alert(i18n.t('renting.select_range', null, 'Please select a date range on the calendar'));
+            return;
+        }
+
+        const isValid = await validateDateRange(selectedStartDate, selectedEndDate, listingId);
+        if (!isValid) {
+            alert(i18n.t('renting.dates_booked', null, 'Selected dates are already booked. Please choose different dates.'));
+            return;
+        }
+
+        const days = selectedDays(selectedStartDate, selectedEndDate);
+        const items = bookingCart.load().filter(item => !(item.listing_id === listingId && item.start_date === selectedStartDate));
+        items.push({
+            listing_id: listingId,
+            title: listing.title,
+            start_date: selectedStartDate,
+            end_date: selectedEndDate,
+            days: days,
+            total_amount: estimateTotal(listing, days)
+        });
+        bookingCart.save(items);
+
+        selectedStartDate = null;
+        selectedEndDate = null;
+        document.getElementById('details-modal').classList.remove('show');
+        document.body.style.overflow = 'visible';
+        alert(i18n.t('renting.cart_added', { count: items.length }, 'Added to your cart ({count} machines). Add more or open the cart to book them together.'));
+    };
+
+    window.removeFromCart = function (index) {
+        const items = bookingCart.load();
+        items.splice(index, 1);
+        bookingCart.save(items);
+        if (items.length > 0) {
+            openCart();
+        } else {
+            document.getElementById('rental-modal').classList.remove('show');
+            document.body.style.overflow = 'visible';
+        }
+    };
+
+    window.openCart = function (errors = []) {
+        const items = bookingCart.load();
+        const errorFor = index => errors.find(error => error.index === index);
+        const total = items.reduce((sum, item) => sum + item.total_amount, 0);
+
+        document.getElementById('rental-form-container').innerHTML = `
+            <div class="rental-form booking-cart">
+                <h2><i class="fas fa-shopping-cart"></i> Booking Cart</h2>
+                <div class="cart-items">
+                    ${items.map((item, index) => `
+                    <div class="cart-item ${errorFor(index) ? 'cart-item-error' : ''}">
+                        <div>
+                            <div class="cart-item-title">${escapeHtml(item.title)}</div>
+                            <div class="days-count">${item.start_date} - ${item.end_date} (${item.days} day${item.days !== 1 ? 's' : ''})</div>
+                            ${errorFor(index) ? `<div class="cart-item-message"><i class="fas fa-exclamation-triangle"></i> ${escapeHtml(errorFor(index).message)}</div>` : ''}
+                        </div>
+                        <div class="cart-item-price">₹${item.total_amount.toLocaleString()}</div>
+                        <button class="btn-clear-selection" onclick="removeFromCart(${index})" title="Remove">
+                            <i class="fas fa-times"></i>
+                        </button>
+                    </div>`).join('')}
+                </div>
+                <div class="rental-summary">
+                    <div class="rental-summary-item">
+                        <span>Total Amount:</span>
+                        <span>₹${total.toLocaleString()}</span>
+                    </div>
+                </div>
+                <div class="rental-form-group">
+                    <label for="cart-renter-address">Your Address <span style="color: #c94843;">*</span></label>
+                    <textarea id="cart-renter-address" placeholder="Enter your complete address" required></textarea>
+                </div>
+                <div class="rental-form-group">
+                    <label for="cart-location-of-use">Location of Use <span style="color: #c94843;">*</span></label>
+                    <input type="text" id="cart-location-of-use" placeholder="Where will you use this equipment?" required>
+                </div>
+                <button class="btn-rent" onclick="submitCart(this)">
+                    <i class="fas fa-check"></i> Submit All Requests
+                </button>
+            </div>
+        `;
+
+        document.getElementById('rental-modal').classList.add('show');
+        document.body.style.overflow = 'hidden';
+    };
+
+    window.submitCart = async function (button) {
+        const items = bookingCart.load();
+        const renterAddress = document.getElementById('cart-renter-address').value.trim();
+        const locationOfUse = document.getElementById('cart-location-of-use').value.trim();
+
+        if (!renterAddress) {
+            alert(i18n.t('renting.enter_address', null, 'Please enter your address'));
+            return;
+        }
+        if (!locationOfUse) {
+            alert(i18n.t('renting.enter_location', null, 'Please specify the location where you will use the equipment'));
+            return;
+        }
+
+        const lines = items.map(item => ({ listing_id: item.listing_id, start_date: item.start_date, days: item.days }));
+        button.disabled = true;
+        try {
+            // The key covers the cart contents, so a retry of the same cart is not booked twice
+            const response = await fetchIdempotent('/api/booking-groups', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ items: lines, renter_address: renterAddress, location_of_use: locationOfUse })
+            }, 'cart:' + lines.map(line => [line.listing_id, line.start_date, line.days].join(':')).join(','));
+
+            const data = await response.json();
+
+            if (data.success) {
+                bookingCart.save([]);
+                document.getElementById('rental-modal').classList.remove('show');
+                document.body.style.overflow = 'visible';
+                alert(i18n.t('renting.cart_submitted', { count: data.rentals.length }, 'Rental requests for {count} machines submitted! Each owner will review and approve their machines.'));
+                loadListings();
+            } else if (data.errors) {
+                // Nothing was booked: show which lines need changing
+                openCart(data.errors);
+            } else {
+                alert(i18n.t('common.error_prefix', { message: data.message || 'Failed to submit rental request' }, 'Error: {message}'));
+            }
+        } catch (error) {
+            console.error('Error submitting cart:', error);
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
+        } finally {
+            button.disabled = false;
+        }
+    };
+
+    updateCartButton();
+
     // Scroll to calendar
     window.scrollToCalendar = function (listingId) {
         const calendarSection = document.querySelector('.modal-availability-calendar');
@@ -1134,8 +1549,7 @@ document.addEventListener('DOMContentLoaded', function () {
 
         try {
             // Fetch current availability
-            const response = await fetch(`/api/listing/${listingId}/availability`);
-            const data = await response.json();
+            const data = await getAvailability(listingId, 0);
 
             const pendingDates = new Set(data.pending_dates || []);
             const confirmedDates = new Set(data.confirmed_dates || []);
@@ -1242,18 +1656,18 @@ document.addEventListener('DOMContentLoaded', function () {
         const submitBtn = event.target.querySelector('button[type="submit"]');
         const originalText = submitBtn.innerHTML;
         submitBtn.disabled = true;
-        submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Processing...';
+        submitBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> ${escapeHtml(i18n.t('renting.processing', null, 'Processing...'))}`;
 
         try {
-            const response = await fetch('/rent_equipment', {
+            const response = await fetchIdempotent('/rent_equipment', {
                 method: 'POST',
                 body: formData
-            });
+            }, rentalScope(formData));
 
             const data = await response.json();
 
             if (data.success) {
-                alert('Rental request submitted successfully! The owner will review and approve your request.');
+                alert(submittedMessage(data));
                 document.getElementById('rental-modal').classList.remove('show');
                 document.body.style.overflow = 'visible';
                 // Reload listings to update calendar
@@ -1263,16 +1677,16 @@ document.addEventListener('DOMContentLoaded', function () {
             } else {
                 const errorMessage = data.message || 'Failed to submit rental request';
                 if (data.booked) {
-                    alert('These dates are already booked. ' + errorMessage);
+                    await offerWaitlist(formData, data, errorMessage);
                 } else {
-                    alert('Error: ' + errorMessage);
+                    alert(i18n.t('common.error_prefix', { message: errorMessage }, 'Error: {message}'));
                 }
                 submitBtn.disabled = false;
                 submitBtn.innerHTML = originalText;
             }
         } catch (error) {
             console.error('Error submitting rental:', error);
-            alert('An error occurred. Please try again.');
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
             submitBtn.disabled = false;
             submitBtn.innerHTML = originalText;
         }
@@ -1338,6 +1752,9 @@ document.addEventListener('DOMContentLoaded', function () {
             });
         });
 
+        document.getElementById('save-search').addEventListener('click', saveCurrentSearch);
+        document.getElementById('saved-searches').addEventListener('click', showSavedSearches);
+
         locationInput.addEventListener('keypress', function (e) {
             if (e.key === 'Enter') {
                 e.preventDefault();
@@ -1435,6 +1852,103 @@ document.addEventListener('DOMContentLoaded', function () {
         emptyState.style.display = showEmpty ? 'block' : 'none';
     }
 
+    // ============================================
+    // Saved searches: notified when matching equipment is listed
+    // ============================================
+
+    // The location box takes any of state, district or city; saved searches
+    // need to know which, so look the text up in the loaded catalogue
+    function locationFields(location) {
+        if (!location) return {};
+        const matches = field => allListings.some(listing => (listing[field] || '').trim().toLowerCase() === location);
+        if (matches('district')) return { district: location };
+        if (matches('state')) return { state: location };
+        return { district: location };
+    }
+
+    async function saveCurrentSearch() {
+        const category = document.getElementById('category-filter').value;
+        const location = document.getElementById('location-filter').value.trim().toLowerCase();
+        if (!category && !location) {
+            alert(i18n.t('renting.saved_search_need_filter', null, 'Choose a category or location first, then we can notify you about new matches.'));
+            return;
+        }
+
+        try {
+            const response = await fetch('/api/saved-searches', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    category: category,
+                    ...locationFields(location),
+                    price_min: document.getElementById('price-min').value,
+                    price_max: document.getElementById('price-max').value
+                })
+            });
+            const data = await response.json();
+            if (data.success) {
+                alert(i18n.t('renting.saved_search_created', null, 'Search saved. We will notify you when matching equipment is listed.'));
+            } else {
+                alert(i18n.t('common.error_prefix', { message: data.message }, 'Error: {message}'));
+            }
+        } catch (error) {
+            console.error('Error saving search:', error);
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
+        }
+    }
+
+    function describeSearch(search) {
+        const parts = [search.category, search.district, search.state].filter(Boolean)
+            .map(part => part.replace(/\b\w/g, letter => letter.toUpperCase()));
+        if (search.price_min !== null || search.price_max !== null) {
+            parts.push(`₹${search.price_min ?? 0} - ${search.price_max !== null ? '₹' + search.price_max : 'any'}`);
+        }
+        if (search.date_from || search.date_to) {
+            parts.push(`${search.date_from || '…'} to ${search.date_to || '…'}`);
+        }
+        return parts.join(' · ');
+    }
+
+    async function showSavedSearches() {
+        try {
+            const response = await fetch('/api/saved-searches');
+            const searches = await response.json();
+
+            document.getElementById('rental-form-container').innerHTML = `
+                <div class="rental-form saved-searches">
+                    <h2><i class="fas fa-bookmark"></i> Saved Searches</h2>
+                    ${searches.length === 0 ? `<p class="days-count">${escapeHtml(i18n.t('renting.saved_search_empty', null, 'No saved searches yet. Set a category or location and press "Notify me".'))}</p>` : ''}
+                    <div class="cart-items">
+                        ${searches.map(search => `
+                        <div class="cart-item">
+                            <div>
+                                <div class="cart-item-title">${escapeHtml(describeSearch(search))}</div>
+                            </div>
+                            <button class="btn-clear-selection" onclick="deleteSavedSearch(${search.id})" title="Delete">
+                                <i class="fas fa-trash"></i>
+                            </button>
+                        </div>`).join('')}
+                    </div>
+                </div>
+            `;
+            document.getElementById('rental-modal').classList.add('show');
+            document.body.style.overflow = 'hidden';
+        } catch (error) {
+            console.error('Error loading saved searches:', error);
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
+        }
+    }
+
+    window.deleteSavedSearch = async function (searchId) {
+        try {
+            await fetch(`/api/saved-searches/${searchId}`, { method: 'DELETE' });
+            showSavedSearches();
+        } catch (error) {
+            console.error('Error deleting saved search:', error);
+            alert(i18n.t('common.error_generic', null, 'An error occurred. Please try again.'));
+        }
+    };
+
     function resetFilters(elements) {
         elements.searchInput.value = '';
         elements.categorySelect.value = '';
@@ -1454,6 +1968,77 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 });
 
+// Render a condition analysis, from the Gemini call or the overview's cached copy
+function renderConditionResult(container, result) {
+    // Extract data
+    const score = result.condition_score;
+    const issues = result.issues_found || [];
+    const summary = result.summary || 'Analysis completed';
+    const recommendation = result.recommendation || 'Review equipment before renting';
+
+    // Determine score color (0-10 scale)
+    let scoreColor;
+    let scoreLabel;
+    if (score === null || score === undefined) {
+        scoreColor = '#999';
+        scoreLabel = 'N/A';
+    } else if (score >= 9) {
+        scoreColor = '#4CAF50'; // Green - Excellent
+        scoreLabel = 'Excellent';
+    } else if (score >= 7) {
+        scoreColor = '#8BC34A'; // Light Green - Good
+        scoreLabel = 'Good';
+    } else if (score >= 5) {
+        scoreColor = '#FFC107'; // Yellow - Moderate
+        scoreLabel = 'Moderate';
+    } else if (score >= 3) {
+        scoreColor = '#FF9800'; // Orange - Poor
+        scoreLabel = 'Poor';
+    } else {
+        scoreColor = '#F44336'; // Red - Very Bad
+        scoreLabel = 'Very Poor';
+    }
+
+    // Calculate percentage for display (0-10 scale to 0-100%)
+    const scorePercent = score !== null && score !== undefined ? (score / 10) * 100 : 0;
+
+    // Render Result
+    container.innerHTML = `
+        <div class="ai-result" style="border-left: 4px solid ${scoreColor}; background: #f9f9f9; padding: 1rem; border-radius: 8px; margin-top: 10px;">
+            <div style="display: flex; align-items: flex-start; gap: 15px; margin-bottom: 12px;">
+                <div style="position: relative; width: 70px; height: 70px; flex-shrink: 0;">
+                    <svg viewBox="0 0 36 36" style="width: 100%; height: 100%; transform: rotate(-90deg);">
+                        <path d="M18 2.0845 a 15.9155 15.9155 0 0 1 0 31.831 a 15.9155 15.9155 0 0 1 0 -31.831" fill="none" stroke="#eee" stroke-width="3" />
+                        <path d="M18 2.0845 a 15.9155 15.9155 0 0 1 0 31.831 a 15.9155 15.9155 0 0 1 0 -31.831" fill="none" stroke="${scoreColor}" stroke-width="3" stroke-dasharray="${scorePercent}, 100" />
+                    </svg>
+                    <span style="position: absolute; top: 50%; left: 50%; transform: translate(-50%, -50%); font-weight: bold; font-size: 16px; color: ${scoreColor};">${score !== null && score !== undefined ? score.toFixed(1) : 'N/A'}</span>
+                </div>
+                <div style="flex: 1;">
+                    <h4 style="margin: 0 0 8px 0; color: #333; font-size: 16px;">
+                        <i class="fas fa-robot" style="color: ${scoreColor};"></i> Condition Score: ${scoreLabel}
+                    </h4>
+                    ${issues.length > 0 ? `
+                    <div style="margin-bottom: 8px;">
+                        <strong style="font-size: 13px; color: #666;">Issues Found:</strong>
+                        <ul style="margin: 4px 0 0 0; padding-left: 20px; font-size: 12px; color: #555;">
+                            ${issues.slice(0, 5).map(issue => `<li>${escapeHtml(issue)}</li>`).join('')}
+                        </ul>
+                    </div>
+                    ` : ''}
+                    <div style="margin-bottom: 6px;">
+                        <strong style="font-size: 13px; color: #666;">Summary:</strong>
+                        <p style="margin: 4px 0 0 0; font-size: 12px; color: #555; line-height: 1.4;">${escapeHtml(summary)}</p>
+                    </div>
+                    <div>
+                        <strong style="font-size: 13px; color: #666;">Suggestion:</strong>
+                        <p style="margin: 4px 0 0 0; font-size: 12px; color: #555; line-height: 1.4;">${escapeHtml(recommendation)}</p>
+                    </div>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
 // AI Condition Analysis
 window.analyzeCondition = async function (imageUrl, listingId) {
     const container = document.getElementById(`ai-analysis-container-${listingId}`);
@@ -1482,74 +2067,7 @@ window.analyzeCondition = async function (imageUrl, listingId) {
         }
 
         const result = await response.json();
-
-        // Extract data
-        const score = result.condition_score;
-        const issues = result.issues_found || [];
-        const summary = result.summary || 'Analysis completed';
-        const recommendation = result.recommendation || 'Review equipment before renting';
-
-        // Determine score color (0-10 scale)
-        let scoreColor;
-        let scoreLabel;
-        if (score === null || score === undefined) {
-            scoreColor = '#999';
-            scoreLabel = 'N/A';
-        } else if (score >= 9) {
-            scoreColor = '#4CAF50'; // Green - Excellent
-            scoreLabel = 'Excellent';
-        } else if (score >= 7) {
-            scoreColor = '#8BC34A'; // Light Green - Good
-            scoreLabel = 'Good';
-        } else if (score >= 5) {
-            scoreColor = '#FFC107'; // Yellow - Moderate
-            scoreLabel = 'Moderate';
-        } else if (score >= 3) {
-            scoreColor = '#FF9800'; // Orange - Poor
-            scoreLabel = 'Poor';
-        } else {
-            scoreColor = '#F44336'; // Red - Very Bad
-            scoreLabel = 'Very Poor';
-        }
-
-        // Calculate percentage for display (0-10 scale to 0-100%)
-        const scorePercent = score !== null && score !== undefined ? (score / 10) * 100 : 0;
-
-        // Render Result
-        container.innerHTML = `
-            <div class="ai-result" style="border-left: 4px solid ${scoreColor}; background: #f9f9f9; padding: 1rem; border-radius: 8px; margin-top: 10px;">
-                <div style="display: flex; align-items: flex-start; gap: 15px; margin-bottom: 12px;">
-                    <div style="position: relative; width: 70px; height: 70px; flex-shrink: 0;">
-                        <svg viewBox="0 0 36 36" style="width: 100%; height: 100%; transform: rotate(-90deg);">
-                            <path d="M18 2.0845 a 15.9155 15.9155 0 0 1 0 31.831 a 15.9155 15.9155 0 0 1 0 -31.831" fill="none" stroke="#eee" stroke-width="3" />
-                            <path d="M18 2.0845 a 15.9155 15.9155 0 0 1 0 31.831 a 15.9155 15.9155 0 0 1 0 -31.831" fill="none" stroke="${scoreColor}" stroke-width="3" stroke-dasharray="${scorePercent}, 100" />
-                        </svg>
-                        <span style="position: absolute; top: 50%; left: 50%; transform: translate(-50%, -50%); font-weight: bold; font-size: 16px; color: ${scoreColor};">${score !== null && score !== undefined ? score.toFixed(1) : 'N/A'}</span>
-                    </div>
-                    <div style="flex: 1;">
-                        <h4 style="margin: 0 0 8px 0; color: #333; font-size: 16px;">
-                            <i class="fas fa-robot" style="color: ${scoreColor};"></i> Condition Score: ${scoreLabel}
-                        </h4>
-                        ${issues.length > 0 ? `
-                        <div style="margin-bottom: 8px;">
-                            <strong style="font-size: 13px; color: #666;">Issues Found:</strong>
-                            <ul style="margin: 4px 0 0 0; padding-left: 20px; font-size: 12px; color: #555;">
-                                ${issues.slice(0, 5).map(issue => `<li>${escapeHtml(issue)}</li>`).join('')}
-                            </ul>
-                        </div>
-                        ` : ''}
-                        <div style="margin-bottom: 6px;">
-                            <strong style="font-size: 13px; color: #666;">Summary:</strong>
-                            <p style="margin: 4px 0 0 0; font-size: 12px; color: #555; line-height: 1.4;">${escapeHtml(summary)}</p>
-                        </div>
-                        <div>
-                            <strong style="font-size: 13px; color: #666;">Suggestion:</strong>
-                            <p style="margin: 4px 0 0 0; font-size: 12px; color: #555; line-height: 1.4;">${escapeHtml(recommendation)}</p>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        `;
+        renderConditionResult(container, result);
 
     } catch (error) {
         console.error('AI Analysis Error:', error);
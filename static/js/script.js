@@ -8,6 +8,39 @@ document.addEventListener('DOMContentLoaded', function () {
     initFlashMessages();
 });
 
+// Idempotency keys for writes that may be retried or double-tapped. Requests
+// with the same scope share one Idempotency-Key while one of them is in flight
+// (or failed on the network), so repeats get the first response replayed
+// instead of writing again. Once the server has answered, the next request in
+// that scope is a new action and gets a new key.
+const idempotencyKeys = new Map();
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+async function fetchIdempotent(url, options, scope) {
+    if (!idempotencyKeys.has(scope)) {
+        idempotencyKeys.set(scope, newIdempotencyKey());
+    }
+    const headers = Object.assign({}, options.headers, { 'Idempotency-Key': idempotencyKeys.get(scope) });
+    for (let attempt = 0; ; attempt++) {
+        const response = await fetch(url, Object.assign({}, options, { headers: headers }));
+        // 409 with Retry-After: the first tap is still running, so wait for its result
+        if (response.status === 409 && response.headers.has('Retry-After') && attempt < 10) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            continue;
+        }
+        if (!(response.status === 409 && response.headers.has('Retry-After'))) {
+            idempotencyKeys.delete(scope);
+        }
+        return response;
+    }
+}
+
 // Smooth scrolling for anchor links
 function initSmoothScrolling() {
     document.querySelectorAll('a[href^="#"]').forEach(anchor => {
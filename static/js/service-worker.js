@@ -0,0 +1,303 @@
+// AgroRent service worker, served from /service-worker.js so it controls the
+// whole site. The server prepends PRECACHE_URLS (content-versioned static
+// assets and translation bundles) and CACHE_VERSION, so any asset change
+// produces a new worker that precaches the new files and drops old caches.
+//
+// - Versioned static assets and translation bundles: cache first
+// - Listing JSON and uploaded images: stale-while-revalidate
+// - The renting page: network first, falling back to the last copy offline
+// - POST /rent_equipment while offline: stored in IndexedDB and replayed by
+//   Background Sync (or when a page reports it is back online)
+//
+// Cached listing JSON and pages belong to the signed-in user, as do queued
+// requests. Navigating to /signout, or a page reporting a different user,
+// deletes them; queued requests are only replayed for the user who made them.
+
+const STATIC_CACHE = `agrorent-static-${CACHE_VERSION}`;
+const RUNTIME_CACHE = 'agrorent-runtime';
+const PAGE_CACHE = 'agrorent-pages';
+const RUNTIME_CACHE_LIMIT = 300;
+const OFFLINE_PAGES = ['/renting'];
+const SYNC_TAG = 'rent-equipment';
+const OUTBOX_DB = 'agrorent-offline';
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(STATIC_CACHE)
+            .then(cache => cache.addAll(PRECACHE_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith('agrorent-static-') && key !== STATIC_CACHE)
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (request.mode === 'navigate' && url.pathname === '/signout') {
+        event.respondWith(clearUserData().then(() => fetch(request)));
+        return;
+    }
+    if (request.method === 'POST' && url.pathname === '/rent_equipment') {
+        event.respondWith(sendOrQueue(request));
+        return;
+    }
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    if (request.mode === 'navigate') {
+        if (OFFLINE_PAGES.includes(url.pathname)) {
+            event.respondWith(networkFirst(request));
+        }
+    } else if (url.pathname.startsWith('/i18n/') || (url.pathname.startsWith('/static/') && url.searchParams.has('v'))) {
+        event.respondWith(cacheFirst(request));
+    } else if (
+        url.pathname === '/api/listings' ||
+        /^\/api\/listing\/\d+$/.test(url.pathname) ||
+        url.pathname.startsWith('/static/uploads/')
+    ) {
+        event.respondWith(staleWhileRevalidate(request, event));
+    }
+});
+
+// Only cache real answers: logged-out requests are redirected to /signin
+function cacheable(response) {
+    return response && response.ok && !response.redirected && response.type === 'basic';
+}
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (cacheable(response)) {
+        const cache = await caches.open(STATIC_CACHE);
+        await cache.put(request, response.clone());
+    }
+    return response;
+}
+
+async function staleWhileRevalidate(request, event) {
+    const cache = await caches.open(RUNTIME_CACHE);
+    const cached = await cache.match(request);
+    const network = fetch(request).then(async response => {
+        if (cacheable(response)) {
+            await cache.put(request, response.clone());
+            await trimCache(cache);
+        }
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(network.catch(() => undefined));
+        return cached;
+    }
+    return network;
+}
+
+async function networkFirst(request) {
+    const cache = await caches.open(PAGE_CACHE);
+    try {
+        const response = await fetch(request);
+        if (cacheable(response)) {
+            await cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request);
+        if (cached) {
+            return cached;
+        }
+        throw error;
+    }
+}
+
+// Cache keys come back in insertion order, so this drops the oldest entries
+async function trimCache(cache) {
+    const keys = await cache.keys();
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - RUNTIME_CACHE_LIMIT)).map(key => cache.delete(key)));
+}
+
+// ============================================
+// Offline rental requests
+// ============================================
+
+function openOutbox() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(OUTBOX_DB, 2);
+        request.onupgradeneeded = () => {
+            const db = request.result;
+            ['outbox', 'rejected'].forEach(name => {
+                if (!db.objectStoreNames.contains(name)) {
+                    db.createObjectStore(name, { keyPath: 'id', autoIncrement: true });
+                }
+            });
+            if (!db.objectStoreNames.contains('session')) {
+                db.createObjectStore('session');
+            }
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+async function withStore(name, mode, callback) {
+    const db = await openOutbox();
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction(name, mode);
+        const result = callback(transaction.objectStore(name));
+        transaction.oncomplete = () => resolve(result && 'result' in result ? result.result : undefined);
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
+
+// ============================================
+// Signed-in user
+// ============================================
+
+async function currentUser() {
+    const user = await withStore('session', 'readonly', store => store.get('user_id'));
+    return user === undefined ? null : user;
+}
+
+// Forget everything cached or queued for the previous user
+async function clearUserData() {
+    await Promise.all([caches.delete(RUNTIME_CACHE), caches.delete(PAGE_CACHE)]);
+    await withStore('outbox', 'readwrite', store => store.clear());
+    await withStore('rejected', 'readwrite', store => store.clear());
+    await withStore('session', 'readwrite', store => store.delete('user_id'));
+}
+
+// Pages report who is signed in; a change of user drops the old user's data
+async function setCurrentUser(userId) {
+    if (userId === await currentUser()) {
+        return;
+    }
+    await clearUserData();
+    if (userId !== null) {
+        await withStore('session', 'readwrite', store => store.put(userId, 'user_id'));
+    }
+}
+
+async function sendOrQueue(request) {
+    const queued = request.clone();
+    try {
+        return await fetch(request);
+    } catch (error) {
+        const fields = [...(await queued.formData()).entries()].filter(([, value]) => typeof value === 'string');
+        const userId = await currentUser();
+        await withStore('outbox', 'readwrite', store => store.add({
+            url: queued.url,
+            user_id: userId,
+            idempotency_key: queued.headers.get('Idempotency-Key'),
+            fields: fields,
+            queued_at: Date.now()
+        }));
+        if (self.registration.sync) {
+            await self.registration.sync.register(SYNC_TAG).catch(() => undefined);
+        }
+        return new Response(JSON.stringify({
+            success: true,
+            queued: true,
+            message: 'Saved offline; it will be sent when you are back online'
+        }), { status: 202, headers: { 'Content-Type': 'application/json' } });
+    }
+}
+
+let flushing = null;
+
+function flushOutbox() {
+    if (!flushing) {
+        flushing = replayOutbox().finally(() => {
+            flushing = null;
+        });
+    }
+    return flushing;
+}
+
+async function replayOutbox() {
+    const entries = await withStore('outbox', 'readonly', store => store.getAll());
+    const user = await currentUser();
+    let deferred = false;
+    for (const entry of entries) {
+        if (!entry.user_id || entry.user_id !== user) {
+            // Queued by someone else (or before we knew who): never send it as this user
+            await withStore('outbox', 'readwrite', store => store.delete(entry.id));
+            continue;
+        }
+        const body = new FormData();
+        entry.fields.forEach(([name, value]) => body.append(name, value));
+        // A network error propagates so Background Sync retries later. The
+        // original Idempotency-Key makes a replay safe if an earlier attempt
+        // reached the server but its response was lost.
+        const headers = entry.idempotency_key ? { 'Idempotency-Key': entry.idempotency_key } : {};
+        const response = await fetch(entry.url, { method: 'POST', body: body, headers: headers, credentials: 'same-origin' });
+        if (response.redirected) {
+            // Signed out: keep everything for the next flush
+            return;
+        }
+        if (response.status === 409 && response.headers.has('Retry-After')) {
+            // An earlier attempt is still running: keep this one and send the rest
+            deferred = true;
+            continue;
+        }
+        const data = await response.json().catch(() => ({ success: false, message: `HTTP ${response.status}` }));
+        await withStore('outbox', 'readwrite', store => store.delete(entry.id));
+        if (data.success) {
+            await notifyClients({ type: 'rental-sent', rental_id: data.rental_id });
+        } else {
+            await withStore('rejected', 'readwrite', store => store.add({ message: data.message || '', queued_at: entry.queued_at }));
+        }
+    }
+    if (deferred && self.registration.sync) {
+        await self.registration.sync.register(SYNC_TAG).catch(() => undefined);
+    }
+    await reportRejected();
+}
+
+// Tell open pages about requests the server turned down; kept until a page sees them
+async function reportRejected() {
+    const windows = await self.clients.matchAll({ type: 'window' });
+    if (windows.length === 0) {
+        return;
+    }
+    const rejected = await withStore('rejected', 'readonly', store => store.getAll());
+    for (const entry of rejected) {
+        await notifyClients({ type: 'rental-failed', message: entry.message });
+        await withStore('rejected', 'readwrite', store => store.delete(entry.id));
+    }
+}
+
+async function notifyClients(message) {
+    const windows = await self.clients.matchAll({ type: 'window' });
+    windows.forEach(client => client.postMessage(message));
+}
+
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(flushOutbox());
+    }
+});
+
+// Pages post this on load and when the browser comes back online, which
+// covers browsers without Background Sync
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'flush-outbox') {
+        const userId = event.data.user_id || null;
+        event.waitUntil(setCurrentUser(userId).then(flushOutbox).catch(() => undefined));
+    }
+});
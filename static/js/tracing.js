@@ -0,0 +1,39 @@
+// W3C trace context for API calls
+//
+// Adds a `traceparent` header to every same-origin fetch so the server can
+// attach its spans (SQLite, file I/O, PDF rendering, Gemini) to a trace that
+// starts in the browser. Must be loaded before the scripts that call fetch.
+
+(function () {
+    if (!window.fetch || !window.crypto || !window.crypto.getRandomValues) return;
+
+    const originalFetch = window.fetch.bind(window);
+
+    function randomHex(bytes) {
+        const values = new Uint8Array(bytes);
+        window.crypto.getRandomValues(values);
+        return Array.from(values, value => value.toString(16).padStart(2, '0')).join('');
+    }
+
+    function newTraceparent() {
+        // version 00, 16-byte trace id, 8-byte parent span id, sampled flag
+        return `00-${randomHex(16)}-${randomHex(8)}-01`;
+    }
+
+    window.fetch = function (input, init) {
+        const request = input instanceof Request ? input : null;
+        const url = new URL(request ? request.url : String(input), window.location.href);
+        if (url.origin !== window.location.origin) {
+            return originalFetch(input, init);
+        }
+
+        const headers = new Headers((init && init.headers) || (request ? request.headers : undefined));
+        if (!headers.has('traceparent')) {
+            headers.set('traceparent', newTraceparent());
+        }
+        if (request) {
+            return originalFetch(new Request(request, Object.assign({}, init, { headers })));
+        }
+        return originalFetch(input, Object.assign({}, init, { headers }));
+    };
+})();
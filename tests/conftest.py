@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+import pytest
+
+# The app reads its storage paths at import time, so point them at a scratch
+# directory before it is imported
+SCRATCH = tempfile.mkdtemp(prefix='agrorent-tests-')
+os.environ.setdefault('AGRORENT_DATABASE', os.path.join(SCRATCH, 'agrorent.db'))
+os.environ.setdefault('AGRORENT_SESSION_DATABASE', os.path.join(SCRATCH, 'sessions.db'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as agrorent  # noqa: E402
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    """A fresh database with the schema and sample listings"""
+    monkeypatch.setattr(agrorent, 'DATABASE', str(tmp_path / 'agrorent.db'))
+    monkeypatch.setattr(agrorent, 'database_ready', False)
+    agrorent.ensure_database()
+    return agrorent
+
+
+@pytest.fixture
+def client(db):
+    return db.app.test_client()
+
+
+@pytest.fixture
+def marketplace(db):
+    """Five synthetic users and one listing owned by the first, open from today"""
+    conn = db.get_db()
+    try:
+        db.generate_synthetic_data(conn, users=5, listings=1, rentals=0, mechanics=0, seed=1)
+        users = [row['id'] for row in conn.execute('SELECT id FROM users ORDER BY id').fetchall()]
+        listing_id = conn.execute('SELECT MAX(id) FROM listings').fetchone()[0]
+        conn.execute(
+            'UPDATE listings SET user_id = ?, available_from = ?, available_till = NULL WHERE id = ?',
+            (users[0], datetime.now().strftime('%Y-%m-%d'), listing_id)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return {'listing_id': listing_id, 'owner': users[0], 'renters': users[1:]}
+
+
+def sign_in(app_module, user_id):
+    """A test client signed in as the given user"""
+    conn = app_module.get_db()
+    try:
+        email = conn.execute('SELECT email FROM users WHERE id = ?', (user_id,)).fetchone()['email']
+    finally:
+        conn.close()
+    client = app_module.app.test_client()
+    response = client.post('/signin', data={'email': email, 'password': app_module.SYNTHETIC_PASSWORD})
+    assert response.status_code == 302
+    return client
+
+
+def copy_listing(db, listing_id, owner):
+    """Another listing like listing_id, owned by owner"""
+    conn = db.get_db()
+    try:
+        listing = dict(conn.execute('SELECT * FROM listings WHERE id = ?', (listing_id,)).fetchone())
+        del listing['id']
+        listing['user_id'] = owner
+        columns = ', '.join(listing)
+        new_id = conn.execute(
+            f'INSERT INTO listings ({columns}) VALUES ({", ".join("?" * len(listing))})', list(listing.values())
+        ).lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+    return new_id
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import copy_listing, sign_in
+
+
+def day(offset):
+    return (datetime.now().date() + timedelta(days=offset)).strftime('%Y-%m-%d')
+
+
+def count(db, table):
+    conn = db.get_db()
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def cart(db, marketplace):
+    """Two listings from different owners and a renter to book them"""
+    renter, other_owner = marketplace['renters'][:2]
+    listings = [marketplace['listing_id'], copy_listing(db, marketplace['listing_id'], other_owner)]
+    return {'listings': listings, 'renter': renter}
+
+
+def book(client, *lines):
+    return client.post('/api/booking-groups', json={
+        'items': [{'listing_id': listing_id, 'start_date': start, 'days': 2} for listing_id, start in lines],
+        'renter_address': 'Farm 4',
+        'location_of_use': 'North field'
+    })
+
+
+def test_body_must_be_an_object(db, cart):
+    response = sign_in(db, cart['renter']).post('/api/booking-groups', json=[{'listing_id': 1}])
+    assert response.status_code == 400
+    assert not response.json['success']
+
+
+def test_cart_books_every_line(db, cart):
+    first, second = cart['listings']
+    response = book(sign_in(db, cart['renter']), (first, day(3)), (second, day(4)))
+    assert response.json['success'], response.json
+
+    conn = db.get_db()
+    rows = {row['id']: row for row in conn.execute('SELECT * FROM rentals').fetchall()}
+    conn.close()
+    for line in response.json['rentals']:
+        row = rows[line['rental_id']]
+        assert (row['listing_id'], row['start_date']) == (line['listing_id'], line['start_date'])
+        assert row['booking_group_id'] == response.json['booking_group_id']
+
+
+@pytest.mark.parametrize('conflicting_line', [0, 1])
+def test_conflict_on_any_line_books_nothing(db, cart, conflicting_line):
+    first, second = cart['listings']
+    lines = [(first, day(3)), (second, day(4))]
+    conn = db.get_db()
+    conn.execute('''
+        INSERT INTO rentals (user_id, listing_id, start_date, end_date, days, total_amount, status)
+        VALUES (?, ?, ?, ?, 2, 2000, 'Approved')
+    ''', (cart['renter'], lines[conflicting_line][0], lines[conflicting_line][1], day(10)))
+    conn.commit()
+    conn.close()
+
+    response = book(sign_in(db, cart['renter']), *lines)
+    assert response.status_code == 409
+    assert [error['index'] for error in response.json['errors']] == [conflicting_line]
+    assert count(db, 'rentals') == 1
+    assert count(db, 'booking_groups') == 0
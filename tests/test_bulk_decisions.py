@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+from conftest import copy_listing, sign_in
+
+
+def day(offset):
+    return (datetime.now().date() + timedelta(days=offset)).strftime('%Y-%m-%d')
+
+
+def add_rental(db, user_id, listing_id, start, end, status='Pending'):
+    conn = db.get_db()
+    try:
+        rental_id = conn.execute('''
+            INSERT INTO rentals (user_id, listing_id, start_date, end_date, days, total_amount, status)
+            VALUES (?, ?, ?, ?, 3, 3000, ?)
+        ''', (user_id, listing_id, start, end, status)).lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+    return rental_id
+
+
+def statuses(db, *rental_ids):
+    conn = db.get_db()
+    try:
+        return [conn.execute('SELECT status FROM rentals WHERE id = ?', (rental_id,)).fetchone()['status']
+                for rental_id in rental_ids]
+    finally:
+        conn.close()
+
+
+def decide(client, *decisions):
+    return client.post('/api/rentals/bulk', json={
+        'decisions': [{'rental_id': rental_id, 'action': action} for rental_id, action in decisions]
+    })
+
+
+def test_body_must_be_an_object(db, marketplace):
+    client = sign_in(db, marketplace['owner'])
+    response = client.post('/api/rentals/bulk', json=[{'rental_id': 1, 'action': 'approve'}])
+    assert response.status_code == 400
+    assert not response.json['success']
+
+
+def test_approval_cancels_overlapping_request_in_the_same_batch(db, marketplace):
+    listing_id = marketplace['listing_id']
+    first, second, third = marketplace['renters'][:3]
+    early = add_rental(db, first, listing_id, day(5), day(8))
+    overlapping = add_rental(db, second, listing_id, day(7), day(10))
+    outside = add_rental(db, third, listing_id, day(20), day(22))
+
+    response = decide(sign_in(db, marketplace['owner']),
+                      (overlapping, 'approve'), (early, 'approve'), (outside, 'reject'))
+    assert response.json['success'], response.json
+    results = {result['rental_id']: result for result in response.json['results']}
+    # Approvals go in date order, so the earlier request wins and displaces the later one
+    assert results[early]['status'] == 'Approved'
+    assert not results[overlapping]['success']
+    assert results[overlapping]['status'] == 'Cancelled'
+    assert results[outside]['status'] == 'Cancelled'
+    assert statuses(db, early, overlapping, outside) == ['Approved', 'Cancelled', 'Cancelled']
+
+
+def test_decisions_on_other_owners_rentals_are_denied(db, marketplace):
+    listing_id = marketplace['listing_id']
+    renter, other_owner = marketplace['renters'][:2]
+    others_listing = copy_listing(db, listing_id, other_owner)
+    mine = add_rental(db, renter, listing_id, day(5), day(8))
+    theirs = add_rental(db, renter, others_listing, day(5), day(8))
+
+    response = decide(sign_in(db, marketplace['owner']), (mine, 'approve'), (theirs, 'reject'))
+    results = {result['rental_id']: result for result in response.json['results']}
+    assert results[mine]['success']
+    assert not results[theirs]['success']
+    assert results[theirs]['message'] == 'Access denied'
+    assert statuses(db, mine, theirs) == ['Approved', 'Pending']
+
+    # The renter can't decide on rentals either, even their own
+    response = decide(sign_in(db, renter), (theirs, 'approve'))
+    assert response.json['results'][0]['message'] == 'Access denied'
+    assert statuses(db, theirs) == ['Pending']
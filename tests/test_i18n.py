@@ -0,0 +1,16 @@
+from conftest import sign_in
+
+
+def test_language_menu_switches_in_place(db, marketplace):
+    client = sign_in(db, marketplace['renters'][0])
+    page = client.get('/renting')
+    assert page.status_code == 200
+    assert page.data.count(b'data-set-language=') == len(db.SUPPORTED_LANGUAGES)
+
+    response = client.get('/set_language/hi', headers={'Accept': 'application/json'})
+    assert response.json['success']
+    with db.app.test_request_context():
+        assert response.json['bundle'] == db.translation_bundle_url('hi')
+    assert client.get(response.json['bundle']).status_code == 200
+    with client.session_transaction() as session:
+        assert session['lang'] == 'hi'
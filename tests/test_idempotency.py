@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from conftest import sign_in
+
+
+def day(offset):
+    return (datetime.now().date() + timedelta(days=offset)).strftime('%Y-%m-%d')
+
+
+def rental_count(db, user_id):
+    conn = db.get_db()
+    try:
+        return conn.execute('SELECT COUNT(*) FROM rentals WHERE user_id = ?', (user_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def rent(client, listing_id, start, key):
+    return client.post('/rent_equipment', data={'listing_id': listing_id, 'days': 2, 'start_date': start},
+                       headers={'Idempotency-Key': key})
+
+
+def test_repeat_replays_the_stored_response(db, marketplace):
+    renter = marketplace['renters'][0]
+    client = sign_in(db, renter)
+
+    first = rent(client, marketplace['listing_id'], day(5), 'book-1')
+    assert first.json['success'], first.json
+    repeat = rent(client, marketplace['listing_id'], day(5), 'book-1')
+    assert repeat.headers['Idempotent-Replayed'] == 'true'
+    assert repeat.json == first.json
+    assert rental_count(db, renter) == 1
+
+    # Storing the response extends the claim's short lease to the full TTL
+    conn = db.get_db()
+    expires_at = conn.execute('SELECT expires_at FROM idempotency_keys').fetchone()['expires_at']
+    conn.close()
+    assert expires_at > datetime.now().timestamp() + db.IDEMPOTENCY_TTL - 60
+
+
+def test_key_reused_for_a_different_request_is_rejected(db, marketplace):
+    renter = marketplace['renters'][0]
+    client = sign_in(db, renter)
+
+    assert rent(client, marketplace['listing_id'], day(5), 'book-1').json['success']
+    response = rent(client, marketplace['listing_id'], day(9), 'book-1')
+    assert response.status_code == 422
+    assert rental_count(db, renter) == 1
+
+
+def test_expired_claim_is_taken_over(db, marketplace):
+    renter = marketplace['renters'][0]
+    client = sign_in(db, renter)
+    stale = rent(client, marketplace['listing_id'], day(5), 'book-1')
+    assert stale.json['success']
+    # Leave a claim behind as if its worker died before storing a response
+    conn = db.get_db()
+    conn.execute('DELETE FROM rentals WHERE user_id = ?', (renter,))
+    conn.execute("UPDATE idempotency_keys SET status = NULL, headers = NULL, body = NULL, expires_at = ?",
+                 (datetime.now().timestamp() + db.IDEMPOTENCY_LEASE,))
+    conn.commit()
+    conn.close()
+
+    in_progress = rent(client, marketplace['listing_id'], day(5), 'book-1')
+    assert in_progress.status_code == 409
+    assert in_progress.headers['Retry-After']
+
+    conn = db.get_db()
+    conn.execute('UPDATE idempotency_keys SET expires_at = ?', (datetime.now().timestamp() - 1,))
+    conn.commit()
+    conn.close()
+    taken_over = rent(client, marketplace['listing_id'], day(5), 'book-1')
+    assert taken_over.json['success'], taken_over.json
+    assert 'Idempotent-Replayed' not in taken_over.headers
+    assert rental_count(db, renter) == 1
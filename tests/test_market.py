@@ -0,0 +1,32 @@
+def market_state(db):
+    conn = db.get_db()
+    try:
+        return (
+            conn.execute('SELECT COUNT(*) FROM market_dirty').fetchone()[0],
+            conn.execute("SELECT value FROM market_meta WHERE name = 'built_on'").fetchone(),
+        )
+    finally:
+        conn.close()
+
+
+def test_stats_endpoint_only_reads(db, marketplace, monkeypatch):
+    started = []
+    monkeypatch.setattr(db.market_refresher, 'ensure_started', lambda: started.append(True))
+    monkeypatch.setitem(db.market_stats_cache, 'payload', None)
+    before = market_state(db)
+    assert before[0] > 0  # the synthetic listing queued its groups
+
+    response = db.app.test_client().get('/api/market/stats')
+    assert response.status_code == 200
+    assert started
+    assert market_state(db) == before
+
+    # The refresher (or the CLI) applies the queued changes
+    conn = db.get_db()
+    try:
+        groups, rebuilt = db.refresh_market_stats(conn)
+    finally:
+        conn.close()
+    assert rebuilt
+    dirty, built_on = market_state(db)
+    assert dirty == 0 and built_on is not None
@@ -0,0 +1,43 @@
+import os
+
+from conftest import sign_in
+
+
+def response_bytes(db, endpoint):
+    return db.metrics.counters.get(db.metrics.key('agrorent_http_response_bytes_total', {'endpoint': endpoint}), 0)
+
+
+def test_streamed_response_bytes_are_counted(db, marketplace):
+    client = sign_in(db, marketplace['renters'][0])
+    for headers in ({}, {'Accept-Encoding': 'gzip'}):
+        before = response_bytes(db, 'get_listings')
+        response = client.get('/api/listings', headers=headers)
+        body = response.get_data()
+        response.close()
+        assert len(body) > 2
+        assert response_bytes(db, 'get_listings') - before == len(body)
+
+
+def test_exited_worker_files_are_folded_into_the_archive(db, monkeypatch, tmp_path):
+    metrics_dir = tmp_path / 'metrics'
+    metrics_dir.mkdir()
+    monkeypatch.setattr(db, 'METRICS_DIR', str(metrics_dir))
+    workers = {}
+    for pid, requests in ((101, 3), (102, 5)):
+        worker = workers[pid] = db.Metrics()
+        worker.inc('agrorent_db_queries_total', requests, endpoint='index')
+        worker.observe('agrorent_http_request_duration_seconds', 0.02, endpoint='index')
+        worker.flush_timer.cancel()  # written by hand below, under a fake pid
+        db.write_metrics_file(str(metrics_dir / f'{pid}-{worker.token}.json'), worker.snapshot())
+
+    scraper = db.Metrics()
+    before = scraper.collect()
+    scraper.mark_process_dead(101)
+    scraper.mark_process_dead(102)
+    assert scraper.collect() == before
+    assert sorted(path.name for path in metrics_dir.iterdir() if not path.name.startswith(f'{os.getpid()}-')) == ['archive.json']
+
+    counters, histograms = before
+    assert counters[db.metrics.key('agrorent_db_queries_total', {'endpoint': 'index'})] == 8
+    assert histograms[db.metrics.key('agrorent_http_request_duration_seconds', {'endpoint': 'index'})]['count'] == 2
+
@@ -0,0 +1,12 @@
+def test_manifest_icons_are_versioned_and_precached(client):
+    manifest = client.get('/manifest.webmanifest').json
+    assert [icon['sizes'] for icon in manifest['icons']] == ['192x192', '512x512']
+
+    worker = client.get('/service-worker.js').get_data(as_text=True)
+    for icon in manifest['icons']:
+        assert '?v=' in icon['src']
+        assert f'"{icon["src"]}"' in worker
+        response = client.get(icon['src'])
+        assert response.status_code == 200
+        assert response.mimetype == 'image/png'
+        response.close()
@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+
+def listing(listing_id, brand, power_spec, district, price, category='Tractor'):
+    return {
+        'id': listing_id, 'category': category, 'brand': brand, 'power_spec': power_spec,
+        'district': district, 'pricing_type': 'per day', 'price': price,
+    }
+
+
+@pytest.fixture
+def index(db):
+    """Five Mahindra 45 HP tractors in Pune and five Swaraj 80 HP ones in Nashik"""
+    db.get_price_index()  # imports NumPy into the module
+    index = db.PriceIndex()
+    listings = [listing(number, 'Mahindra', '45 HP', 'Pune', 1000 + 10 * number) for number in range(5)]
+    listings += [listing(10 + number, 'Swaraj', '80 HP', 'Nashik', 2000 + 10 * number) for number in range(5)]
+    listings += [listing(20, 'John Deere', '', 'Pune', 5000, category='Harvester')]
+    index.build(listings, {0: 0.5})
+    return index
+
+
+def draft(brand='', power_spec='', district='', category='Tractor'):
+    return {'category': category, 'brand': brand, 'power_spec': power_spec, 'district': district, 'pricing_type': 'Per Day'}
+
+
+@pytest.mark.parametrize('query, matched_on, median', [
+    # Enough comparables at the most specific level
+    (draft('Mahindra', '45 HP', 'Pune'), ['brand', 'power_band', 'district'], 1020),
+    # An unknown brand drops to power band and district
+    (draft('Sonalika', '45 HP', 'Pune'), ['power_band', 'district'], 1020),
+    # Nothing with this power band in Nashik: brand and power band still match
+    (draft('Mahindra', '45 HP', 'Nashik'), ['brand', 'power_band'], 1020),
+    # Only a district to go on
+    (draft(district='Nashik'), ['district'], 2020),
+    # Fields the owner hasn't filled in are skipped, leaving the whole category
+    (draft(), [], 1520),
+    # Fewer than PRICE_MIN_COMPARABLES in the category: use them all
+    (draft('John Deere', district='Pune', category='Harvester'), [], 5000),
+])
+def test_suggestion_uses_most_specific_group_with_enough_comparables(index, query, matched_on, median):
+    suggestion = index.suggest(query)
+    assert suggestion['matched_on'] == ['category', 'pricing_type'] + matched_on
+    assert suggestion['median'] == median
+
+
+def test_suggestion_reports_power_band_and_demand(index):
+    suggestion = index.suggest(draft('Mahindra', '45 HP', 'Pune'))
+    assert suggestion['power_band'] == '35-50 HP'
+    assert suggestion['comparables'] == 5
+    assert suggestion['rented'] == 1
+    assert suggestion['utilisation'] == 0.1
+
+
+def test_no_suggestion_without_comparables(index):
+    assert index.suggest(draft(category='Sprayer')) is None
+    # A listing is not its own comparable
+    assert index.suggest(draft(category='Harvester'), exclude_id=20) is None
+
+
+@pytest.mark.parametrize('power_spec, band', [
+    ('65 HP', 4),
+    ('45hp diesel', 3),
+    ('30 kW', 3),  # about 40 HP
+    ('50 HP', 4),  # band edges belong to the band above
+    ('8 HP', 0),
+    ('250 HP', 7),
+    ('4WD', None),
+    ('', None),
+    (None, None),
+])
+def test_power_band(db, power_spec, band):
+    assert db.power_band(power_spec) == band
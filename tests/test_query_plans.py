@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+from conftest import agrorent
+
+# The CLI (`flask --app app check-query-plans`) loads 100,000 rentals; a
+# smaller dataset keeps the suite fast and still shows a missing index as a
+# full scan. Set AGRORENT_QUERY_CHECK_RENTALS to test at full size.
+RENTALS = int(os.environ.get('AGRORENT_QUERY_CHECK_RENTALS', 5000))
+
+
+@pytest.fixture(scope='module')
+def plan_check(tmp_path_factory):
+    """A synthetic dataset and the sample ids the hot queries run with"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(agrorent, 'DATABASE', str(tmp_path_factory.mktemp('query-plans') / 'agrorent.db'))
+        agrorent.init_db()
+        conn = agrorent.get_db()
+        try:
+            yield conn, agrorent.load_query_check_data(conn, RENTALS, seed=42)
+        finally:
+            conn.close()
+
+
+@pytest.mark.parametrize('name', sorted(agrorent.HOT_QUERIES))
+def test_hot_query_is_index_backed_and_within_budget(plan_check, name):
+    conn, sample = plan_check
+    plan, scans, median_ms = agrorent.check_hot_query(conn, name, sample, runs=5)
+    assert plan
+    assert agrorent.hot_query_failures(name, scans, median_ms) == []
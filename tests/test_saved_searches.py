@@ -0,0 +1,36 @@
+from conftest import sign_in
+
+
+def move_listing(db, listing_id, category, district):
+    """Update the listing the way an owner's edit would, matching saved searches"""
+    conn = db.get_db()
+    try:
+        conn.execute('UPDATE listings SET category = ?, district = ? WHERE id = ?', (category, district, listing_id))
+        notified = db.match_saved_searches(conn, listing_id)
+        conn.commit()
+    finally:
+        conn.close()
+    return notified
+
+
+def match_notifications(db, user_id):
+    conn = db.get_db()
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM notifications WHERE user_id = ? AND type = 'saved_search_match'", (user_id,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_renter_is_notified_once_per_listing_across_searches(db, marketplace):
+    renter = marketplace['renters'][0]
+    client = sign_in(db, renter)
+    for search in ({'category': 'Tractor'}, {'district': 'Pune'}):
+        assert client.post('/api/saved-searches', json=search).json['success']
+
+    # Created as a tractor in Nashik: only the category search matches
+    assert move_listing(db, marketplace['listing_id'], 'Tractor', 'Nashik') == 1
+    # Moved to Pune: now the district search matches too, but the renter already knows
+    assert move_listing(db, marketplace['listing_id'], 'Tractor', 'Pune') == 0
+    assert match_notifications(db, renter) == 1
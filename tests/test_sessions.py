@@ -0,0 +1,38 @@
+import app as agrorent
+
+
+def session_id(client):
+    cookie = client.get_cookie(agrorent.app.config['SESSION_COOKIE_NAME'])
+    return cookie.value.partition('.')[0] if cookie else None
+
+
+def stored(sid):
+    conn = agrorent.session_store.connect()
+    try:
+        return conn.execute('SELECT 1 FROM sessions WHERE id = ?', (sid,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def test_sign_in_and_out_issue_new_session_ids(db, marketplace):
+    conn = db.get_db()
+    email = conn.execute('SELECT email FROM users WHERE id = ?', (marketplace['owner'],)).fetchone()['email']
+    conn.close()
+    client = db.app.test_client()
+
+    # A session that exists before sign-in, e.g. one planted by an attacker
+    client.get('/set_language/hi')
+    planted = session_id(client)
+    assert planted and stored(planted)
+
+    client.post('/signin', data={'email': email, 'password': db.SYNTHETIC_PASSWORD})
+    signed_in = session_id(client)
+    assert signed_in != planted
+    assert not stored(planted)
+    with client.session_transaction() as session:
+        assert session['user_id'] == marketplace['owner']
+        assert session['lang'] == 'hi'
+
+    client.get('/signout')
+    assert session_id(client) != signed_in
+    assert not stored(signed_in)
@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+import pytest
+
+
+def test_synthetic_rentals_stay_inside_the_window(db):
+    anchor = date(2026, 6, 1)
+    first_day = (anchor - timedelta(days=365)).strftime('%Y-%m-%d')
+    last_day = (anchor + timedelta(days=89)).strftime('%Y-%m-%d')
+    conn = db.get_db()
+    try:
+        # Few listings and many rentals: the busiest ones cannot fit every booking
+        counts = db.generate_synthetic_data(conn, users=20, listings=3, rentals=600, mechanics=0, seed=7, anchor=anchor)
+        rentals = conn.execute('SELECT listing_id, start_date, end_date FROM rentals ORDER BY listing_id, start_date').fetchall()
+    finally:
+        conn.close()
+
+    assert 0 < counts['rentals'] <= 600
+    assert min(rental['start_date'] for rental in rentals) >= first_day
+    assert max(rental['end_date'] for rental in rentals) <= last_day
+    for previous, rental in zip(rentals, rentals[1:]):
+        if previous['listing_id'] == rental['listing_id']:
+            assert previous['end_date'] < rental['start_date']
+    # Bookings still reach into the last weeks of the window
+    assert max(rental['start_date'] for rental in rentals) >= (anchor + timedelta(days=60)).strftime('%Y-%m-%d')
+
+
+@pytest.mark.parametrize('options, expected', [
+    ({'users': 5, 'listings': 0, 'rentals': 10, 'mechanics': 2}, {'users': 5, 'listings': 0, 'rentals': 0}),
+    ({'users': 0, 'listings': 0, 'rentals': 0, 'mechanics': 2}, {'users': 0, 'listings': 0, 'rentals': 0}),
+])
+def test_empty_tables_are_allowed(db, options, expected):
+    conn = db.get_db()
+    try:
+        counts = db.generate_synthetic_data(conn, seed=3, **options)
+    finally:
+        conn.close()
+    assert {table: counts[table] for table in expected} == expected
+
+
+def test_seed_data_rejects_impossible_combinations(db):
+    conn = db.get_db()
+    try:
+        with pytest.raises(ValueError):
+            db.generate_synthetic_data(conn, users=0, listings=3, rentals=0, mechanics=0)
+    finally:
+        conn.close()
+    for options in (['--users', '0', '--listings', '3'], ['--listings', '0', '--rentals', '5'], ['--users', '-1']):
+        result = db.app.test_cli_runner().invoke(args=['seed-data', *options])
+        assert result.exit_code == 2, result.output
+        assert 'Invalid value' in result.output
+
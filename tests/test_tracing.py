@@ -0,0 +1,20 @@
+from flask import g
+
+import app as agrorent
+
+
+def test_spans_past_the_limit_are_dropped(db, monkeypatch, tmp_path):
+    monkeypatch.setattr(agrorent, 'TRACE_FILE', str(tmp_path / 'traces.jsonl'))
+    with agrorent.app.test_request_context('/'):
+        trace = g.trace = agrorent.Trace('0' * 32, '')
+        conn = agrorent.get_db()
+        try:
+            for _ in range(agrorent.TRACE_MAX_SPANS + 5):
+                assert conn.execute('SELECT 1').fetchall()
+        finally:
+            conn.close()
+        with agrorent.span('after.limit') as record:
+            assert record is None
+
+    assert len(trace.spans) == agrorent.TRACE_MAX_SPANS
+    assert trace.spans[1]['attributes']['db.rows'] == 1
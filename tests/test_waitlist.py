@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from conftest import sign_in
+
+
+def day(offset):
+    return (datetime.now().date() + timedelta(days=offset)).strftime('%Y-%m-%d')
+
+
+def add_rental(db, user_id, listing_id, start, end, status):
+    conn = db.get_db()
+    try:
+        rental_id = conn.execute('''
+            INSERT INTO rentals (user_id, listing_id, start_date, end_date, days, total_amount, status)
+            VALUES (?, ?, ?, ?, 3, 3000, ?)
+        ''', (user_id, listing_id, start, end, status)).lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+    return rental_id
+
+
+def waitlist_status(db, user_id):
+    conn = db.get_db()
+    try:
+        return conn.execute('SELECT status FROM waitlist_entries WHERE user_id = ?', (user_id,)).fetchone()['status']
+    finally:
+        conn.close()
+
+
+def test_promoted_entry_keeps_later_overlapping_entries_waiting(db, marketplace):
+    listing_id = marketplace['listing_id']
+    booked, first, second, other = marketplace['renters']
+    booking = add_rental(db, booked, listing_id, day(10), day(13), 'Approved')
+
+    for renter, start in ((first, day(10)), (second, day(11))):
+        response = sign_in(db, renter).post(f'/api/listing/{listing_id}/waitlist', data={'start_date': start, 'days': 2})
+        assert response.json['success'], response.json
+    unrelated = add_rental(db, other, listing_id, day(13), day(15), 'Pending')
+
+    # Withdrawing the booking promotes the first entry, which overlaps the second
+    assert sign_in(db, booked).post(f'/api/rentals/{booking}/withdraw').json['success']
+    assert waitlist_status(db, first) == 'Promoted'
+    assert waitlist_status(db, second) == 'Waiting'
+
+    # Freeing dates the second entry overlaps must not jump it ahead of the first
+    assert sign_in(db, marketplace['owner']).post(f'/api/rentals/{unrelated}/reject').json['success']
+    assert waitlist_status(db, second) == 'Waiting'